@@ -1,16 +1,62 @@
 # app/__init__.py
+import gc
 from flask import Flask
 from .config import Config
 
-def create_app():
+def create_app(preload_model=None):
+    """
+    preload_model: load + warm up the price model now (defaults to Config.PRELOAD_MODEL).
+    Under `gunicorn --preload "run:app"` this runs in the master before fork,
+    so workers share the model's memory pages copy-on-write.
+    """
     app = Flask(__name__)
     app.config.from_object(Config)
+    if preload_model is not None:
+        app.config["PRELOAD_MODEL"] = preload_model
+
+    from .utils.compression import init_compression
+    init_compression(app)
 
     from .routes.home_routes import home_bp
     from .routes.prediction_routes import prediction_bp
     from .routes.analytics_routes import analytics_bp
+    from .routes.recommendation_routes import recommendation_bp
 
     app.register_blueprint(home_bp)
     app.register_blueprint(prediction_bp)
     app.register_blueprint(analytics_bp)
-    return app
\ No newline at end of file
+    app.register_blueprint(recommendation_bp)
+
+    if app.config.get("ANALYTICS_WARMUP"):
+        _warm_up_analytics(app)
+    if app.config.get("PRELOAD_MODEL"):
+        _preload_model(app)
+    return app
+
+def _preload_model(app):
+    from .utils.model_loader import warm_up_model
+    try:
+        warm_up_model()
+    except Exception as e:
+        # Fall back to lazy loading on the first /predict
+        app.logger.exception("Model preload failed", exc_info=e)
+        return
+    # Move everything allocated so far out of the GC's generations: collections in
+    # forked workers then don't touch (and copy) the preloaded model's pages
+    gc.freeze()
+
+def _warm_up_analytics(app):
+    from .utils.figure_cache import warm_up_figures
+    from .utils.row_filters import get_row_index
+    from .utils.spatial_index import get_spatial_index
+    from .utils.stats_cube import get_stats_cube
+    with app.app_context():
+        try:
+            get_stats_cube()
+            get_row_index()
+            warm_up_figures()
+            get_spatial_index("listings")
+            get_spatial_index("sectors")
+        except Exception as e:
+            # Never block startup; figures will be built on first request instead
+            app.logger.exception("Analytics warm-up failed", exc_info=e)
\ No newline at end of file
@@ -1,6 +1,81 @@
 import os
+from pathlib import Path
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
 
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key")
     JSON_AS_ASCII = False
-    MODEL_PRICE_UNIT = "crore"  # your model outputs crores
\ No newline at end of file
+    MODEL_PRICE_UNIT = "crore"  # your model outputs crores
+    PRELOAD_MODEL = os.environ.get("PRELOAD_MODEL", "0") == "1"  # load + warm up the model in create_app()
+    # Score single /predict rows with lookup tables + booster/trees directly instead of the sklearn Pipeline
+    MODEL_COMPILED_INFERENCE = os.environ.get("MODEL_COMPILED_INFERENCE", "0") == "1"
+
+    # Analytics figure cache (set FIGURE_CACHE_DIR="" to keep it in memory only)
+    FIGURE_CACHE_DIR = os.environ.get("FIGURE_CACHE_DIR", str(_PROJECT_ROOT / "exported_data" / ".cache" / "figures"))
+    ANALYTICS_WARMUP = os.environ.get("ANALYTICS_WARMUP", "0") == "1"  # build all figures in create_app()
+
+    # gzip for text responses (HTML pages, JSON figure specs)
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6
+
+    # Above this many rows, scatter/box/violin figures are sampled or summarized
+    ANALYTICS_POINT_BUDGET = int(os.environ.get("ANALYTICS_POINT_BUDGET", "5000"))
+    ANALYTICS_LARGE_DATA_MODE = os.environ.get("ANALYTICS_LARGE_DATA_MODE", "sample")  # or "density"
+    # Cold figure builds (warm-up, `flask analytics build-figures`): "thread", "process" or "serial";
+    # a figure not done within ANALYTICS_BUILD_TIMEOUT seconds is replaced by an alert placeholder
+    ANALYTICS_BUILD_MODE = os.environ.get("ANALYTICS_BUILD_MODE", "thread")
+    ANALYTICS_BUILD_WORKERS = int(os.environ.get("ANALYTICS_BUILD_WORKERS", "0"))  # 0 = one per figure / per core
+    ANALYTICS_BUILD_TIMEOUT = float(os.environ.get("ANALYTICS_BUILD_TIMEOUT", "60"))
+    # /analytics filters: filtered listing subsets and serialized filtered figures kept in memory (LRU)
+    ANALYTICS_FILTER_CACHE_SIZE = int(os.environ.get("ANALYTICS_FILTER_CACHE_SIZE", "8"))
+    ANALYTICS_FILTERED_FIGURE_CACHE_SIZE = int(os.environ.get("ANALYTICS_FILTERED_FIGURE_CACHE_SIZE", "512"))
+    GEO_MAX_RESULTS = int(os.environ.get("GEO_MAX_RESULTS", "2000"))  # cap on points per /analytics/geo response
+
+    # Clustered map tiles (/analytics/tiles/<z>/<x>/<y>): on-disk store + in-memory LRU of tile JSON
+    TILE_CACHE_DIR = os.environ.get("TILE_CACHE_DIR", str(_PROJECT_ROOT / "exported_data" / ".cache" / "tiles"))
+    TILE_CACHE_SIZE = int(os.environ.get("TILE_CACHE_SIZE", "4096"))
+    TILE_CLUSTER_MAX_ZOOM = int(os.environ.get("TILE_CLUSTER_MAX_ZOOM", "16"))  # individual points from here on
+
+    # Per-sector wordcloud PNGs: on-disk store + in-memory LRU of rendered images
+    WORDCLOUD_CACHE_DIR = os.environ.get("WORDCLOUD_CACHE_DIR", str(_PROJECT_ROOT / "exported_data" / ".cache" / "wordclouds"))
+    WORDCLOUD_CACHE_SIZE = int(os.environ.get("WORDCLOUD_CACHE_SIZE", "32"))
+
+    # `flask analytics etl`: rebuild exported_data/ and app/static/exports/ from Dataset/ in
+    # chunks of ETL_CHUNK_SIZE rows, independent stages in ETL_WORKERS processes (0 = one per core)
+    ETL_CHUNK_SIZE = int(os.environ.get("ETL_CHUNK_SIZE", "50000"))
+    ETL_WORKERS = int(os.environ.get("ETL_WORKERS", "0"))
+
+    # New listings (POST /analytics/ingest, `flask analytics ingest`): appended to the dataset with
+    # incrementally updated aggregates (persisted in INGEST_STATE_DIR). The route is off by default.
+    ANALYTICS_INGEST_ENABLED = os.environ.get("ANALYTICS_INGEST_ENABLED", "0") == "1"
+    ANALYTICS_INGEST_MAX_ROWS = int(os.environ.get("ANALYTICS_INGEST_MAX_ROWS", "50000"))
+    INGEST_STATE_DIR = os.environ.get("INGEST_STATE_DIR", str(_PROJECT_ROOT / "exported_data" / ".cache" / "ingest"))
+
+    # /predict/batch: rows per request and rows per model.predict() call
+    PREDICT_BATCH_MAX_ROWS = int(os.environ.get("PREDICT_BATCH_MAX_ROWS", "50000"))
+    PREDICT_BATCH_CHUNK_SIZE = int(os.environ.get("PREDICT_BATCH_CHUNK_SIZE", "5000"))
+    # Background bulk scoring (/predict/jobs): SQLite job table + results under SCORING_JOBS_DIR
+    SCORING_JOBS_DIR = os.environ.get("SCORING_JOBS_DIR", str(_PROJECT_ROOT / "exported_data" / ".cache" / "jobs"))
+    # Scoring processes per web worker; 0 = cores / WEB_WORKERS (gunicorn's WEB_CONCURRENCY)
+    SCORING_JOBS_WORKERS = int(os.environ.get("SCORING_JOBS_WORKERS", "0"))
+    WEB_WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+    SCORING_JOBS_CHUNK_SIZE = int(os.environ.get("SCORING_JOBS_CHUNK_SIZE", "5000"))
+    SCORING_JOBS_MAX_ROWS = int(os.environ.get("SCORING_JOBS_MAX_ROWS", "1000000"))
+    WHATIF_MAX_CELLS = int(os.environ.get("WHATIF_MAX_CELLS", "10000"))  # /predict/whatif grid size limit
+
+    # /predict result cache (LRU + TTL, cleared when the model file changes); size 0 disables it
+    PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "4096"))
+    PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))  # seconds, 0 = no expiry
+    PREDICTION_CACHE_AREA_BUCKET = float(os.environ.get("PREDICTION_CACHE_AREA_BUCKET", "0"))  # sqft, 0 = exact
+
+    # Recommender similarity index (sparse .npy arrays, memory-mapped); "" keeps it in memory only
+    RECOMMENDER_INDEX_DIR = os.environ.get("RECOMMENDER_INDEX_DIR", str(_PROJECT_ROOT / "exported_data" / ".cache" / "recommender"))
+    RECOMMENDER_MAX_K = int(os.environ.get("RECOMMENDER_MAX_K", "50"))
+    # Listing-level recommendations: "lsh" (random-projection ANN), "exact" brute force,
+    # or "auto" (exact below RECOMMENDER_ANN_MIN_ROWS, where a matrix-vector product is already sub-ms)
+    RECOMMENDER_ANN_BACKEND = os.environ.get("RECOMMENDER_ANN_BACKEND", "auto")
+    RECOMMENDER_ANN_MIN_ROWS = int(os.environ.get("RECOMMENDER_ANN_MIN_ROWS", "20000"))
+    RECOMMENDER_LSH_TABLES = int(os.environ.get("RECOMMENDER_LSH_TABLES", "8"))
+    RECOMMENDER_LSH_BITS = int(os.environ.get("RECOMMENDER_LSH_BITS", "12"))
+    RECOMMENDER_LSH_PROBES = int(os.environ.get("RECOMMENDER_LSH_PROBES", "1"))  # multi-probe Hamming radius
\ No newline at end of file
@@ -1,49 +1,369 @@
 # app/routes/analytics_routes.py
 
-from flask import Blueprint, render_template, request, current_app, abort
+import io
+import time
+from pathlib import Path
+
+import click
+from flask import Blueprint, render_template, request, current_app, abort, send_file, jsonify
+from plotly.offline import get_plotlyjs_version
 
 from app.utils.analytics_loader import (
-    load_visualization_data,
-    build_all_figures,
+    FIGURE_BUILD_MODES,
+    FIGURE_BUILDERS,
+    build_figures,
+    export_binary_datasets,
+    get_visualization_data,
+    get_dataset_version,
     get_sector_options,
-    generate_wordcloud_base64,
+    get_plotly_template_json,
+)
+from app.utils.compression import accepts_gzip
+from app.utils.etl_pipeline import PipelineError, pipeline_stages, run_pipeline
+from app.utils.figure_cache import get_figure, get_figure_gzip
+from app.utils.ingestion import IngestError, ingest_listings, parse_listing_payload
+from app.utils.map_tiles import TileError, get_tile
+from app.utils.row_filters import (
+    FILTER_DIMENSIONS, RANGE_FILTERS, FilterError, filter_key, get_row_index, parse_filters,
 )
+from app.utils.spatial_index import get_spatial_index
+from app.utils.stats_cube import CUBE_DIMENSIONS, get_stats_cube
+from app.utils.term_counts import export_sector_term_counts, get_sector_term_counts, term_counts_path
+from app.utils.wordcloud_cache import get_wordcloud_png, prebuild_wordclouds
 
 analytics_bp = Blueprint("analytics", __name__, url_prefix="/analytics")
 
+FIGURE_MAX_AGE = 3600  # seconds; the ETag (dataset version) handles revalidation
+
 
 @analytics_bp.route("/", methods=["GET", "POST"])
 def analytics():
     try:
-        df, group_df, sector_feature_map = load_visualization_data()
+        df, group_df, sector_feature_map = get_visualization_data()
         current_app.logger.info(f"[analytics] df rows: {len(df)}, group_df rows: {len(group_df)}")
     except Exception as e:
         current_app.logger.exception("Failed to load analytics data", exc_info=e)
         abort(500, description=f"Failed to load analytics data: {e}")
 
-    figs = build_all_figures(df, group_df)
-
     sectors = get_sector_options(sector_feature_map, df)
-    selected_sector = request.values.get("sector", sectors[0] if sectors else None)
-    sector_text = sector_feature_map.get(selected_sector, "") if selected_sector else ""
-    wordcloud_img = generate_wordcloud_base64(sector_text)
+    map_center = (28.45, 77.02)
+    try:
+        listings = get_spatial_index("listings")
+        if len(listings):
+            map_center = (float(listings.lat.mean()), float(listings.lon.mean()))
+    except Exception as e:
+        current_app.logger.warning(f"[analytics] spatial index unavailable, using the default map centre: {e}")
+    try:
+        filters = parse_filters(request.values)
+    except FilterError as e:
+        abort(400, description=str(e))
+    # The wordcloud follows the first filtered sector unless one is picked explicitly
+    selected_sector = request.values.get("wordcloud") or next(iter(filters.get("sector", ())), None)
+    if selected_sector is None:
+        selected_sector = sectors[0] if sectors else None
+    row_index = get_row_index()
 
+    # Figures and the wordcloud image are fetched by the page from their own cacheable URLs
     return render_template(
         "analytics.html",
-        # Core figs
-        map_html=figs["map_html"],
-        scatter_html=figs["scatter_html"],
-        box_html=figs["box_html"],
-        pie_html=figs["pie_html"],
-        # New insights
-        hist_psf_html=figs["hist_psf_html"],
-        sector_bar_psf_html=figs["sector_bar_psf_html"],
-        violin_bhk_psf_html=figs["violin_bhk_psf_html"],
-        area_psf_scatter_html=figs["area_psf_scatter_html"],
-        luxury_psf_scatter_html=figs["luxury_psf_scatter_html"],
-        corr_heatmap_html=figs["corr_heatmap_html"],
+        plotlyjs_version=get_plotlyjs_version(),
+        plotly_template_json=get_plotly_template_json(),
+        dataset_version=get_dataset_version(),
+        map_center=map_center,
+        # Filters (sent along with every figure URL)
+        filter_args=_filter_args(filters),
+        filter_options={dim: row_index.levels[dim] for dim in FILTER_DIMENSIONS},
+        price_range=row_index.value_range("price"),
+        filtered_count=row_index.count(filters) if filters else row_index.n,
+        total_count=row_index.n,
         # Wordcloud
         sectors=sectors,
         selected_sector=selected_sector,
-        wordcloud_image_data=wordcloud_img,
-    )
\ No newline at end of file
+    )
+
+
+def _filter_args(filters):
+    """Filters back as query args (url_for keyword arguments)."""
+    args = {dim: list(values) for dim, values in filters.items() if dim in FILTER_DIMENSIONS}
+    for col in RANGE_FILTERS:
+        if col in filters:
+            for suffix, bound in zip(("min", "max"), filters[col]):
+                if bound is not None:
+                    args[f"{col}_{suffix}"] = bound
+    return args
+
+
+@analytics_bp.route("/matches")
+def matches():
+    """Number of listings matching the dashboard filters (same query args as the page)."""
+    try:
+        filters = parse_filters(request.args)
+    except FilterError as e:
+        return jsonify({"error": str(e)}), 400
+    index = get_row_index()
+    return jsonify({"filters": filters, "key": filter_key(filters), "count": index.count(filters), "total": index.n})
+
+
+@analytics_bp.route("/fig/<name>")
+def figure(name):
+    """Figure JSON for the whole dataset, or for the listings matching the filter query args."""
+    if name not in FIGURE_BUILDERS:
+        abort(404, description=f"Unknown figure: {name}")
+    try:
+        filters = parse_filters(request.args)
+    except FilterError as e:
+        abort(400, description=str(e))
+    try:
+        version = get_dataset_version()
+        if accepts_gzip():
+            payload = get_figure_gzip(name, "json", version, filters)
+        else:
+            payload = get_figure(name, "json", version, filters)
+    except Exception as e:
+        current_app.logger.exception(f"Failed to build figure {name}", exc_info=e)
+        abort(500, description=f"Failed to build figure {name}: {e}")
+
+    resp = current_app.response_class(payload, mimetype="application/json")
+    etag = f"{version}-{name}-{filter_key(filters)}" if filters else f"{version}-{name}"
+    if isinstance(payload, bytes):
+        resp.headers["Content-Encoding"] = "gzip"
+        etag += "-gz"  # a strong ETag names one exact body, so each encoding gets its own
+    resp.vary.add("Accept-Encoding")
+    resp.set_etag(etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = FIGURE_MAX_AGE
+    return resp.make_conditional(request)
+
+
+@analytics_bp.route("/wordcloud/<path:sector>.png")
+def wordcloud(sector):
+    try:
+        version = get_dataset_version()
+        png = get_wordcloud_png(sector, version)
+    except KeyError:
+        abort(404, description=f"Unknown sector: {sector}")
+    except Exception as e:
+        current_app.logger.exception(f"Failed to render wordcloud for {sector}", exc_info=e)
+        abort(500, description=f"Failed to render wordcloud: {e}")
+
+    resp = send_file(io.BytesIO(png), mimetype="image/png", max_age=FIGURE_MAX_AGE, etag=f"{version}-{sector}")
+    resp.cache_control.public = True
+    return resp.make_conditional(request)
+
+
+@analytics_bp.route("/amenities")
+def amenities():
+    """Most frequent amenity terms, overall or for ?sector=...; ?top=N (default 20)."""
+    sector = request.args.get("sector") or None
+    top = min(max(request.args.get("top", 20, type=int), 1), 500)
+    counts = get_sector_term_counts()
+    if sector is not None and sector not in counts:
+        abort(404, description=f"Unknown sector: {sector}")
+    return jsonify({"sector": sector, "terms": counts.top_terms(sector, top)})
+
+
+@analytics_bp.route("/stats")
+def stats():
+    """
+    Precomputed listing statistics (count, mean, p10..p90 of price and price_per_sqft):
+      /analytics/stats?sector=&bedRoom=&property_type=&agePossession=&luxury=   one cell
+      /analytics/stats?by=<dimension>[&<filters>]                             one cell per value
+    """
+    filters = {dim: request.args[dim] for dim in CUBE_DIMENSIONS if request.args.get(dim)}
+    by = request.args.get("by")
+    cube = get_stats_cube()
+    if by is not None:
+        if by not in CUBE_DIMENSIONS:
+            return jsonify({"error": f"'by' must be one of: {', '.join(CUBE_DIMENSIONS)}"}), 400
+        groups = [{by: label, **cell} for label, cell in cube.breakdown(by, **filters)]
+        return jsonify({"filters": filters, "by": by, "groups": groups})
+    cell = cube.cell(**filters)
+    if not cell["count"]:
+        return jsonify({"error": "No listings match these filters", "filters": filters}), 404
+    return jsonify({"filters": filters, "stats": cell})
+
+
+@analytics_bp.route("/ingest", methods=["POST"])
+def ingest():
+    """
+    Append new listings (JSON records or CSV body) to the analytics dataset; ?dry_run=1 only
+    validates them. 404 unless ANALYTICS_INGEST_ENABLED.
+    """
+    if not current_app.config.get("ANALYTICS_INGEST_ENABLED"):
+        abort(404)
+    try:
+        frame = parse_listing_payload(
+            request.get_data(),
+            request.content_type,
+            max_rows=current_app.config.get("ANALYTICS_INGEST_MAX_ROWS", 50000),
+        )
+        report = ingest_listings(frame, dry_run=request.args.get("dry_run") == "1")
+    except IngestError as e:
+        return jsonify({"error": str(e), "errors": e.errors}), 400
+    return jsonify(report)
+
+
+@analytics_bp.route("/tiles/<int:z>/<int:x>/<int:y>")
+def tile(z, x, y):
+    """Clustered points of one map tile (?layer=listings|sectors), as compact JSON."""
+    layer = request.args.get("layer", "listings")
+    try:
+        version = get_dataset_version()
+        payload = get_tile(layer, z, x, y, version)
+    except KeyError:
+        abort(404, description=f"Unknown layer: {layer}")
+    except TileError as e:
+        abort(404, description=str(e))
+
+    resp = current_app.response_class(payload, mimetype="application/json")
+    resp.set_etag(f"{version}-{layer}-{z}-{x}-{y}")
+    resp.cache_control.public = True
+    resp.cache_control.max_age = FIGURE_MAX_AGE
+    return resp.make_conditional(request)
+
+
+def _geo_args(*names):
+    """Required float query args; ValueError names the first missing/invalid one."""
+    values = []
+    for name in names:
+        value = request.args.get(name, type=float)
+        if value is None:
+            raise ValueError(f"'{name}' is required and must be a number")
+        values.append(value)
+    return values
+
+
+def _geo_limit(default=None):
+    max_results = current_app.config.get("GEO_MAX_RESULTS", 2000)
+    return min(max(request.args.get("limit", default or max_results, type=int), 1), max_results)
+
+
+@analytics_bp.route("/geo/<kind>/<query>")
+def geo(kind, query):
+    """
+    Spatial lookups over listings (data_viz_full.csv) or sectors (grouped_sector_data.csv):
+      /analytics/geo/<kind>/nearest?lat=&lon=&k=
+      /analytics/geo/<kind>/radius?lat=&lon=&radius_m=[&limit=]
+      /analytics/geo/<kind>/bbox?south=&west=&north=&east=[&limit=]
+    """
+    try:
+        index = get_spatial_index(kind)
+    except KeyError:
+        abort(404, description=f"Unknown dataset: {kind}")
+
+    try:
+        if query == "nearest":
+            lat, lon = _geo_args("lat", "lon")
+            hits = index.nearest(lat, lon, _geo_limit(request.args.get("k", 10, type=int)))
+            total = len(hits)
+        elif query == "radius":
+            lat, lon, radius_m = _geo_args("lat", "lon", "radius_m")
+            total, hits = index.within_radius(lat, lon, max(radius_m, 0.0), _geo_limit())
+        elif query == "bbox":
+            south, west, north, east = _geo_args("south", "west", "north", "east")
+            total, hits = index.in_bbox(south, west, north, east, _geo_limit())
+        else:
+            abort(404, description=f"Unknown spatial query: {query}")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"total": total, "returned": len(hits), "truncated": len(hits) < total, "results": hits})
+
+
+@analytics_bp.cli.command("build-figures")
+@click.option("--mode", type=click.Choice(FIGURE_BUILD_MODES), help="Override ANALYTICS_BUILD_MODE.")
+@click.option("--timeout", type=float, help="Override ANALYTICS_BUILD_TIMEOUT (seconds).")
+@click.option("--fmt", type=click.Choice(["json", "html"]), default="json", show_default=True)
+def build_figures_command(mode, timeout, fmt):
+    """Build every analytics figure from scratch and report each builder's time (nothing is cached)."""
+    df, group_df, _ = get_visualization_data()
+    t0 = time.perf_counter()
+    payloads, timings = build_figures(df, group_df, fmt=fmt, mode=mode, timeout=timeout)
+    total = time.perf_counter() - t0
+    for name, t in timings.items():
+        seconds = f"{t['seconds']:.3f}s" if t["seconds"] is not None else "-"
+        click.echo(f"  {name:<20} {t['status']:<8} {seconds:>9}  {len(payloads[name]):>8} bytes {t.get('error', '')}")
+    built = sum(t["seconds"] or 0 for t in timings.values())
+    click.echo(f"{len(timings)} figures in {total:.2f}s wall ({built:.2f}s of builder time)")
+
+
+@analytics_bp.cli.command("build-wordclouds")
+def build_wordclouds_command():
+    """Render every sector's wordcloud PNG into WORDCLOUD_CACHE_DIR."""
+    count = prebuild_wordclouds()
+    click.echo(f"Built {count} sector wordclouds.")
+
+
+@analytics_bp.cli.command("export-binary")
+def export_binary_command():
+    """Write typed Feather copies of the analytics datasets (needs pyarrow)."""
+    try:
+        paths = export_binary_datasets()
+    except ImportError as e:
+        raise click.ClickException(f"pyarrow is required: {e}")
+    for path in paths:
+        click.echo(f"Wrote {path}")
+
+
+@analytics_bp.cli.command("export-term-counts")
+def export_term_counts_command():
+    """Precompute per-sector wordcloud term counts next to the sector feature map."""
+    _, _, sector_feature_map = get_visualization_data()
+    path = term_counts_path()
+    counts = export_sector_term_counts(sector_feature_map, path)
+    click.echo(f"Wrote {path} ({len(counts)} sectors, {len(counts.vocab)} terms, {path.stat().st_size} bytes)")
+
+
+@analytics_bp.cli.command("etl")
+@click.option("--stage", "stages", multiple=True, help="Run only this stage (repeatable); also the only way to run a stage the default run leaves out.")
+@click.option("--force", is_flag=True, help="Rebuild even when inputs are unchanged.")
+@click.option("--workers", type=int, help="Override ETL_WORKERS.")
+@click.option("--chunk-size", type=int, help="Override ETL_CHUNK_SIZE (rows).")
+def etl_command(stages, force, workers, chunk_size):
+    """Regenerate the analytics datasets and static exports from Dataset/, skipping unchanged stages."""
+    root = Path(current_app.root_path).parent
+    if stages:
+        known = [s.name for s in pipeline_stages(root)]
+        for name in stages:
+            if name not in known:
+                raise click.BadParameter(f"{name!r} (choose from {', '.join(known)})", param_hint="--stage")
+    try:
+        reports = run_pipeline(
+            root,
+            only=stages or None,
+            force=force,
+            workers=workers if workers is not None else current_app.config.get("ETL_WORKERS", 0),
+            chunk_size=chunk_size or current_app.config.get("ETL_CHUNK_SIZE", 50000),
+            log=click.echo,
+        )
+    except PipelineError as e:
+        raise click.ClickException(str(e))
+    failed = [r["stage"] for r in reports if r["status"] in ("failed", "blocked")]
+    if failed:
+        raise click.ClickException(f"Stage(s) not rebuilt: {', '.join(failed)}")
+    ran = sum(r["status"] == "ran" for r in reports)
+    click.echo(f"{ran} stage(s) rebuilt, {len(reports) - ran} up to date.")
+
+
+@analytics_bp.cli.command("ingest")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--dry-run", is_flag=True, help="Only validate the listings.")
+def ingest_command(path, dry_run):
+    """Append the listings in a CSV or JSON file to the analytics dataset."""
+    content_type = "text/csv" if path.lower().endswith(".csv") else "application/json"
+    try:
+        frame = parse_listing_payload(Path(path).read_bytes(), content_type,
+                                      current_app.config.get("ANALYTICS_INGEST_MAX_ROWS", 50000))
+        report = ingest_listings(frame, dry_run=dry_run)
+    except IngestError as e:
+        for row, messages in sorted(e.errors.items())[:20]:
+            click.echo(f"  row {row}: {'; '.join(messages)}")
+        raise click.ClickException(str(e))
+    if dry_run:
+        click.echo(f"{report['rows']} listings are valid (nothing written).")
+        return
+    for sector, summary in report["sectors"].items():
+        price = summary["price"]
+        click.echo(f"  {sector:<20} {summary['listings']:>6} listings  mean {price['mean']}  median ~{price['p50']} Cr")
+    click.echo(f"Ingested {report['rows']} listings in {report['seconds']:.3f}s (dataset version {report['version']}); "
+               f"caches: {report['caches']}")
@@ -1,6 +1,17 @@
-from flask import Blueprint, render_template, request, flash
-from ..utils.model_loader import get_model, get_allowed_values, get_numeric_hints
+import click
+from flask import (
+    Blueprint, render_template, request, flash, current_app, jsonify, stream_with_context, send_file, url_for, abort,
+)
+from ..utils.model_loader import get_model, get_allowed_values, get_numeric_hints, export_mmap_model, load_training_data
 from ..utils.data_helper import validate_and_prepare, convert_crore_to_inr, format_price
+from ..utils.prediction_cache import predict_price, get_cache_stats
+from ..utils.compiled_model import CompiledModel, check_parity
+from ..utils.what_if import WhatIfError, run_what_if
+from ..utils.scoring_jobs import JobError, job_settings, submit_job, get_job, get_result_path
+from ..utils.batch_prediction import (
+    STREAM_FORMATS, BatchInputError, parse_batch_payload, iter_batch_predictions, results_to_csv,
+    results_to_ndjson,
+)
 
 prediction_bp = Blueprint("prediction", __name__)
 
@@ -18,11 +29,10 @@ def predict():
 
     if request.method == "POST":
         form_state.update(request.form.to_dict())
-        df, errors, _clean = validate_and_prepare(form_state)
+        _df, errors, clean = validate_and_prepare(form_state)
         if not errors:
             try:
-                model = get_model()
-                y_crore = float(model.predict(df)[0])  # model outputs crore
+                y_crore = predict_price(clean)  # model outputs crore; repeat queries hit the cache
                 amount_in_inr = convert_crore_to_inr(y_crore)
                 fp = format_price(amount_in_inr)
                 result = {
@@ -37,4 +47,115 @@ def predict():
             for e in errors:
                 flash(e, "danger")
 
-    return render_template("prediction.html", choices=choices, hints=hints, result=result, form_state=form_state)
\ No newline at end of file
+    return render_template("prediction.html", choices=choices, hints=hints, result=result, form_state=form_state)
+
+@prediction_bp.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """
+    Score many properties in one request. Body: JSON records or CSV (Content-Type: text/csv).
+    Streams one result per input row, as NDJSON or CSV (?format=csv, default follows the input).
+    """
+    is_csv = (request.mimetype or "").endswith("csv")
+    out_format = request.args.get("format", "csv" if is_csv else "ndjson")
+    if out_format not in STREAM_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(STREAM_FORMATS)}"}), 400
+    try:
+        records = parse_batch_payload(
+            request.get_data(),
+            request.content_type,
+            max_rows=current_app.config.get("PREDICT_BATCH_MAX_ROWS", 50000),
+        )
+    except BatchInputError as e:
+        return jsonify({"error": str(e)}), 400
+
+    chunks = iter_batch_predictions(records, current_app.config.get("PREDICT_BATCH_CHUNK_SIZE", 5000))
+    if out_format == "csv":
+        body, mimetype = results_to_csv(chunks), "text/csv"
+    else:
+        body, mimetype = results_to_ndjson(chunks), "application/x-ndjson"
+    return current_app.response_class(stream_with_context(body), mimetype=mimetype)
+
+
+@prediction_bp.route("/predict/jobs", methods=["POST"])
+def submit_scoring_job():
+    """
+    Queue a bulk scoring job (CSV or JSON body, or a multipart "file" upload).
+    Returns 202 with the job id; poll /predict/jobs/<id>, then fetch /predict/jobs/<id>/result.
+    """
+    upload = request.files.get("file")
+    raw = upload.read() if upload else request.get_data()
+    content_type = "text/csv" if upload else request.content_type
+    try:
+        records = parse_batch_payload(raw, content_type, current_app.config.get("SCORING_JOBS_MAX_ROWS", 1000000))
+        job_id = submit_job(job_settings(current_app.config), records, request.args.get("format", "csv"))
+    except (BatchInputError, JobError) as e:
+        return jsonify({"error": str(e)}), 400
+    status_url = url_for("prediction.scoring_job_status", job_id=job_id)
+    return jsonify({"job_id": job_id, "status_url": status_url}), 202, {"Location": status_url}
+
+
+@prediction_bp.route("/predict/jobs/<job_id>")
+def scoring_job_status(job_id):
+    job = get_job(job_settings(current_app.config), job_id)
+    if job is None:
+        abort(404, description=f"Unknown job: {job_id}")
+    if job["status"] == "done":
+        job["result_url"] = url_for("prediction.scoring_job_result", job_id=job_id)
+    return jsonify(job)
+
+
+@prediction_bp.route("/predict/jobs/<job_id>/result")
+def scoring_job_result(job_id):
+    path = get_result_path(job_settings(current_app.config), job_id)
+    if path is None or not path.exists():
+        abort(404, description=f"No result for job {job_id} (unknown or not finished)")
+    return send_file(path, as_attachment=True, download_name=f"prices-{job_id}{path.suffix}")
+
+
+@prediction_bp.route("/predict/whatif", methods=["POST"])
+def predict_what_if():
+    """
+    Body: {"base": {form fields}, "axes": {"built_up_area": [1200, 1500] | {"start", "stop", "num"},
+           "floor_category": "all", ...}, "interval": 0.8 | null}
+    Scores the whole grid in one model call; returns price matrices indexed by the axes.
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        if not isinstance(payload, dict):
+            raise WhatIfError("Body must be a JSON object")
+        result = run_what_if(
+            payload.get("base", {}),
+            payload.get("axes", {}),
+            level=payload.get("interval", 0.8),
+            max_cells=current_app.config.get("WHATIF_MAX_CELLS", 10000),
+        )
+    except WhatIfError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+@prediction_bp.route("/predict/cache-stats")
+def prediction_cache_stats():
+    return jsonify(get_cache_stats())
+
+
+@prediction_bp.cli.command("export-mmap-model")
+def export_mmap_model_command():
+    """Write the uncompressed, memory-mappable copy of the price model."""
+    path = export_mmap_model()
+    click.echo(f"Wrote {path}")
+
+
+@prediction_bp.cli.command("check-compiled")
+@click.option("--rows", default=0, help="Score only the first N training rows (0 = all).")
+@click.option("--rtol", default=1e-4, help="Allowed relative difference per row.")
+def check_compiled_command(rows, rtol):
+    """Parity of the compiled inference path against the full pipeline on the training CSV."""
+    X, _y = load_training_data()
+    if rows:
+        X = X.head(rows)
+    model = get_model()
+    result = check_parity(model, CompiledModel(model), X, rtol=rtol)
+    click.echo(result)
+    if not result["ok"]:
+        raise SystemExit(1)
\ No newline at end of file
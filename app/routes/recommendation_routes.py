@@ -1,5 +1,117 @@
-from flask import Blueprint, render_template
-recommendation_bp = Blueprint("recommendation", __name__)
+import click
+import numpy as np
+from flask import Blueprint, render_template, request, current_app, jsonify, abort
+
+from ..utils.ann_index import benchmark, make_index
+from ..utils.recommendation_engine import (
+    BLOCKS, DEFAULT_WEIGHTS, ListingFeaturizer, ann_params, build_recommendation_index, get_listing_index,
+    get_recommendation_index,
+)
+
+recommendation_bp = Blueprint("recommendation", __name__, url_prefix="/recommend")
+
+
+def _query_options():
+    """(k, weights) from the query string: ?k=5&w_facilities=30&w_price=20&w_location=8"""
+    max_k = current_app.config.get("RECOMMENDER_MAX_K", 50)
+    k = min(max(request.args.get("k", 5, type=int), 1), max_k)
+    weights = {b: request.args.get(f"w_{b}", DEFAULT_WEIGHTS[b], type=float) for b in BLOCKS}
+    return k, weights
+
+
 @recommendation_bp.route("/")
 def recommendation():
-    return render_template("recommendation.html")
+    try:
+        index = get_recommendation_index()
+    except Exception as e:
+        current_app.logger.exception("Failed to load recommender index", exc_info=e)
+        abort(500, description=f"Failed to load recommender index: {e}")
+
+    k, weights = _query_options()
+    selected = request.args.get("property") or (index.names[0] if len(index) else None)
+    results = index.recommend(selected, k, weights) if selected in index else []
+    return render_template(
+        "recommendation.html",
+        properties=sorted(index.names),
+        selected=selected,
+        k=k,
+        weights=weights,
+        results=results,
+    )
+
+
+@recommendation_bp.route("/api")
+def recommend_api():
+    """JSON top-k: /recommend/api?property=<PropertyName>&k=5[&w_facilities=..&w_price=..&w_location=..]"""
+    name = request.args.get("property", "")
+    k, weights = _query_options()
+    try:
+        index = get_recommendation_index()
+    except Exception as e:
+        current_app.logger.exception("Failed to load recommender index", exc_info=e)
+        return jsonify({"error": f"Failed to load recommender index: {e}"}), 503
+    if name not in index:
+        return jsonify({"error": f"Unknown property: {name}"}), 404
+    return jsonify({
+        "property": name,
+        "k": k,
+        "weights": weights,
+        "index_version": index.version,
+        "results": index.recommend(name, k, weights),
+    })
+
+
+@recommendation_bp.route("/api/listing")
+def recommend_listing_api():
+    """JSON top-k similar listings (rows of data_viz_full.csv): /recommend/api/listing?row=<n>&k=10"""
+    row = request.args.get("row", -1, type=int)
+    k, _ = _query_options()
+    try:
+        index = get_listing_index()
+    except Exception as e:
+        current_app.logger.exception("Failed to load listing index", exc_info=e)
+        return jsonify({"error": f"Failed to load listing index: {e}"}), 503
+    try:
+        results = index.recommend(row, k)
+    except IndexError:
+        return jsonify({"error": f"Unknown listing row: {row}"}), 404
+    return jsonify({"row": row, "k": k, "backend": index.index.name, "results": results})
+
+
+@recommendation_bp.cli.command("build-index")
+def build_index_command():
+    """Rebuild the recommender similarity index from Dataset/appartments.csv."""
+    index = build_recommendation_index()
+    click.echo(f"Indexed {len(index)} projects (version {index.version}).")
+
+
+@recommendation_bp.cli.command("ann-benchmark")
+@click.option("--k", default=10, show_default=True)
+@click.option("--queries", default=200, show_default=True, help="Random stored vectors to query.")
+@click.option("--size", default=0, help="Grow the index to this many vectors with jittered copies of the listings.")
+@click.option("--tables", type=int, help="Override RECOMMENDER_LSH_TABLES.")
+@click.option("--bits", type=int, help="Override RECOMMENDER_LSH_BITS.")
+@click.option("--probes", type=int, help="Override RECOMMENDER_LSH_PROBES.")
+def ann_benchmark_command(k, queries, size, tables, bits, probes):
+    """Recall@k and latency of the LSH listing index against exact search."""
+    from ..utils.analytics_loader import get_visualization_data
+
+    df, _, _ = get_visualization_data()
+    vectors = ListingFeaturizer().fit(df).transform(df)
+    rng = np.random.default_rng(0)
+    if size > len(vectors):
+        extra = vectors[rng.integers(0, len(vectors), size - len(vectors))]
+        vectors = np.vstack([vectors, extra + rng.normal(0, 0.05, extra.shape).astype(np.float32)])
+
+    backend, params = ann_params({**current_app.config, "RECOMMENDER_ANN_BACKEND": "lsh"})
+    overrides = {"tables": tables, "bits": bits, "probes": probes}
+    params.update({key: v for key, v in overrides.items() if v is not None})
+    index = make_index(backend, vectors.shape[1], **params)
+    # Insert in batches to exercise the incremental path
+    for start in range(0, len(vectors), 1000):
+        index.add(vectors[start:start + 1000])
+
+    report = benchmark(index, rng.choice(len(vectors), min(queries, len(vectors)), replace=False), k)
+    click.echo(f"{backend} {params}")
+    for key, value in report.items():
+        click.echo(f"  {key}: {value}")
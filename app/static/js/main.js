@@ -0,0 +1,258 @@
+// app/static/js/main.js
+
+// Lazily fetch analytics figures (JSON specs from /analytics/fig/<name>) as their cards scroll into view.
+(function () {
+  const containers = document.querySelectorAll(".lazy-fig[data-fig-url]");
+  if (!containers.length) return;
+
+  // Figure specs are sent without their layout template; the page embeds the shared one once.
+  const templateEl = document.getElementById("plotly-template");
+  const sharedTemplate = templateEl ? JSON.parse(templateEl.textContent) : null;
+
+  function showAlert(el, html) {
+    el.style.minHeight = "";
+    el.innerHTML = html;
+  }
+
+  function loadFigure(el) {
+    if (el.dataset.loaded) return;
+    el.dataset.loaded = "1";
+
+    fetch(el.dataset.figUrl, { headers: { Accept: "application/json" } })
+      .then((resp) => {
+        if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+        return resp.json();
+      })
+      .then((payload) => {
+        if (payload.html) {
+          showAlert(el, payload.html);
+          return;
+        }
+        const fig = payload.figure;
+        fig.layout = fig.layout || {};
+        if (sharedTemplate && !fig.layout.template) fig.layout.template = sharedTemplate;
+        el.innerHTML = "";
+        return Plotly.newPlot(el, fig.data, fig.layout, { responsive: true });
+      })
+      .catch((err) => {
+        showAlert(el, `<div class='alert alert-danger mb-0'>Failed to load chart (${err.message}).</div>`);
+      });
+  }
+
+  const observer =
+    "IntersectionObserver" in window
+      ? new IntersectionObserver(
+          (entries) => {
+            entries.forEach((entry) => {
+              if (!entry.isIntersecting) return;
+              observer.unobserve(entry.target);
+              loadFigure(entry.target);
+            });
+          },
+          { rootMargin: "200px 0px" }
+        )
+      : null;
+  const watch = (el) => (observer ? observer.observe(el) : loadFigure(el));
+  containers.forEach(watch);
+
+  // Dashboard filters: re-point every figure at the filtered URL and reload it, without a page reload.
+  const form = document.querySelector("form[data-analytics-filters]");
+  if (!form) return;
+  const filterNames = new Set(Array.from(form.elements, (f) => f.name).filter(Boolean));
+  const countEl = form.querySelector("[data-filter-count]");
+
+  function applyFilters(params) {
+    containers.forEach((el) => {
+      const url = new URL(el.dataset.figUrl, window.location.href);
+      filterNames.forEach((name) => url.searchParams.delete(name));
+      params.forEach((value, name) => url.searchParams.append(name, value));
+      el.dataset.figUrl = url.pathname + url.search;
+      delete el.dataset.loaded;
+      if (typeof Plotly !== "undefined") Plotly.purge(el);
+      el.innerHTML = "<div class='d-flex justify-content-center align-items-center text-muted' style='height: 100%; min-height: inherit;'><div class='spinner-border spinner-border-sm me-2' role='status'></div> Loading chart…</div>";
+      if (observer) observer.unobserve(el);
+      watch(el);
+    });
+
+    const page = new URL(window.location.href);
+    filterNames.forEach((name) => page.searchParams.delete(name));
+    params.forEach((value, name) => page.searchParams.append(name, value));
+    window.history.replaceState(null, "", page);
+
+    if (countEl && form.dataset.matchesUrl) {
+      fetch(`${form.dataset.matchesUrl}?${params}`, { headers: { Accept: "application/json" } })
+        .then((resp) => (resp.ok ? resp.json() : null))
+        .then((m) => {
+          if (m) countEl.textContent = `${m.count.toLocaleString()} / ${m.total.toLocaleString()} listings`;
+        })
+        .catch(() => {});
+    }
+  }
+
+  function formParams() {
+    const params = new URLSearchParams();
+    new FormData(form).forEach((value, name) => {
+      if (value !== "") params.append(name, value);
+    });
+    return params;
+  }
+
+  form.addEventListener("submit", (event) => {
+    event.preventDefault();
+    applyFilters(formParams());
+  });
+  const reset = form.querySelector("[data-filter-reset]");
+  if (reset) {
+    reset.addEventListener("click", (event) => {
+      event.preventDefault();
+      form.reset();
+      Array.from(form.querySelectorAll("option")).forEach((o) => (o.selected = false));
+      form.querySelectorAll("input").forEach((i) => (i.value = ""));
+      applyFilters(new URLSearchParams());
+    });
+  }
+})();
+
+// Sector wordcloud: swap the (cacheable) PNG in place instead of reloading the page.
+(function () {
+  document.querySelectorAll("select[data-wordcloud-target]").forEach((select) => {
+    const img = document.getElementById(select.dataset.wordcloudTarget);
+    select.addEventListener("change", () => {
+      const option = select.options[select.selectedIndex];
+      if (!img || !option.dataset.imgUrl) {
+        select.form.submit();
+        return;
+      }
+      img.src = option.dataset.imgUrl;
+      img.alt = `WordCloud for ${option.value}`;
+      const url = new URL(window.location.href);
+      url.searchParams.set("wordcloud", option.value);
+      window.history.replaceState(null, "", url);
+    });
+  });
+})();
+
+// Listings map: fetch clustered tiles (/analytics/tiles/{z}/{x}/{y}) for the visible area on every pan/zoom.
+(function () {
+  const el = document.querySelector(".tiled-map[data-tile-url]");
+  if (!el || typeof Plotly === "undefined") return;
+
+  const TILE_SIZE = 256;
+  const MAX_ZOOM = 20;
+  const tiles = new Map(); // "z/x/y" -> Promise<tile JSON>
+  const status = document.querySelector("[data-tile-status]");
+  const templateEl = document.getElementById("plotly-template");
+  const sharedTemplate = templateEl ? JSON.parse(templateEl.textContent) : null;
+
+  function lonToX(lon, world) {
+    return ((lon + 180) / 360) * world;
+  }
+  function latToY(lat, world) {
+    const s = Math.min(Math.max(Math.sin((lat * Math.PI) / 180), -0.9999), 0.9999);
+    return (0.5 - Math.log((1 + s) / (1 - s)) / (4 * Math.PI)) * world;
+  }
+
+  // Plotly's mapbox zoom is in 512px tiles; our tiles are 256px, i.e. one zoom level deeper.
+  function visibleTiles(center, zoom) {
+    const z = Math.max(0, Math.min(MAX_ZOOM, Math.floor(zoom) + 1));
+    const n = 2 ** z;
+    const world = TILE_SIZE * n;
+    const scale = world / (512 * 2 ** zoom); // screen px -> tile-zoom px
+    const cx = lonToX(center.lon, world);
+    const cy = latToY(center.lat, world);
+    const halfW = (el.clientWidth / 2) * scale;
+    const halfH = (el.clientHeight / 2) * scale;
+    const out = [];
+    const y0 = Math.max(0, Math.floor((cy - halfH) / TILE_SIZE));
+    const y1 = Math.min(n - 1, Math.floor((cy + halfH) / TILE_SIZE));
+    for (let tx = Math.floor((cx - halfW) / TILE_SIZE); tx <= Math.floor((cx + halfW) / TILE_SIZE); tx++) {
+      for (let ty = y0; ty <= y1; ty++) out.push([z, ((tx % n) + n) % n, ty]);
+    }
+    return out;
+  }
+
+  function fetchTile(z, x, y) {
+    const key = `${z}/${x}/${y}`;
+    if (!tiles.has(key)) {
+      const url = el.dataset.tileUrl.replace("{z}", z).replace("{x}", x).replace("{y}", y);
+      tiles.set(
+        key,
+        fetch(url, { headers: { Accept: "application/json" } })
+          .then((resp) => (resp.ok ? resp.json() : null))
+          .catch(() => null)
+      );
+    }
+    return tiles.get(key);
+  }
+
+  function column(table, name) {
+    const i = table.fields.indexOf(name);
+    return table.rows.map((r) => r[i]);
+  }
+
+  let pending = 0;
+  function refresh() {
+    const layout = el.layout.mapbox || {};
+    const center = layout.center || { lat: +el.dataset.centerLat, lon: +el.dataset.centerLon };
+    const zoom = layout.zoom != null ? layout.zoom : +el.dataset.zoom;
+    const wanted = visibleTiles(center, zoom);
+    const ticket = ++pending;
+
+    Promise.all(wanted.map(([z, x, y]) => fetchTile(z, x, y))).then((loaded) => {
+      if (ticket !== pending) return; // a newer pan/zoom superseded this one
+      const clusters = { fields: [], rows: [] };
+      const points = { fields: [], rows: [] };
+      loaded.filter(Boolean).forEach((t) => {
+        clusters.fields = t.clusters.fields;
+        points.fields = t.points.fields;
+        clusters.rows.push(...t.clusters.rows);
+        points.rows.push(...t.points.rows);
+      });
+      const counts = column(clusters, "count");
+      const total = counts.reduce((a, b) => a + b, 0) + points.rows.length;
+      Plotly.restyle(
+        el,
+        {
+          lat: [column(clusters, "lat"), column(points, "lat")],
+          lon: [column(clusters, "lon"), column(points, "lon")],
+          text: [
+            counts.map((c, i) => `${c} listings · avg ₹${column(clusters, "avg_price_per_sqft")[i]}/sqft`),
+            points.rows.map((r) => `${r[points.fields.indexOf("society")]} (${r[points.fields.indexOf("sector")]}) · ${r[points.fields.indexOf("price")]} Cr`),
+          ],
+          "marker.size": [counts.map((c) => 8 + 4 * Math.log2(c)), 7],
+          "marker.color": [column(clusters, "avg_price_per_sqft"), column(points, "price_per_sqft")],
+        },
+        [0, 1]
+      );
+      if (status) status.textContent = `${total} listings in view (${wanted.length} tiles)`;
+    });
+  }
+
+  let timer = null;
+  function scheduleRefresh() {
+    clearTimeout(timer);
+    timer = setTimeout(refresh, 150);
+  }
+
+  const marker = { colorscale: "IceFire", cmin: 3000, cmax: 30000, opacity: 0.85 };
+  const data = [
+    { type: "scattermapbox", mode: "markers", name: "Clusters", hoverinfo: "text", lat: [], lon: [], marker: { ...marker, showscale: true, colorbar: { title: "₹/sqft" } } },
+    { type: "scattermapbox", mode: "markers", name: "Listings", hoverinfo: "text", lat: [], lon: [], marker: { ...marker } },
+  ];
+  const layout = {
+    height: el.clientHeight,
+    margin: { l: 0, r: 0, t: 0, b: 0 },
+    showlegend: false,
+    mapbox: {
+      style: "open-street-map",
+      center: { lat: +el.dataset.centerLat, lon: +el.dataset.centerLon },
+      zoom: +el.dataset.zoom,
+    },
+  };
+  if (sharedTemplate) layout.template = sharedTemplate;
+
+  Plotly.newPlot(el, data, layout, { responsive: true }).then(() => {
+    el.on("plotly_relayout", scheduleRefresh);
+    refresh();
+  });
+})();
@@ -4,12 +4,26 @@ from __future__ import annotations
 
 import io
 import base64
+import hashlib
+import json
+import pickle
+import os
+import threading
+import time
+import multiprocessing
+from collections.abc import Mapping
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Tuple, List
+from typing import Callable, Dict, Iterator, Tuple, List, Optional, Union
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from flask import current_app
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+from flask import current_app, has_app_context
 
 # Headless matplotlib for servers
 import matplotlib
@@ -17,12 +31,16 @@ matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 from wordcloud import WordCloud
 
+from .stats_cube import stats_cube_for
+from .term_counts import count_terms
+
 
 def _resolve_data_file(filename: str) -> Path:
     """
     Look for files in:
       1) app/static/exports/{filename}
       2) exported_data/{filename}
+    In each place a fresh binary copy (see export_binary_datasets) wins over the file itself.
     """
     app_root = Path(current_app.root_path)  # .../app
     candidates = [
@@ -30,12 +48,119 @@ def _resolve_data_file(filename: str) -> Path:
         app_root.parent / "exported_data" / filename,
     ]
     for p in candidates:
+        binary = _binary_path(p)
+        if _binary_enabled() and binary.exists() and (not p.exists() or binary.stat().st_mtime >= p.stat().st_mtime):
+            return binary.resolve()
         if p.exists():
             return p.resolve()
     raise FileNotFoundError(f"Could not find {filename} in: {', '.join(str(c) for c in candidates)}")
 
 
-def load_visualization_data() -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, str]]:
+VISUALIZATION_FILES = ("data_viz_full.csv", "grouped_sector_data.csv", "sector_feature_map.pkl")
+
+# Typed Arrow IPC (Feather v2) copies of VISUALIZATION_FILES, written uncompressed so they can be memory-mapped
+BINARY_SUFFIX = ".feather"
+CATEGORICAL_COLUMNS = ("sector", "society", "property_type")
+
+# Process-wide dataset cache: one parsed copy per worker, keyed on (path, mtime, size).
+# "entry" is an immutable (signature, data) pair replaced in one assignment, so the lock-free
+# fast path never sees one version's signature with another version's data.
+_DATASET_CACHE: Dict[str, object] = {"entry": None}
+_DATASET_LOCK = threading.Lock()
+
+
+def _binary_path(path: Path) -> Path:
+    return path.with_suffix(BINARY_SUFFIX)
+
+
+@lru_cache(maxsize=1)
+def _binary_enabled() -> bool:
+    # pyarrow is optional: without it the CSV/pickle sources are used as before
+    if os.environ.get("ANALYTICS_BINARY_DATA", "1") != "1":
+        return False
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _read_frame(path: Path) -> pd.DataFrame:
+    if path.suffix == BINARY_SUFFIX:
+        import pyarrow.feather as feather
+        # Memory-mapped: numeric columns without nulls become views over the mapped file
+        return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+    return pd.read_csv(path, encoding="utf-8-sig")
+
+
+class SectorFeatureMap(Mapping):
+    """
+    Read-only {sector: feature text}. Backed by the Arrow copy, it is memory-mapped and only
+    the texts actually looked up are materialized; backed by the pickle, it is loaded on first use.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._data: Optional[Dict[str, str]] = None
+        self._table = None
+        self._position: Optional[Dict[str, int]] = None
+
+    def _load(self) -> None:
+        if self._position is not None or self._data is not None:
+            return
+        if self.path.suffix == BINARY_SUFFIX:
+            import pyarrow.feather as feather
+            self._table = feather.read_table(self.path, memory_map=True)
+            self._position = {s: i for i, s in enumerate(self._table.column("sector").to_pylist())}
+        else:
+            with open(self.path, "rb") as f:
+                self._data = pickle.load(f)
+
+    def __getitem__(self, sector: str) -> str:
+        self._load()
+        if self._data is not None:
+            return self._data[sector]
+        return self._table.column("text")[self._position[sector]].as_py()
+
+    def __iter__(self) -> Iterator[str]:
+        self._load()
+        return iter(self._data if self._data is not None else self._position)
+
+    def __len__(self) -> int:
+        self._load()
+        return len(self._data if self._data is not None else self._position)
+
+
+def visualization_paths() -> Tuple[Path, Path, Path]:
+    """(listings, grouped sectors, sector feature map) files the analytics dataset is loaded from."""
+    df_path, grouped_path, sector_map_path = (_resolve_data_file(f) for f in VISUALIZATION_FILES)
+    return df_path, grouped_path, sector_map_path
+
+
+def _file_signature(paths) -> Tuple[Tuple[str, int, int], ...]:
+    sig = []
+    for p in paths:
+        st = Path(p).stat()
+        sig.append((str(p), st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+# data_viz_full.csv columns the figures treat as numbers ("3+" balconies become NaN)
+NUMERIC_COLUMNS = (
+    "built_up_area", "price", "bedRoom", "price_per_sqft", "bathroom", "balcony", "floorNum", "luxury_score",
+)
+
+
+def coerce_numeric_columns(df: pd.DataFrame) -> pd.DataFrame:
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def load_visualization_data(
+    paths: Optional[Tuple[Path, Path, Path]] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, str]]:
     """
     Your files and columns:
     - grouped_sector_data.csv (map):
@@ -44,47 +169,295 @@ def load_visualization_data() -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, str
         property_type, sector, society, price, price_per_sqft, bedRoom, built_up_area,
         bathroom, balcony, floorNum, facing, agePossession, luxury_score, latitude, longitude, ...
     - sector_feature_map.pkl (wordcloud)
+
+    Each may also be its typed .feather copy (see export_binary_datasets).
+
+    Always reads from disk; request handlers should use get_visualization_data().
     """
-    df_path = _resolve_data_file("data_viz_full.csv")
-    grouped_path = _resolve_data_file("grouped_sector_data.csv")
-    sector_map_path = _resolve_data_file("sector_feature_map.pkl")
+    df_path, grouped_path, sector_map_path = paths or visualization_paths()
 
     # Load
-    df = pd.read_csv(df_path, encoding="utf-8-sig")
-    group_df = pd.read_csv(grouped_path, encoding="utf-8-sig")
-
-    import pickle
-    with open(sector_map_path, "rb") as f:
-        sector_feature_map = pickle.load(f)
+    df = _read_frame(df_path)
+    group_df = _read_frame(grouped_path)
+    sector_feature_map = SectorFeatureMap(sector_map_path)
 
     # Coerce only what we need
-    for col in [
-        "built_up_area",
-        "price",
-        "bedRoom",
-        "price_per_sqft",
-        "bathroom",
-        "balcony",
-        "floorNum",
-        "luxury_score",
-    ]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+    coerce_numeric_columns(df)
 
     for col in ["latitude", "longitude", "price_per_sqft", "built_up_area", "price"]:
-        if col in group_df.columns:
+        if col in group_df.columns and not pd.api.types.is_numeric_dtype(group_df[col]):
             group_df[col] = pd.to_numeric(group_df[col], errors="coerce")
 
     return df, group_df, sector_feature_map
 
 
+def get_visualization_data() -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, str]]:
+    """
+    Cached load_visualization_data(). Parsed once per worker process and reloaded
+    only when one of the source files changes (path, mtime or size).
+    The returned objects are shared between requests: treat them as read-only.
+    """
+    paths = visualization_paths()
+    signature = _file_signature(paths)
+    entry = _DATASET_CACHE["entry"]
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+
+    with _DATASET_LOCK:
+        # Another thread may have reloaded while we waited
+        entry = _DATASET_CACHE["entry"]
+        if entry is None or entry[0] != signature:
+            entry = (signature, load_visualization_data(paths))
+            _DATASET_CACHE["entry"] = entry
+            current_app.logger.info(f"[analytics] dataset loaded (version {_signature_version(signature)})")
+        return entry[1]
+
+
+def append_to_dataset_cache(previous_signature, rows: pd.DataFrame, group_df: pd.DataFrame) -> str:
+    """
+    Adopt listings just appended to data_viz_full.csv (and the rewritten grouped_sector_data.csv)
+    without re-reading the files: if the cache still holds the data of `previous_signature`,
+    `rows` are appended to the cached frame in place of a full reload. Returns the new version.
+    """
+    paths = visualization_paths()
+    signature = _file_signature(paths)
+    with _DATASET_LOCK:
+        entry = _DATASET_CACHE["entry"]
+        if entry is None or entry[0] != previous_signature:
+            _DATASET_CACHE["entry"] = None
+            return _signature_version(signature)
+        df, _, sector_feature_map = entry[1]
+        df = df.copy(deep=False)  # the cached frame may be in use by other requests
+        rows = coerce_numeric_columns(rows.reindex(columns=df.columns).copy())
+        for col in df.columns:
+            # Keep dictionary-encoded columns (Feather copies) dictionary-encoded
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                new = pd.Index(rows[col].dropna().unique()).difference(df[col].cat.categories)
+                if len(new):
+                    df[col] = df[col].cat.add_categories(new)
+                rows[col] = pd.Categorical(rows[col], categories=df[col].cat.categories)
+        df = pd.concat([df, rows], ignore_index=True)
+        _DATASET_CACHE["entry"] = (signature, (df, group_df, sector_feature_map))
+    current_app.logger.info(f"[analytics] appended {len(rows)} listings (version {_signature_version(signature)})")
+    return _signature_version(signature)
+
+
+def export_binary_datasets() -> List[Path]:
+    """
+    Write typed, uncompressed Feather copies next to the CSV/pickle sources: numeric columns
+    already coerced, sector/society/property_type dictionary-encoded. Loaders prefer them
+    while they are at least as new as their source. Requires pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    sources = []
+    for filename in VISUALIZATION_FILES:
+        path = _resolve_data_file(filename)
+        if path.suffix == BINARY_SUFFIX:
+            path = path.with_suffix(Path(filename).suffix)
+        sources.append(path)
+    df, group_df, sector_feature_map = load_visualization_data(tuple(sources))
+
+    tables = []
+    for frame in (df, group_df):
+        frame = frame.copy()
+        for col in CATEGORICAL_COLUMNS:
+            if col in frame.columns:
+                frame[col] = frame[col].astype("category")
+        tables.append(pa.Table.from_pandas(frame, preserve_index=False))
+    tables.append(pa.table({
+        "sector": pa.array(list(sector_feature_map.keys()), pa.string()),
+        "text": pa.array([str(v) for v in sector_feature_map.values()], pa.large_string()),
+    }))
+
+    written = []
+    for source, table in zip(sources, tables):
+        target = _binary_path(source)
+        tmp = target.with_suffix(f".{os.getpid()}.tmp")
+        feather.write_feather(table, tmp, compression="uncompressed")
+        os.replace(tmp, target)
+        written.append(target)
+    clear_dataset_cache()
+    return written
+
+
+def _signature_version(signature) -> str:
+    return hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()[:12]
+
+
+def get_dataset_version() -> str:
+    """Short stable id of the current on-disk dataset (changes whenever a source file changes)."""
+    return _signature_version(_file_signature(visualization_paths()))
+
+
+def clear_dataset_cache() -> None:
+    with _DATASET_LOCK:
+        _DATASET_CACHE["entry"] = None
+
+
+# Builders return a Plotly figure, or an alert HTML snippet when the data can't support the chart
+FigureResult = Union[go.Figure, str]
+
+
 def _fig_to_html(fig) -> str:
     # Include Plotly per figure to avoid any script-order issues
     return fig.to_html(full_html=False, include_plotlyjs="cdn")
 
 
+# Typed arrays shorter than this are left as-is (not worth it, and keeps e.g. heatmap text exact)
+COMPACT_MIN_LENGTH = 256
+
+
+def _compact_typed_array(spec: dict) -> dict:
+    """Downcast a Plotly typed-array spec ({dtype, bdata[, shape]}): integral floats -> smallest int, others -> f4."""
+    arr = np.frombuffer(base64.b64decode(spec["bdata"]), dtype=spec["dtype"])
+    if arr.dtype.kind != "f" or arr.size < COMPACT_MIN_LENGTH:
+        return spec
+    if np.isfinite(arr).all() and np.array_equal(arr, np.round(arr)):
+        lo, hi = arr.min(), arr.max()
+        for dtype in ("i1", "i2", "i4"):
+            info = np.iinfo(dtype)
+            if info.min <= lo and hi <= info.max:
+                arr = arr.astype(dtype)
+                break
+        else:
+            arr = arr.astype("f4")
+    else:
+        arr = arr.astype("f4")
+    out = dict(spec)
+    out["dtype"] = f"{arr.dtype.kind}{arr.dtype.itemsize}"
+    out["bdata"] = base64.b64encode(arr.astype(arr.dtype.newbyteorder("<")).tobytes()).decode("ascii")
+    return out
+
+
+def _compact(node):
+    if isinstance(node, dict):
+        if "bdata" in node and "dtype" in node:
+            return _compact_typed_array(node)
+        return {k: _compact(v) for k, v in node.items()}
+    if isinstance(node, list):
+        return [_compact(v) for v in node]
+    return node
+
+
+def _fig_to_json(fig) -> str:
+    """
+    Compact JSON spec: numeric arrays as (downcast) base64 typed arrays and no layout
+    template; the page ships the shared template once (see get_plotly_template_json).
+    """
+    spec = _compact(fig.to_dict())
+    spec.get("layout", {}).pop("template", None)
+    return pio.to_json(spec, validate=False)
+
+
+@lru_cache(maxsize=1)
+def get_plotly_template_json() -> str:
+    template = pio.templates[pio.templates.default].to_plotly_json()
+    return json.dumps(template, cls=PlotlyJSONEncoder, separators=(",", ":"))
+
+
+def render_figure(result: FigureResult, fmt: str = "html") -> str:
+    """Serialize a builder result: "html" -> embeddable fragment, "json" -> {"figure": spec} or {"html": alert}."""
+    if fmt == "html":
+        return result if isinstance(result, str) else _fig_to_html(result)
+    if fmt == "json":
+        if isinstance(result, str):
+            return json.dumps({"html": result})
+        return '{"figure": ' + _fig_to_json(result) + "}"
+    raise ValueError(f"Unknown figure format: {fmt}")
+
+
+# Large-data mode: above the point budget, row-level traces are sampled / binned / summarized
+DEFAULT_POINT_BUDGET = 5000
+LARGE_DATA_MODES = ("sample", "density")
+
+
+# Builder settings inside figure worker processes, which have no Flask app (see build_figures)
+_WORKER_SETTINGS: Dict[str, object] = {}
+BUILDER_SETTINGS = ("ANALYTICS_POINT_BUDGET", "ANALYTICS_LARGE_DATA_MODE")
+
+
+def _setting(name: str, default):
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return _WORKER_SETTINGS.get(name, default)
+
+
+def _point_budget() -> int:
+    return int(_setting("ANALYTICS_POINT_BUDGET", DEFAULT_POINT_BUDGET))
+
+
+def _large_data_mode() -> str:
+    mode = _setting("ANALYTICS_LARGE_DATA_MODE", "sample")
+    return mode if mode in LARGE_DATA_MODES else "sample"
+
+
+def figure_options_key() -> str:
+    """Config that changes builder output; part of every figure cache key."""
+    return f"b{_point_budget()}-{_large_data_mode()}"
+
+
+def _stratified_sample(sub: pd.DataFrame, by: Optional[str], n: int, seed: int = 42) -> pd.DataFrame:
+    """~n rows keeping each stratum's share (and at least one row per stratum)."""
+    if len(sub) <= n:
+        return sub
+    if by is None or by not in sub.columns:
+        return sub.sample(n=n, random_state=seed)
+    groups = sub.groupby(by, dropna=False, sort=False)
+    sampled = groups.sample(frac=n / len(sub), random_state=seed)
+    keep = groups.head(1)
+    return sub.loc[sampled.index.union(keep.index)]
+
+
+def _large_scatter(sub: pd.DataFrame, x: str, y: str, color: Optional[str], **kwargs) -> go.Figure:
+    """Scatter for rows above the point budget: stratified sample, or a 2D-histogram density."""
+    title = kwargs.pop("title", "")
+    if _large_data_mode() == "density":
+        # Bin server-side: px.density_heatmap would still ship every row
+        labels = kwargs.get("labels", {})
+        counts, x_edges, y_edges = np.histogram2d(sub[x].to_numpy(float), sub[y].to_numpy(float), bins=80)
+        fig = go.Figure(go.Heatmap(
+            x=(x_edges[:-1] + x_edges[1:]) / 2,
+            y=(y_edges[:-1] + y_edges[1:]) / 2,
+            z=np.where(counts.T > 0, counts.T, np.nan),
+            colorscale="Viridis",
+            colorbar=dict(title="Listings"),
+        ))
+        fig.update_layout(
+            title=f"{title} (density, {len(sub):,} listings)",
+            xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y),
+        )
+        return fig
+    sample = _stratified_sample(sub, color, _point_budget())
+    return px.scatter(sample, x=x, y=y, color=color,
+                      title=f"{title} (sample of {len(sample):,}/{len(sub):,})", **kwargs)
+
+
+def _cube_box_figure(df: pd.DataFrame, x: str, y: str, title: str, labels: Dict[str, str],
+                     max_x: Optional[float] = None) -> go.Figure:
+    """
+    Box plot from the stats cube's per-group quantiles (whiskers at p10/p90): payload and
+    build time depend on the group count, not the row count.
+    """
+    groups = [(key, cell[y]) for key, cell in stats_cube_for(df, (x,)).breakdown(x)
+              if cell[y]["n"] and (max_x is None or key <= max_x)]
+    fig = go.Figure(go.Box(
+        x=[key for key, _ in groups],
+        q1=[s["p25"] for _, s in groups], median=[s["median"] for _, s in groups], q3=[s["p75"] for _, s in groups],
+        mean=[s["mean"] for _, s in groups],
+        lowerfence=[s["p10"] for _, s in groups], upperfence=[s["p90"] for _, s in groups],
+        name=labels.get(y, y),
+    ))
+    fig.update_layout(
+        title=f"{title} ({sum(s['n'] for _, s in groups):,} listings, p10-p90 whiskers)",
+        xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y),
+    )
+    return fig
+
+
 # Existing figures
-def build_scatter_map(group_df: pd.DataFrame) -> str:
+def build_scatter_map(group_df: pd.DataFrame) -> FigureResult:
     required = ["latitude", "longitude", "price_per_sqft"]
     if group_df.empty or not all(c in group_df.columns for c in required):
         return "<div class='alert alert-info mb-0'>No map data available.</div>"
@@ -102,18 +475,17 @@ def build_scatter_map(group_df: pd.DataFrame) -> str:
         title="Average Price per Sqft by Sector",
     )
     fig.update_layout(height=520, margin=dict(l=0, r=0, t=40, b=0))
-    return _fig_to_html(fig)
+    return fig
 
 
-def build_scatter_plot(df: pd.DataFrame) -> str:
+def build_scatter_plot(df: pd.DataFrame) -> FigureResult:
     if not {"built_up_area", "price"}.issubset(df.columns):
         return "<div class='alert alert-warning mb-0'>Missing built_up_area or price in data_viz_full.csv</div>"
     sub = df.dropna(subset=["built_up_area", "price"])
     if sub.empty:
         return "<div class='alert alert-info mb-0'>No rows for scatter (built_up_area & price).</div>"
 
-    fig = px.scatter(
-        sub,
+    kwargs = dict(
         x="built_up_area",
         y="price",
         color="bedRoom" if "bedRoom" in sub.columns else None,
@@ -121,11 +493,15 @@ def build_scatter_plot(df: pd.DataFrame) -> str:
         title="Built-up Area vs Price",
         opacity=0.8,
     )
+    if len(sub) > _point_budget():
+        fig = _large_scatter(sub, **kwargs)
+    else:
+        fig = px.scatter(sub, **kwargs)
     fig.update_layout(height=420, margin=dict(l=10, r=10, t=50, b=10))
-    return _fig_to_html(fig)
+    return fig
 
 
-def build_box_plot(df: pd.DataFrame) -> str:
+def build_box_plot(df: pd.DataFrame) -> FigureResult:
     if not {"bedRoom", "price"}.issubset(df.columns):
         return "<div class='alert alert-warning mb-0'>Missing bedRoom or price in data_viz_full.csv</div>"
     sub = df.dropna(subset=["bedRoom", "price"])
@@ -133,26 +509,30 @@ def build_box_plot(df: pd.DataFrame) -> str:
         return "<div class='alert alert-info mb-0'>No rows for BHK-wise price distribution.</div>"
     sub = sub[sub["bedRoom"] <= 8]
 
-    fig = px.box(
-        sub,
-        x="bedRoom",
-        y="price",
-        points="outliers",
-        labels={"bedRoom": "BHK", "price": "Price (Cr)"},
-        title="BHK-wise Price Distribution",
-    )
+    labels = {"bedRoom": "BHK", "price": "Price (Cr)"}
+    if len(sub) > _point_budget():
+        fig = _cube_box_figure(df, "bedRoom", "price", "BHK-wise Price Distribution", labels, max_x=8)
+    else:
+        fig = px.box(
+            sub,
+            x="bedRoom",
+            y="price",
+            points="outliers",
+            labels=labels,
+            title="BHK-wise Price Distribution",
+        )
     fig.update_layout(height=420, margin=dict(l=10, r=10, t=50, b=10))
-    return _fig_to_html(fig)
+    return fig
 
 
-def build_pie_chart(df: pd.DataFrame) -> str:
+def build_pie_chart(df: pd.DataFrame) -> FigureResult:
     if "bedRoom" not in df.columns:
         return "<div class='alert alert-warning mb-0'>Missing bedRoom in data_viz_full.csv</div>"
-    sub = df.dropna(subset=["bedRoom"]).copy()
-    if sub.empty:
+    # Counts per BHK straight from the stats cube
+    counts = [(bhk, cell["count"]) for bhk, cell in stats_cube_for(df, ("bedRoom",)).breakdown("bedRoom")]
+    if not counts:
         return "<div class='alert alert-info mb-0'>No rows for bedroom distribution.</div>"
-    sub["bedRoom"] = sub["bedRoom"].astype(int)
-    agg = sub.groupby("bedRoom").size().reset_index(name="count").sort_values("bedRoom")
+    agg = pd.DataFrame(counts, columns=["bedRoom", "count"])
 
     fig = px.pie(
         agg,
@@ -162,32 +542,46 @@ def build_pie_chart(df: pd.DataFrame) -> str:
         hole=0.35,
     )
     fig.update_layout(height=400, margin=dict(l=10, r=10, t=50, b=10))
-    return _fig_to_html(fig)
+    return fig
 
 
 # New insights
-def build_hist_price_psf(df: pd.DataFrame) -> str:
+def build_hist_price_psf(df: pd.DataFrame) -> FigureResult:
     if "price_per_sqft" not in df.columns:
         return "<div class='alert alert-warning mb-0'>Missing price_per_sqft in data_viz_full.csv</div>"
     sub = df.dropna(subset=["price_per_sqft"])
     if sub.empty:
         return "<div class='alert alert-info mb-0'>No data for price per sqft distribution.</div>"
 
-    fig = px.histogram(
-        sub,
-        x="price_per_sqft",
-        nbins=50,
-        color="property_type" if "property_type" in sub.columns else None,
-        marginal="box",
-        title="Price per Sqft Distribution",
-        labels={"price_per_sqft": "Price per Sqft (₹)"},
-        opacity=0.85,
-    )
+    color = "property_type" if "property_type" in sub.columns else None
+    if len(sub) > _point_budget():
+        # Bin server-side (px.histogram ships every row and bins in the browser)
+        edges = np.histogram_bin_edges(sub["price_per_sqft"].to_numpy(float), bins=50)
+        fig = go.Figure()
+        for key, values in (sub.groupby(color)["price_per_sqft"] if color else [("all", sub["price_per_sqft"])]):
+            counts, _ = np.histogram(values.to_numpy(float), bins=edges)
+            fig.add_bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), name=str(key), opacity=0.85)
+        fig.update_layout(
+            barmode="overlay",
+            title=f"Price per Sqft Distribution ({len(sub):,} listings, binned)",
+            xaxis_title="Price per Sqft (₹)", yaxis_title="count",
+        )
+    else:
+        fig = px.histogram(
+            sub,
+            x="price_per_sqft",
+            nbins=50,
+            color=color,
+            marginal="box",
+            title="Price per Sqft Distribution",
+            labels={"price_per_sqft": "Price per Sqft (₹)"},
+            opacity=0.85,
+        )
     fig.update_layout(height=420, margin=dict(l=10, r=10, t=50, b=10))
-    return _fig_to_html(fig)
+    return fig
 
 
-def build_sector_bar_psf(group_df: pd.DataFrame, top_n: int = 15) -> str:
+def build_sector_bar_psf(group_df: pd.DataFrame, top_n: int = 15) -> FigureResult:
     req = ["sector", "price_per_sqft"]
     if group_df.empty or not all(c in group_df.columns for c in req):
         return "<div class='alert alert-info mb-0'>No sector PSF data available.</div>"
@@ -207,10 +601,10 @@ def build_sector_bar_psf(group_df: pd.DataFrame, top_n: int = 15) -> str:
         labels={"price_per_sqft": "Avg PSF (₹)", "sector": "Sector"},
     )
     fig.update_layout(height=420, xaxis_tickangle=-35, margin=dict(l=10, r=10, t=50, b=100))
-    return _fig_to_html(fig)
+    return fig
 
 
-def build_violin_bhk_psf(df: pd.DataFrame) -> str:
+def build_violin_bhk_psf(df: pd.DataFrame) -> FigureResult:
     req = ["bedRoom", "price_per_sqft"]
     if not all(c in df.columns for c in req):
         return "<div class='alert alert-warning mb-0'>Requires bedRoom and price_per_sqft.</div>"
@@ -219,20 +613,25 @@ def build_violin_bhk_psf(df: pd.DataFrame) -> str:
         return "<div class='alert alert-info mb-0'>No data for PSF by BHK.</div>"
     sub = sub[sub["bedRoom"] <= 8]
 
-    fig = px.violin(
-        sub,
-        x="bedRoom",
-        y="price_per_sqft",
-        box=True,
-        points="outliers",
-        title="Price per Sqft by BHK (Violin)",
-        labels={"bedRoom": "BHK", "price_per_sqft": "PSF (₹)"},
-    )
+    labels = {"bedRoom": "BHK", "price_per_sqft": "PSF (₹)"}
+    if len(sub) > _point_budget():
+        # Violins need the raw values client-side; summarize as quantile boxes instead
+        fig = _cube_box_figure(df, "bedRoom", "price_per_sqft", "Price per Sqft by BHK", labels, max_x=8)
+    else:
+        fig = px.violin(
+            sub,
+            x="bedRoom",
+            y="price_per_sqft",
+            box=True,
+            points="outliers",
+            title="Price per Sqft by BHK (Violin)",
+            labels=labels,
+        )
     fig.update_layout(height=420, margin=dict(l=10, r=10, t=50, b=10))
-    return _fig_to_html(fig)
+    return fig
 
 
-def build_area_psf_scatter(df: pd.DataFrame) -> str:
+def build_area_psf_scatter(df: pd.DataFrame) -> FigureResult:
     req = ["built_up_area", "price_per_sqft"]
     if not all(c in df.columns for c in req):
         return "<div class='alert alert-warning mb-0'>Requires built_up_area and price_per_sqft.</div>"
@@ -240,8 +639,7 @@ def build_area_psf_scatter(df: pd.DataFrame) -> str:
     if sub.empty:
         return "<div class='alert alert-info mb-0'>No data for area vs PSF.</div>"
 
-    fig = px.scatter(
-        sub,
+    kwargs = dict(
         x="built_up_area",
         y="price_per_sqft",
         color="bedRoom" if "bedRoom" in sub.columns else None,
@@ -250,11 +648,15 @@ def build_area_psf_scatter(df: pd.DataFrame) -> str:
         labels={"built_up_area": "Built-up Area (sqft)", "price_per_sqft": "PSF (₹)"},
         opacity=0.75,
     )
+    if len(sub) > _point_budget():
+        fig = _large_scatter(sub, **kwargs)
+    else:
+        fig = px.scatter(sub, **kwargs)
     fig.update_layout(height=420, margin=dict(l=10, r=10, t=50, b=10))
-    return _fig_to_html(fig)
+    return fig
 
 
-def build_luxury_psf_scatter(df: pd.DataFrame) -> str:
+def build_luxury_psf_scatter(df: pd.DataFrame) -> FigureResult:
     req = ["luxury_score", "price_per_sqft"]
     if not all(c in df.columns for c in req):
         return "<div class='alert alert-warning mb-0'>Requires luxury_score and price_per_sqft.</div>"
@@ -262,8 +664,7 @@ def build_luxury_psf_scatter(df: pd.DataFrame) -> str:
     if sub.empty:
         return "<div class='alert alert-info mb-0'>No data for luxury vs PSF.</div>"
 
-    fig = px.scatter(
-        sub,
+    kwargs = dict(
         x="luxury_score",
         y="price_per_sqft",
         color="property_type" if "property_type" in sub.columns else None,
@@ -271,16 +672,22 @@ def build_luxury_psf_scatter(df: pd.DataFrame) -> str:
         labels={"luxury_score": "Luxury Score", "price_per_sqft": "PSF (₹)"},
         opacity=0.75,
     )
+    if len(sub) > _point_budget():
+        fig = _large_scatter(sub, **kwargs)
+    else:
+        fig = px.scatter(sub, **kwargs)
     fig.update_layout(height=420, margin=dict(l=10, r=10, t=50, b=10))
-    return _fig_to_html(fig)
+    return fig
 
 
-def build_corr_heatmap(df: pd.DataFrame) -> str:
-    # Focus on the most relevant numeric columns to keep the heatmap readable
-    cols = [c for c in [
-        "built_up_area", "price", "price_per_sqft", "bedRoom",
-        "bathroom", "balcony", "floorNum", "luxury_score"
-    ] if c in df.columns]
+# Focus on the most relevant numeric columns to keep the heatmap readable
+CORR_HEATMAP_COLUMNS = (
+    "built_up_area", "price", "price_per_sqft", "bedRoom", "bathroom", "balcony", "floorNum", "luxury_score",
+)
+
+
+def build_corr_heatmap(df: pd.DataFrame) -> FigureResult:
+    cols = [c for c in CORR_HEATMAP_COLUMNS if c in df.columns]
     if not cols:
         return "<div class='alert alert-warning mb-0'>No numeric columns available for correlation.</div>"
 
@@ -289,7 +696,11 @@ def build_corr_heatmap(df: pd.DataFrame) -> str:
     if sub.empty:
         return "<div class='alert alert-info mb-0'>No data for correlation heatmap.</div>"
 
-    corr = sub.corr(numeric_only=True)
+    return corr_heatmap_figure(sub.corr(numeric_only=True))
+
+
+def corr_heatmap_figure(corr: pd.DataFrame) -> FigureResult:
+    """The heatmap for a ready correlation matrix (e.g. from running covariance, see listing_aggregates)."""
     fig = px.imshow(
         corr,
         text_auto=True,
@@ -299,24 +710,170 @@ def build_corr_heatmap(df: pd.DataFrame) -> str:
         title="Feature Correlation Heatmap",
     )
     fig.update_layout(height=520, margin=dict(l=10, r=10, t=50, b=10))
-    return _fig_to_html(fig)
-
-
-def build_all_figures(df: pd.DataFrame, group_df: pd.DataFrame) -> Dict[str, str]:
-    return {
-        # Existing
-        "map_html": build_scatter_map(group_df),
-        "scatter_html": build_scatter_plot(df),
-        "box_html": build_box_plot(df),
-        "pie_html": build_pie_chart(df),
-        # New insights
-        "hist_psf_html": build_hist_price_psf(df),
-        "sector_bar_psf_html": build_sector_bar_psf(group_df),
-        "violin_bhk_psf_html": build_violin_bhk_psf(df),
-        "area_psf_scatter_html": build_area_psf_scatter(df),
-        "luxury_psf_scatter_html": build_luxury_psf_scatter(df),
-        "corr_heatmap_html": build_corr_heatmap(df),
-    }
+    return fig
+
+
+# Figure registry: name -> (builder, source frame). "df" = data_viz_full, "group" = grouped_sector_data
+FIGURE_BUILDERS: Dict[str, Tuple[Callable[[pd.DataFrame], FigureResult], str]] = {
+    # Existing
+    "map": (build_scatter_map, "group"),
+    "scatter": (build_scatter_plot, "df"),
+    "box": (build_box_plot, "df"),
+    "pie": (build_pie_chart, "df"),
+    # New insights
+    "hist_psf": (build_hist_price_psf, "df"),
+    "sector_bar_psf": (build_sector_bar_psf, "group"),
+    "violin_bhk_psf": (build_violin_bhk_psf, "df"),
+    "area_psf_scatter": (build_area_psf_scatter, "df"),
+    "luxury_psf_scatter": (build_luxury_psf_scatter, "df"),
+    "corr_heatmap": (build_corr_heatmap, "df"),
+}
+
+
+def build_figure(name: str, df: pd.DataFrame, group_df: pd.DataFrame, fmt: str = "html") -> str:
+    builder, source = FIGURE_BUILDERS[name]
+    return render_figure(builder(group_df if source == "group" else df), fmt)
+
+
+# How build_figures runs the builders: one after another, or concurrently in a thread/process pool
+FIGURE_BUILD_MODES = ("serial", "thread", "process")
+DEFAULT_FIGURE_TIMEOUT = 60.0  # seconds
+
+# Frames held by each figure worker process (set once by its initializer)
+_WORKER_FRAMES: Dict[str, pd.DataFrame] = {}
+
+
+def _figure_placeholder(message: str, fmt: str) -> str:
+    return render_figure(f"<div class='alert alert-warning mb-0'>{message}</div>", fmt)
+
+
+def _timed_build(name: str, df: pd.DataFrame, group_df: pd.DataFrame, fmt: str) -> Tuple[str, float]:
+    t0 = time.perf_counter()
+    payload = build_figure(name, df, group_df, fmt)
+    return payload, time.perf_counter() - t0
+
+
+def _init_figure_worker(settings: Dict[str, object], df: pd.DataFrame, group_df: pd.DataFrame) -> None:
+    _WORKER_SETTINGS.update(settings)
+    _WORKER_FRAMES["df"], _WORKER_FRAMES["group"] = df, group_df
+
+
+def _build_in_worker(name: str, fmt: str) -> Tuple[str, float]:
+    return _timed_build(name, _WORKER_FRAMES["df"], _WORKER_FRAMES["group"], fmt)
+
+
+def _figure_build_options(mode: Optional[str], timeout: Optional[float], workers: Optional[int]):
+    if has_app_context():
+        cfg = current_app.config
+        mode = mode or cfg.get("ANALYTICS_BUILD_MODE", "thread")
+        timeout = timeout if timeout is not None else cfg.get("ANALYTICS_BUILD_TIMEOUT", DEFAULT_FIGURE_TIMEOUT)
+        workers = workers if workers is not None else cfg.get("ANALYTICS_BUILD_WORKERS", 0)
+    mode = mode or "serial"
+    if mode not in FIGURE_BUILD_MODES:
+        raise ValueError(f"Unknown figure build mode {mode!r}; choose from {', '.join(FIGURE_BUILD_MODES)}")
+    return mode, float(timeout if timeout is not None else DEFAULT_FIGURE_TIMEOUT), int(workers or 0)
+
+
+def build_figures(
+    df: pd.DataFrame,
+    group_df: pd.DataFrame,
+    names: Optional[List[str]] = None,
+    fmt: str = "html",
+    mode: Optional[str] = None,
+    timeout: Optional[float] = None,
+    workers: Optional[int] = None,
+    on_finish: Optional[Callable[[str], None]] = None,
+) -> Tuple[Dict[str, str], Dict[str, Dict[str, object]]]:
+    """
+    Build several figures; returns ({name: payload}, {name: {"status", "seconds"[, "error"]}}).
+
+    mode (default ANALYTICS_BUILD_MODE): "serial", "thread" (builders run concurrently; numpy,
+    pandas and JSON encoding release the GIL for much of the work) or "process" (a spawned
+    pool, each worker receiving the frames once). In the pooled modes a figure not finished
+    `timeout` seconds after the call (pool start-up included), or whose builder raised, is
+    replaced by an alert placeholder (status "timeout" / "error") instead of failing the
+    whole batch. Timed-out worker processes are terminated; a thread cannot be, so a
+    timed-out thread builder runs on in the background. `on_finish(name)` is called once
+    each builder has really stopped, which for such a thread is after this returns.
+    """
+    names = list(names or FIGURE_BUILDERS)
+    mode, timeout, workers = _figure_build_options(mode, timeout, workers)
+    payloads: Dict[str, str] = {}
+    timings: Dict[str, Dict[str, object]] = {}
+
+    if mode == "serial" or len(names) <= 1:
+        for name in names:
+            try:
+                payloads[name], seconds = _timed_build(name, df, group_df, fmt)
+                timings[name] = {"status": "ok", "seconds": round(seconds, 4)}
+            except Exception as e:
+                payloads[name] = _figure_placeholder(f"Could not build this chart ({type(e).__name__}).", fmt)
+                timings[name] = {"status": "error", "seconds": None, "error": str(e)}
+            finally:
+                if on_finish is not None:
+                    on_finish(name)
+        return payloads, timings
+
+    # Spawning workers and shipping them the frames counts against the timeout too
+    deadline = time.monotonic() + timeout
+    executor: Executor
+    if mode == "thread":
+        # One thread per figure, so the deadline is effectively per figure
+        executor = ThreadPoolExecutor(max_workers=workers or len(names), thread_name_prefix="figure")
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def run(name: str) -> Tuple[str, float]:
+            if app is None:
+                return _timed_build(name, df, group_df, fmt)
+            with app.app_context():
+                return _timed_build(name, df, group_df, fmt)
+
+        futures = {executor.submit(run, name): name for name in names}
+    else:
+        settings = {key: _setting(key, None) for key in BUILDER_SETTINGS}
+        settings = {key: value for key, value in settings.items() if value is not None}
+        # spawn, not fork: the web process is multi-threaded
+        executor = ProcessPoolExecutor(
+            max_workers=min(workers or os.cpu_count() or 1, len(names)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_figure_worker,
+            initargs=(settings, df, group_df),
+        )
+        futures = {executor.submit(_build_in_worker, name, fmt): name for name in names}
+    if on_finish is not None:
+        for future, name in futures.items():
+            future.add_done_callback(lambda _, name=name: on_finish(name))
+
+    not_done = set()
+    try:
+        done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        for future, name in futures.items():
+            if future in not_done:
+                future.cancel()
+                payloads[name] = _figure_placeholder(f"This chart took longer than {timeout:g}s and was skipped.", fmt)
+                timings[name] = {"status": "timeout", "seconds": None}
+                continue
+            try:
+                payloads[name], seconds = future.result()
+                timings[name] = {"status": "ok", "seconds": round(seconds, 4)}
+            except Exception as e:
+                payloads[name] = _figure_placeholder(f"Could not build this chart ({type(e).__name__}).", fmt)
+                timings[name] = {"status": "error", "seconds": None, "error": str(e)}
+    finally:
+        if not_done and isinstance(executor, ProcessPoolExecutor):
+            # shutdown() alone would leave a hung builder running; the batch is over, so stop them all
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                process.terminate()
+        # Don't wait for timed-out builders; their results are discarded
+        executor.shutdown(wait=False, cancel_futures=True)
+    return {name: payloads[name] for name in names}, timings
+
+
+def build_all_figures(df: pd.DataFrame, group_df: pd.DataFrame, mode: Optional[str] = None,
+                      timeout: Optional[float] = None) -> Dict[str, str]:
+    # Keys keep the historical "<name>_html" template variable names
+    payloads, _ = build_figures(df, group_df, fmt="html", mode=mode, timeout=timeout)
+    return {f"{name}_html": payload for name, payload in payloads.items()}
 
 
 def get_sector_options(sector_feature_map: Dict[str, str], df: pd.DataFrame | None = None) -> List[str]:
@@ -326,17 +883,30 @@ def get_sector_options(sector_feature_map: Dict[str, str], df: pd.DataFrame | No
     return sorted(sectors)
 
 
-def generate_wordcloud_base64(sector_text: str, width: int = 700, height: int = 500) -> str:
-    if not sector_text:
-        sector_text = "No data available"
-    wc = WordCloud(width=width, height=height, background_color="white").generate(sector_text)
-    plt.figure(figsize=(width / 100, height / 100), dpi=100)
-    plt.imshow(wc, interpolation="bilinear")
-    plt.axis("off")
-    buf = io.BytesIO()
-    plt.savefig(buf, format="png", bbox_inches="tight", pad_inches=0.1)
-    buf.seek(0)
-    img_data = base64.b64encode(buf.read()).decode("utf-8")
+# pyplot keeps global state; serialize renders across request threads
+_PLOT_LOCK = threading.Lock()
+
+
+def generate_wordcloud_png(sector_text: str, width: int = 700, height: int = 500) -> bytes:
+    """Tokenizes `sector_text` on every call; prefer generate_wordcloud_png_from_frequencies."""
+    return generate_wordcloud_png_from_frequencies(count_terms(sector_text or "No data available"), width, height)
+
+
+def generate_wordcloud_png_from_frequencies(frequencies: Dict[str, int], width: int = 700, height: int = 500) -> bytes:
+    if not frequencies:
+        frequencies = count_terms("No data available")
+    wc = WordCloud(width=width, height=height, background_color="white").generate_from_frequencies(frequencies)
+    with _PLOT_LOCK:
+        plt.figure(figsize=(width / 100, height / 100), dpi=100)
+        plt.imshow(wc, interpolation="bilinear")
+        plt.axis("off")
+        buf = io.BytesIO()
+        plt.savefig(buf, format="png", bbox_inches="tight", pad_inches=0.1)
+        plt.close()
+    png = buf.getvalue()
     buf.close()
-    plt.close()
-    return img_data
\ No newline at end of file
+    return png
+
+
+def generate_wordcloud_base64(sector_text: str, width: int = 700, height: int = 500) -> str:
+    return base64.b64encode(generate_wordcloud_png(sector_text, width, height)).decode("utf-8")
@@ -0,0 +1,185 @@
+# app/utils/ann_index.py
+
+from __future__ import annotations
+
+import itertools
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+# Indexes store L2-normalized vectors, so inner product == cosine similarity
+
+
+def normalize_rows(X: np.ndarray) -> np.ndarray:
+    X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    return np.divide(X, norms, out=np.zeros_like(X), where=norms > 0)
+
+
+class ANNIndex:
+    """Base class: growable vector store + top-k by cosine. Subclasses narrow the candidate set."""
+
+    name = "base"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._size]
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """Append vectors (normalized here); returns their ids (insertion positions)."""
+        X = normalize_rows(vectors)
+        if X.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-d vectors, got {X.shape[1]}")
+        needed = self._size + len(X)
+        if needed > len(self._vectors):
+            # Amortized O(1) appends: grow capacity geometrically
+            grown = np.zeros((max(needed, 2 * len(self._vectors), 64), self.dim), dtype=np.float32)
+            grown[:self._size] = self.vectors
+            self._vectors = grown
+        ids = np.arange(self._size, needed)
+        self._vectors[self._size:needed] = X
+        self._size = needed
+        self._on_add(ids, X)
+        return ids
+
+    def _on_add(self, ids: np.ndarray, X: np.ndarray) -> None:
+        pass
+
+    def _candidates(self, q: np.ndarray) -> Optional[np.ndarray]:
+        """Ids worth scoring exactly for query q; None means all of them."""
+        return None
+
+    def query(self, vector: np.ndarray, k: int = 10, exclude: Sequence[int] = ()) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids, cosine scores) of the top-k stored vectors, best first."""
+        q = normalize_rows(vector)[0]
+        ids = self._candidates(q)
+        if ids is None:
+            scores = self.vectors @ q
+            ids = np.arange(self._size)
+        else:
+            scores = self._vectors[ids] @ q
+        if len(exclude):
+            keep = ~np.isin(ids, exclude)
+            ids, scores = ids[keep], scores[keep]
+        k = min(k, len(ids))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return ids[top], scores[top]
+
+
+class ExactIndex(ANNIndex):
+    """Brute force: one matrix-vector product per query. The ground truth for benchmarks."""
+
+    name = "exact"
+
+
+class LSHIndex(ANNIndex):
+    """
+    Random-hyperplane LSH (SimHash). Each of `tables` tables hashes a vector to the sign
+    pattern of `bits` random projections; vectors at a small angle collide often. A query
+    scores only the union of its buckets (plus buckets within Hamming distance `probes`
+    when multi-probing), so cost scales with bucket size instead of the index size.
+    """
+
+    name = "lsh"
+
+    def __init__(self, dim: int, tables: int = 8, bits: int = 12, probes: int = 1, seed: int = 0):
+        super().__init__(dim)
+        if not 1 <= bits <= 62:
+            raise ValueError("bits must be between 1 and 62")
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((tables, bits, dim)).astype(np.float32)
+        self.probes = probes
+        self._weights = (1 << np.arange(bits, dtype=np.int64))
+        self._buckets: List[Dict[int, np.ndarray]] = [{} for _ in range(tables)]
+        # XOR masks for multi-probe: every bit pattern with at most `probes` bits set
+        self._masks = [0] + [
+            sum(1 << b for b in combo)
+            for r in range(1, probes + 1)
+            for combo in itertools.combinations(range(bits), r)
+        ]
+
+    def _codes(self, X: np.ndarray) -> np.ndarray:
+        """(tables, n) integer bucket codes."""
+        bits = np.einsum("tbd,nd->tnb", self.planes, X) > 0
+        return bits.astype(np.int64) @ self._weights
+
+    def _on_add(self, ids: np.ndarray, X: np.ndarray) -> None:
+        # Buckets are id arrays; a batch is grouped by code so each bucket grows once per add()
+        for table, codes in zip(self._buckets, self._codes(X)):
+            order = np.argsort(codes, kind="stable")
+            unique, starts = np.unique(codes[order], return_index=True)
+            for code, chunk in zip(unique.tolist(), np.split(ids[order], starts[1:])):
+                bucket = table.get(code)
+                table[code] = chunk if bucket is None else np.concatenate([bucket, chunk])
+
+    def _candidates(self, q: np.ndarray) -> np.ndarray:
+        found = [
+            bucket
+            for table, code in zip(self._buckets, self._codes(q[None, :])[:, 0].tolist())
+            for bucket in (table.get(code ^ mask) for mask in self._masks)
+            if bucket is not None
+        ]
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        # Dedupe through a bitmap: cheaper than sorting/hashing the concatenated buckets
+        seen = np.zeros(self._size, dtype=bool)
+        seen[np.concatenate(found)] = True
+        return np.flatnonzero(seen)
+
+
+ANN_BACKENDS: Dict[str, Type[ANNIndex]] = {cls.name: cls for cls in (ExactIndex, LSHIndex)}
+
+
+def make_index(backend: str, dim: int, **params: Any) -> ANNIndex:
+    try:
+        cls = ANN_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown ANN backend {backend!r}; choose from {', '.join(ANN_BACKENDS)}") from None
+    return cls(dim, **params)
+
+
+def benchmark(index: ANNIndex, queries: np.ndarray, k: int = 10, exact: Optional[ANNIndex] = None) -> Dict[str, Any]:
+    """
+    Recall@k and per-query latency of `index` against exact search over the same vectors.
+    Each query vector is assumed to be stored in the index and is excluded from its own results.
+    """
+    if exact is None:
+        exact = ExactIndex(index.dim)
+        exact.add(index.vectors)
+    query_ids = np.asarray(queries, dtype=np.int64)
+
+    def timed(idx: ANNIndex) -> Tuple[List[np.ndarray], np.ndarray]:
+        results, latencies = [], []
+        for i in query_ids:
+            t0 = time.perf_counter()
+            ids, _ = idx.query(idx.vectors[i], k, exclude=[i])
+            latencies.append(time.perf_counter() - t0)
+            results.append(ids)
+        return results, np.asarray(latencies) * 1000
+
+    approx, approx_ms = timed(index)
+    truth, exact_ms = timed(exact)
+    hits = [len(np.intersect1d(a, t)) / max(len(t), 1) for a, t in zip(approx, truth)]
+    return {
+        "backend": index.name,
+        "size": len(index),
+        "queries": len(query_ids),
+        "k": k,
+        "recall_at_k": round(float(np.mean(hits)), 4) if hits else None,
+        "p50_ms": round(float(np.percentile(approx_ms, 50)), 3) if len(approx_ms) else None,
+        "p95_ms": round(float(np.percentile(approx_ms, 95)), 3) if len(approx_ms) else None,
+        "exact_p50_ms": round(float(np.percentile(exact_ms, 50)), 3) if len(exact_ms) else None,
+        "exact_p95_ms": round(float(np.percentile(exact_ms, 95)), 3) if len(exact_ms) else None,
+    }
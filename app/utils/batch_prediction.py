@@ -0,0 +1,101 @@
+# app/utils/batch_prediction.py
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from .data_helper import ALLOWED_FIELDS, validate_frame, convert_crore_to_inr
+from .model_loader import get_model
+
+# Training-schema spellings accepted as aliases of the form field names
+FIELD_ALIASES = {"servant room": "servant_room", "store room": "store_room"}
+
+RESULT_FIELDS = ["row", "price_crore", "price_inr", "errors"]
+# Output formats of the streaming /predict/batch endpoint
+STREAM_FORMATS = ("ndjson", "csv")
+
+
+class BatchInputError(ValueError):
+    """The batch payload itself is unusable (bad format, too many rows, ...)."""
+
+
+def parse_batch_payload(raw: bytes, content_type: str, max_rows: int) -> pd.DataFrame:
+    """
+    JSON (a list of records or {"records": [...]}) or CSV -> DataFrame of raw field values.
+    Unknown columns are dropped; missing ones are filled with "".
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    try:
+        if content_type in ("text/csv", "application/csv"):
+            frame = pd.read_csv(io.BytesIO(raw), dtype=str, keep_default_na=False, encoding="utf-8-sig")
+        else:
+            payload = json.loads(raw.decode("utf-8")) if raw else []
+            if isinstance(payload, dict):
+                payload = payload.get("records", [])
+            if not isinstance(payload, list):
+                raise BatchInputError("JSON body must be a list of records or {\"records\": [...]}")
+            frame = pd.DataFrame.from_records(payload)
+    except BatchInputError:
+        raise
+    except Exception as e:
+        raise BatchInputError(f"Could not parse batch payload: {e}") from e
+
+    if len(frame) > max_rows:
+        raise BatchInputError(f"Batch has {len(frame)} rows; the limit is {max_rows}.")
+
+    frame = frame.rename(columns=FIELD_ALIASES)
+    return frame.reindex(columns=ALLOWED_FIELDS).fillna("")
+
+
+def iter_batch_predictions(records: pd.DataFrame, chunk_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Validate and score `records` chunk by chunk: one model.predict() call per chunk.
+    Yields, per chunk, one result dict per input row (in input order) with either
+    a price or the row's validation / prediction errors.
+    """
+    model = get_model()
+
+    for start in range(0, len(records), chunk_size):
+        chunk = records.iloc[start:start + chunk_size]
+        X, invalid, errors = validate_frame(chunk)
+        results: List[Dict[str, Any]] = [
+            {"row": start + pos, "price_crore": None, "price_inr": None, "errors": errors.get(pos, [])}
+            for pos in range(len(chunk))
+        ]
+
+        valid_pos = np.flatnonzero(~invalid)
+        if len(valid_pos):
+            try:
+                preds = model.predict(X.iloc[valid_pos])
+            except Exception as e:
+                for pos in valid_pos:
+                    results[pos]["errors"] = [f"Prediction failed: {e}"]
+            else:
+                for pos, y_crore in zip(valid_pos, preds):
+                    results[pos]["price_crore"] = round(float(y_crore), 4)
+                    results[pos]["price_inr"] = round(convert_crore_to_inr(y_crore))
+
+        yield results
+
+
+def results_to_ndjson(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[str]:
+    for results in chunks:
+        yield "".join(json.dumps(r) + "\n" for r in results)
+
+
+def results_to_csv(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=RESULT_FIELDS)
+    writer.writeheader()
+    for results in chunks:
+        for r in results:
+            writer.writerow({**r, "errors": "; ".join(r["errors"])})
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
@@ -0,0 +1,223 @@
+# app/utils/compiled_model.py
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
+from sklearn.ensemble import RandomForestRegressor, VotingRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+from xgboost import XGBRegressor
+import category_encoders as ce
+
+from .model_loader import get_model, get_model_version, get_expected_columns, get_dummy_row
+
+logger = logging.getLogger(__name__)
+
+# Rows are plain {column: value} dicts in the training schema (see validate_and_prepare)
+Rows = Sequence[Dict[str, Any]]
+_UNKNOWN = "\x00unknown\x00"
+
+
+class NotCompilable(TypeError):
+    """The fitted model contains a step the native path doesn't know how to replicate."""
+
+
+# --- preprocessing: fitted transformers -> plain lookup tables ---------------------------
+
+def _compile_scaler(step: StandardScaler, cols: List[str]) -> Callable[[Rows], np.ndarray]:
+    mean = step.mean_ if step.with_mean else np.zeros(len(cols))
+    scale = step.scale_ if step.with_std else np.ones(len(cols))
+
+    def encode(rows: Rows) -> np.ndarray:
+        X = np.array([[float(r[c]) for c in cols] for r in rows], dtype=float)
+        return (X - mean) / scale
+    return encode
+
+
+def _compile_ordinal(step: OrdinalEncoder, cols: List[str]) -> Callable[[Rows], np.ndarray]:
+    if step.handle_unknown != "use_encoded_value":
+        raise NotCompilable("OrdinalEncoder must use handle_unknown='use_encoded_value'")
+    tables = [{v: float(i) for i, v in enumerate(cats)} for cats in step.categories_]
+    unknown = float(step.unknown_value)
+
+    def encode(rows: Rows) -> np.ndarray:
+        return np.array([[t.get(r[c], unknown) for c, t in zip(cols, tables)] for r in rows], dtype=float)
+    return encode
+
+
+def _compile_onehot(step: OneHotEncoder, cols: List[str]) -> Callable[[Rows], np.ndarray]:
+    if step.handle_unknown != "ignore" or getattr(step, "sparse_output", False):
+        raise NotCompilable("OneHotEncoder must be dense with handle_unknown='ignore'")
+    drop_idx = step.drop_idx_ if step.drop_idx_ is not None else [None] * len(cols)
+    tables, widths = [], []
+    for cats, drop in zip(step.categories_, drop_idx):
+        kept = [v for i, v in enumerate(cats) if drop is None or i != drop]
+        widths.append(len(kept))
+        tables.append({v: j for j, v in enumerate(kept)})
+
+    def encode(rows: Rows) -> np.ndarray:
+        X = np.zeros((len(rows), sum(widths)), dtype=float)
+        offset = 0
+        for c, table, width in zip(cols, tables, widths):
+            for i, r in enumerate(rows):
+                j = table.get(r[c])
+                if j is not None:
+                    X[i, offset + j] = 1.0
+            offset += width
+        return X
+    return encode
+
+
+def _compile_target_encoder(step: ce.TargetEncoder, cols: List[str]) -> Callable[[Rows], np.ndarray]:
+    # Let the encoder itself score every known category once (+ a sentinel for unknowns)
+    tables, defaults = [], []
+    for col in cols:
+        mapping = next((m["mapping"] for m in step.ordinal_encoder.category_mapping if m["col"] == col), None)
+        if mapping is None:
+            raise NotCompilable(f"TargetEncoder has no mapping for {col}")
+        known = [v for v in mapping.index if isinstance(v, str)]
+        probe = pd.DataFrame({c: (known + [_UNKNOWN]) if c == col else [_UNKNOWN] * (len(known) + 1) for c in cols})
+        encoded = step.transform(probe)[col].to_numpy(dtype=float)
+        tables.append(dict(zip(known, encoded[:-1])))
+        defaults.append(float(encoded[-1]))
+
+    def encode(rows: Rows) -> np.ndarray:
+        return np.array([[t.get(r[c], d) for c, t, d in zip(cols, tables, defaults)] for r in rows], dtype=float)
+    return encode
+
+
+def _compile_passthrough(cols: List[str]) -> Callable[[Rows], np.ndarray]:
+    def encode(rows: Rows) -> np.ndarray:
+        return np.array([[float(r[c]) for c in cols] for r in rows], dtype=float)
+    return encode
+
+
+def _compile_column_transformer(ct: ColumnTransformer, columns: List[str]) -> Callable[[Rows], np.ndarray]:
+    parts = []
+    for name, step, cols in ct.transformers_:
+        if step == "drop":
+            continue
+        if not isinstance(cols, list):
+            cols = [columns[i] for i in np.atleast_1d(cols)] if len(np.atleast_1d(cols)) else []
+        if not cols:
+            continue
+        if step == "passthrough":
+            parts.append(_compile_passthrough(cols))
+        elif isinstance(step, StandardScaler):
+            parts.append(_compile_scaler(step, cols))
+        elif isinstance(step, OrdinalEncoder):
+            parts.append(_compile_ordinal(step, cols))
+        elif isinstance(step, OneHotEncoder):
+            parts.append(_compile_onehot(step, cols))
+        elif isinstance(step, ce.TargetEncoder):
+            parts.append(_compile_target_encoder(step, cols))
+        else:
+            raise NotCompilable(f"Unsupported transformer {name}: {type(step).__name__}")
+
+    def encode(rows: Rows) -> np.ndarray:
+        return np.hstack([p(rows) for p in parts])
+    return encode
+
+
+# --- estimators ----------------------------------------------------------------------------
+
+def forest_tree_predictions(forest: RandomForestRegressor, X: np.ndarray) -> np.ndarray:
+    """(n_trees, n_rows) per-tree predictions, without sklearn's per-call joblib.Parallel overhead."""
+    X32 = np.ascontiguousarray(X, dtype=np.float32)
+    # Tree.predict returns (n_rows, n_outputs[, 1]) depending on the sklearn version
+    return np.stack([tree.tree_.predict(X32).reshape(len(X32), -1)[:, 0] for tree in forest.estimators_])
+
+
+def _compile_estimator(est, columns: List[str]) -> Callable[[Rows], np.ndarray]:
+    if isinstance(est, TransformedTargetRegressor):
+        inner = _compile_estimator(est.regressor_, columns)
+        if est.inverse_func is not None:
+            inverse = est.inverse_func
+        else:
+            inverse = lambda y: est.transformer_.inverse_transform(y.reshape(-1, 1)).ravel()  # noqa: E731
+        return lambda rows: np.asarray(inverse(inner(rows)), dtype=float).ravel()
+
+    if isinstance(est, VotingRegressor):
+        members = [_compile_estimator(e, columns) for e in est.estimators_]
+        weights = est._weights_not_none
+        return lambda rows: np.average(np.column_stack([m(rows) for m in members]), axis=1, weights=weights)
+
+    if isinstance(est, Pipeline):
+        *steps, (_, final) = est.steps
+        if len(steps) != 1 or not isinstance(steps[0][1], ColumnTransformer):
+            raise NotCompilable("Pipeline must be ColumnTransformer -> estimator")
+        encode = _compile_column_transformer(steps[0][1], columns)
+        if isinstance(final, XGBRegressor):
+            booster = final.get_booster()
+            return lambda rows: booster.inplace_predict(encode(rows))
+        if isinstance(final, RandomForestRegressor):
+            return lambda rows: forest_tree_predictions(final, encode(rows)).mean(axis=0)
+        raise NotCompilable(f"Unsupported final estimator: {type(final).__name__}")
+
+    raise NotCompilable(f"Unsupported estimator: {type(est).__name__}")
+
+
+class CompiledModel:
+    """Plain-Python/NumPy replica of the fitted price pipeline for low-latency scoring of a few rows."""
+
+    def __init__(self, model):
+        self.columns = list(get_expected_columns())
+        self._predict = _compile_estimator(model, self.columns)
+
+    def predict_records(self, rows: Rows) -> np.ndarray:
+        return np.asarray(self._predict(list(rows)), dtype=float)
+
+    def predict(self, df: pd.DataFrame) -> np.ndarray:
+        return self.predict_records(df.reindex(columns=self.columns).to_dict(orient="records"))
+
+
+# --- cache + parity ------------------------------------------------------------------------
+
+_COMPILED: Dict[str, Any] = {"version": None, "model": None}
+_COMPILE_LOCK = threading.Lock()
+
+
+def check_parity(model, compiled: CompiledModel, X: pd.DataFrame, rtol: float = 1e-4) -> Dict[str, Any]:
+    """Compare the compiled path against model.predict() on X (model columns)."""
+    expected = np.asarray(model.predict(X), dtype=float)
+    actual = compiled.predict(X)
+    rel = np.abs(actual - expected) / np.maximum(np.abs(expected), 1e-12)
+    return {
+        "rows": int(len(X)),
+        "max_rel_error": float(rel.max()) if len(rel) else 0.0,
+        "mismatches": int((rel > rtol).sum()),
+        "ok": bool((rel <= rtol).all()),
+    }
+
+
+def get_compiled_model() -> Optional[CompiledModel]:
+    """
+    Compiled replica of get_model(), rebuilt when the model file changes.
+    Returns None (callers fall back to the pipeline) if the model can't be compiled
+    or the compiled output doesn't match the pipeline on a probe row.
+    """
+    version = get_model_version()
+    if _COMPILED["version"] == version:
+        return _COMPILED["model"]
+    with _COMPILE_LOCK:
+        if _COMPILED["version"] != version:
+            model = get_model()
+            compiled = None
+            try:
+                compiled = CompiledModel(model)
+                parity = check_parity(model, compiled, get_dummy_row())
+                if not parity["ok"]:
+                    logger.warning(f"[model] compiled path disabled, parity check failed: {parity}")
+                    compiled = None
+            except NotCompilable as e:
+                logger.warning(f"[model] compiled path unavailable: {e}")
+                compiled = None
+            _COMPILED["model"] = compiled
+            _COMPILED["version"] = version
+        return _COMPILED["model"]
@@ -0,0 +1,43 @@
+# app/utils/compression.py
+
+from __future__ import annotations
+
+import gzip
+
+from flask import Flask, request
+
+COMPRESSIBLE_MIMETYPES = {"text/html", "application/json", "text/csv", "text/css", "application/javascript"}
+
+
+def gzip_bytes(data: bytes, level: int = 6) -> bytes:
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def accepts_gzip() -> bool:
+    return "gzip" in request.accept_encodings
+
+
+def init_compression(app: Flask) -> None:
+    """gzip text responses above COMPRESS_MIN_SIZE bytes for clients that accept it."""
+    min_size = app.config.get("COMPRESS_MIN_SIZE", 1024)
+    level = app.config.get("COMPRESS_LEVEL", 6)
+
+    @app.after_request
+    def _gzip_response(resp):
+        if (
+            resp.direct_passthrough
+            or resp.is_streamed
+            or resp.status_code < 200
+            or resp.status_code >= 300
+            or "Content-Encoding" in resp.headers
+            or resp.mimetype not in COMPRESSIBLE_MIMETYPES
+            or not accepts_gzip()
+        ):
+            return resp
+        data = resp.get_data()
+        if len(data) < min_size:
+            return resp
+        resp.set_data(gzip_bytes(data, level))
+        resp.headers["Content-Encoding"] = "gzip"
+        resp.vary.add("Accept-Encoding")
+        return resp
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 from typing import Tuple, Dict, Any, List
 
@@ -26,49 +27,61 @@ def ensure_schema_compatibility() -> None:
         raise RuntimeError(f"Model is missing required columns: {missing}. "
                            "Adjust the form or update expected_columns.json.")
 
-def _coerce_numeric(val, default=0):
-    if val is None or str(val).strip() == "":
-        return default
-    try:
-        s = str(val).strip()
-        return float(s) if "." in s else int(s)
-    except Exception:
-        return default
+def _choices_message(f: str, choices: List[str]) -> str:
+    return f"{f} must be one of: {', '.join(choices[:8])}{'...' if len(choices)>8 else ''}"
 
-def validate_and_prepare(form_data: Dict[str, Any]) -> Tuple[pd.DataFrame, List[str], Dict[str, Any]]:
+def validate_frame(frame: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray, Dict[int, List[str]]]:
+    """
+    Columnar validate_and_prepare() for many candidate rows (form field names as columns).
+    Returns (model-ready frame in get_expected_columns() order for every row,
+             boolean mask of invalid rows, {row position: [error messages]} for invalid rows).
+    """
     allowed = get_allowed_values()
+    allowed_sets = {f: frozenset(v) for f, v in allowed.items()}
     hints = get_numeric_hints()
-    errors: List[str] = []
 
-    # Keep only allowed fields
-    clean: Dict[str, Any] = {k: form_data.get(k, "") for k in ALLOWED_FIELDS}
+    frame = frame.reindex(columns=ALLOWED_FIELDS)
+    out = pd.DataFrame(index=frame.index)
+    failures: List[Tuple[np.ndarray, str]] = []
 
-    # Validate numerics
+    # Validate numerics (blank / unparsable -> 0, like the single-row path)
     for f in NUMERIC_FIELDS:
-        v = _coerce_numeric(clean.get(f))
+        col = frame[f]
+        if not pd.api.types.is_numeric_dtype(col):
+            col = col.astype(str).str.strip()
+        v = pd.to_numeric(col, errors="coerce").fillna(0)
         lim = hints.get(f, {})
         vmin, vmax = lim.get("min", None), lim.get("max", None)
-        if vmin is not None and v < vmin:
-            errors.append(f"{f} must be >= {vmin}")
-        if vmax is not None and v > vmax:
-            errors.append(f"{f} must be <= {vmax}")
-        clean[f] = v
+        if vmin is not None:
+            failures.append(((v < vmin).to_numpy(), f"{f} must be >= {vmin}"))
+        if vmax is not None:
+            failures.append(((v > vmax).to_numpy(), f"{f} must be <= {vmax}"))
+        out[f] = v
 
-    # Validate categoricals
+    # Validate categoricals against precomputed sets
     for f in CATEGORICAL_FIELDS:
-        val = str(clean.get(f, "")).strip()
+        val = frame[f].fillna("").astype(str).str.strip()
         choices = allowed.get(f, [])
-        if choices and val not in choices:
-            errors.append(f"{f} must be one of: {', '.join(choices[:8])}{'...' if len(choices)>8 else ''}")
-        clean[f] = val
+        if choices:
+            failures.append(((~val.isin(allowed_sets[f])).to_numpy(), _choices_message(f, choices)))
+        out[f] = val
+
+    invalid = np.zeros(len(frame), dtype=bool)
+    for failed, _msg in failures:
+        invalid |= failed
+    errors = {int(pos): [msg for failed, msg in failures if failed[pos]] for pos in np.flatnonzero(invalid)}
 
-    # Map to training schema (spaces)
-    clean["servant room"] = clean.pop("servant_room")
-    clean["store room"] = clean.pop("store_room")
+    # Map to training schema (spaces) and model order
+    out = out.rename(columns={"servant_room": "servant room", "store_room": "store room"})
+    return out.reindex(columns=get_expected_columns()), invalid, errors
 
-    # Build dataframe in model’s expected order
-    df = pd.DataFrame([clean]).reindex(columns=get_expected_columns())
-    return df, errors, clean
+def validate_and_prepare(form_data: Dict[str, Any]) -> Tuple[pd.DataFrame, List[str], Dict[str, Any]]:
+    # Keep only allowed fields
+    row = {k: form_data.get(k, "") for k in ALLOWED_FIELDS}
+    df, _invalid, errors = validate_frame(pd.DataFrame([row]))
+    # Plain Python scalars, as before (callers json.dumps it); the frame holds numpy ones
+    clean: Dict[str, Any] = {k: v.item() if isinstance(v, np.generic) else v for k, v in df.iloc[0].to_dict().items()}
+    return df, errors.get(0, []), clean
 
 def convert_crore_to_inr(value_in_crore: float) -> float:
     return float(value_in_crore) * 1e7
@@ -0,0 +1,421 @@
+# app/utils/etl_pipeline.py
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Inputs (relative to the project root). The raw flats/houses merge and level-2 cleaning
+# notebooks start from files that are not kept in Dataset/, so the pipeline starts from the
+# imputed dataset, exactly like Notebooks/Feature_Engineering_files/data-visualization.ipynb.
+IMPUTED_DATASET = "Dataset/gurgaon_properties_missing_value_imputation.csv"
+LATLONG_DATASET = "Dataset/latlong.csv"
+# Row-aligned source of the amenity `features` lists: the notebook's gurgaon_properties.csv.
+# Without it the level-2 cleaned copy stands in, but then feature_texts only runs when asked
+# for by name, so a default run never overwrites the committed pickles with approximate ones.
+FEATURE_SOURCES = ("Dataset/gurgaon_properties.csv", "Dataset/gurgaon_properties_cleaned_v1.csv")
+
+EXPORT_DIR = "exported_data"
+STATIC_EXPORT_DIR = "app/static/exports"
+MANIFEST_PATH = "exported_data/.cache/etl/manifest.json"
+
+SECTOR_MEAN_COLUMNS = ["price", "price_per_sqft", "built_up_area", "latitude", "longitude"]
+DEFAULT_CHUNK_SIZE = 50_000
+
+StageFunc = Callable[[List[Path], List[Path], int], Dict[str, Any]]
+
+
+class PipelineError(RuntimeError):
+    """A stage failed or the pipeline was asked for something it cannot do."""
+
+
+# --- chunked I/O helpers ---------------------------------------------------------------------
+
+def file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _infer_dtypes(path: Path, chunk_size: int, usecols: Optional[Sequence[str]] = None) -> Dict[str, str]:
+    """
+    The dtypes a single pd.read_csv of the whole file would infer. Reading chunk by chunk,
+    a column can come out int in one chunk and float in the next (e.g. no NaN in that
+    chunk), which would change how its values are written back.
+    """
+    kinds: Dict[str, set] = {}
+    for chunk in pd.read_csv(path, chunksize=chunk_size, usecols=usecols, encoding="utf-8-sig"):
+        for col in chunk.columns:
+            kind = chunk[col].dtype.kind
+            kinds.setdefault(col, set()).add({"i": "int64", "u": "int64", "f": "float64", "b": "bool"}.get(kind, "object"))
+    dtypes = {}
+    for col, seen in kinds.items():
+        if len(seen) == 1:
+            dtypes[col] = seen.pop()
+        elif seen <= {"int64", "float64"}:
+            dtypes[col] = "float64"
+        else:
+            dtypes[col] = "object"
+    return dtypes
+
+
+def _read_chunks(path: Path, chunk_size: int, usecols: Optional[Sequence[str]] = None) -> Iterator[pd.DataFrame]:
+    dtypes = _infer_dtypes(path, chunk_size, usecols)
+    return pd.read_csv(path, chunksize=chunk_size, usecols=usecols, dtype=dtypes, encoding="utf-8-sig")
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+
+def _write_csv_chunks(chunks: Iterator[pd.DataFrame], path: Path) -> int:
+    """Stream chunks into one CSV (atomically replaced); returns the row count."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(path)
+    rows = 0
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=(i == 0))
+            rows += len(chunk)
+    os.replace(tmp, path)
+    return rows
+
+
+def _write_csv(frame: pd.DataFrame, path: Path, **kwargs: Any) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(path)
+    frame.to_csv(tmp, **kwargs)
+    os.replace(tmp, path)
+
+
+def _write_pickle(obj: Any, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(path)
+    with open(tmp, "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(tmp, path)
+
+
+def parse_latlong(path: Path) -> pd.DataFrame:
+    """latlong.csv with "28.3663° N, 76.9456° E" split into float latitude / longitude."""
+    latlong = pd.read_csv(path, encoding="utf-8-sig")
+    parts = latlong["coordinates"].str.split(",")
+    latlong["latitude"] = parts.str.get(0).str.split("°").str.get(0).astype("float")
+    latlong["longitude"] = parts.str.get(1).str.split("°").str.get(0).astype("float")
+    return latlong
+
+
+# --- stages (top-level functions so a process pool can run them) -----------------------------
+
+def stage_data_viz_full(inputs: List[Path], outputs: List[Path], chunk_size: int) -> Dict[str, Any]:
+    """Listings with sector coordinates (inner join), as used by the analytics page."""
+    imputed, latlong_path = inputs
+    latlong = parse_latlong(latlong_path)
+    rows = _write_csv_chunks((c.merge(latlong, on="sector") for c in _read_chunks(imputed, chunk_size)), outputs[0])
+    return {"rows": rows}
+
+
+def stage_data_viz1(inputs: List[Path], outputs: List[Path], chunk_size: int) -> Dict[str, Any]:
+    """Every listing with latitude / longitude where the sector has coordinates (left join)."""
+    imputed, latlong_path = inputs
+    latlong = parse_latlong(latlong_path)[["sector", "latitude", "longitude"]]
+    rows = _write_csv_chunks(
+        (c.merge(latlong, on="sector", how="left") for c in _read_chunks(imputed, chunk_size)), outputs[0]
+    )
+    return {"rows": rows}
+
+
+def stage_cleaned_copy(inputs: List[Path], outputs: List[Path], chunk_size: int) -> Dict[str, Any]:
+    """The imputed dataset as the static export gurgaon_cleaned_data.csv (a streamed byte copy)."""
+    outputs[0].parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(outputs[0])
+    with open(inputs[0], "rb") as src, open(tmp, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1 << 20)
+    os.replace(tmp, outputs[0])
+    return {"bytes": outputs[0].stat().st_size}
+
+
+def stage_sector_aggregates(inputs: List[Path], outputs: List[Path], chunk_size: int) -> Dict[str, Any]:
+    """
+    Per-sector means from data_viz_full.csv in one streaming pass (running sums and non-null
+    counts per sector): grouped_sector_data.csv and the static sector_summary.csv.
+    """
+    grouped_path, summary_path = outputs
+    sums: Optional[pd.DataFrame] = None
+    counts: Optional[pd.DataFrame] = None
+    sizes: Optional[pd.Series] = None
+    for chunk in _read_chunks(inputs[0], chunk_size, usecols=["sector", *SECTOR_MEAN_COLUMNS]):
+        values = chunk[SECTOR_MEAN_COLUMNS].apply(pd.to_numeric, errors="coerce")
+        grouped = values.groupby(chunk["sector"])
+        chunk_sums, chunk_counts, chunk_sizes = grouped.sum(), grouped.count(), grouped.size()
+        sums = chunk_sums if sums is None else sums.add(chunk_sums, fill_value=0)
+        counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+        sizes = chunk_sizes if sizes is None else sizes.add(chunk_sizes, fill_value=0)
+
+    if sums is None:
+        means = pd.DataFrame(columns=SECTOR_MEAN_COLUMNS, index=pd.Index([], name="sector"))
+        sizes = pd.Series(dtype="int64")
+    else:
+        means = (sums / counts.where(counts > 0)).sort_index()
+        sizes = sizes.sort_index()
+    means.index.name = "sector"
+    _write_csv(means.reset_index(), grouped_path, index=False)
+
+    summary = pd.DataFrame({
+        "sector": means.index,
+        "latitude": means["latitude"].to_numpy(),
+        "longitude": means["longitude"].to_numpy(),
+        "avg_price": means["price"].to_numpy(),
+        "avg_pps": means["price_per_sqft"].to_numpy(),
+        "avg_area": means["built_up_area"].to_numpy(),
+        "listings": sizes.reindex(means.index).fillna(0).astype("int64").to_numpy(),
+    })
+    _write_csv(summary, summary_path, index=False)
+    return {"sectors": len(means)}
+
+
+def stage_feature_texts(inputs: List[Path], outputs: List[Path], chunk_size: int) -> Dict[str, Any]:
+    """
+    Amenity text per sector (sector_feature_map.pkl) and for the whole city (feature_text.pkl).
+    As in the notebook, feature lists and sectors are paired by row position.
+    """
+    feature_source, imputed = inputs
+    sector_map_path, feature_text_path = outputs
+    per_sector: Dict[str, List[str]] = {}
+    every: List[str] = []
+    features_chunks = pd.read_csv(feature_source, chunksize=chunk_size, usecols=["features"], encoding="utf-8-sig")
+    sector_chunks = pd.read_csv(imputed, chunksize=chunk_size, usecols=["sector"], encoding="utf-8-sig")
+    for features, sectors in zip(features_chunks, sector_chunks):
+        n = min(len(features), len(sectors))
+        for raw, sector in zip(features["features"].iloc[:n].tolist(), sectors["sector"].iloc[:n].tolist()):
+            bucket = per_sector.setdefault(sector, [])
+            if isinstance(raw, str):
+                items = ast.literal_eval(raw)
+                bucket.extend(items)
+                every.extend(items)
+    _write_pickle({sector: " ".join(items) for sector, items in per_sector.items()}, sector_map_path)
+    _write_pickle(" ".join(every), feature_text_path)
+    return {"sectors": len(per_sector), "features": len(every)}
+
+
+def stage_correlation_matrix(inputs: List[Path], outputs: List[Path], chunk_size: int) -> Dict[str, Any]:
+    """
+    Pearson correlation of the numeric columns with pairwise-complete rows, like
+    DataFrame.corr(), from per-chunk cross products. Values are shifted by the first chunk's
+    means first, which keeps the single-pass sums numerically stable.
+    """
+    cols = [c for c, t in _infer_dtypes(inputs[0], chunk_size).items() if t in ("int64", "float64")]
+    k = len(cols)
+    n = np.zeros((k, k))
+    sx = np.zeros((k, k))
+    sxx = np.zeros((k, k))
+    sxy = np.zeros((k, k))
+    shift: Optional[np.ndarray] = None
+    for chunk in _read_chunks(inputs[0], chunk_size, usecols=cols):
+        X = chunk[cols].to_numpy(dtype=float)
+        if shift is None:
+            shift = np.nan_to_num(np.nanmean(X, axis=0)) if len(X) else np.zeros(k)
+        M = np.isfinite(X).astype(float)
+        X0 = np.where(M > 0, X - shift, 0.0)
+        n += M.T @ M
+        sx += X0.T @ M            # sx[i, j]: sum of column i over rows where j is present
+        sxx += (X0 * X0).T @ M
+        sxy += X0.T @ X0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sx.T / n
+        var_i = sxx - sx * sx / n
+        corr = cov / np.sqrt(var_i * var_i.T)
+    corr[n < 2] = np.nan
+    _write_csv(pd.DataFrame(corr, index=cols, columns=cols), outputs[0])
+    return {"columns": k}
+
+
+class Stage:
+    """One step: named inputs -> outputs (paths relative to the project root)."""
+
+    def __init__(self, name: str, func: StageFunc, inputs: Sequence[str], outputs: Sequence[str], version: int = 1,
+                 explicit: Optional[str] = None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.version = version  # bump when the stage's output for the same inputs changes
+        self.explicit = explicit  # if set, why the stage is left out unless named in `only`
+
+
+def pipeline_stages(root: Path) -> List[Stage]:
+    feature_source, fallback = FEATURE_SOURCES
+    feature_texts_explicit = None
+    if not (root / feature_source).exists():
+        feature_source = fallback
+        feature_texts_explicit = f"{FEATURE_SOURCES[0]} is missing and {fallback} is only an approximation"
+    return [
+        Stage("data_viz_full", stage_data_viz_full, [IMPUTED_DATASET, LATLONG_DATASET],
+              [f"{EXPORT_DIR}/data_viz_full.csv"]),
+        Stage("data_viz1", stage_data_viz1, [IMPUTED_DATASET, LATLONG_DATASET],
+              [f"{STATIC_EXPORT_DIR}/data_viz1.csv"]),
+        Stage("cleaned_copy", stage_cleaned_copy, [IMPUTED_DATASET],
+              [f"{STATIC_EXPORT_DIR}/gurgaon_cleaned_data.csv"]),
+        Stage("sector_aggregates", stage_sector_aggregates, [f"{EXPORT_DIR}/data_viz_full.csv"],
+              [f"{EXPORT_DIR}/grouped_sector_data.csv", f"{STATIC_EXPORT_DIR}/sector_summary.csv"]),
+        Stage("feature_texts", stage_feature_texts, [feature_source, IMPUTED_DATASET],
+              [f"{EXPORT_DIR}/sector_feature_map.pkl", f"{STATIC_EXPORT_DIR}/feature_text.pkl"],
+              explicit=feature_texts_explicit),
+        Stage("correlation_matrix", stage_correlation_matrix, [IMPUTED_DATASET],
+              [f"{STATIC_EXPORT_DIR}/correlation_matrix.csv"]),
+    ]
+
+
+# --- runner ----------------------------------------------------------------------------------
+
+def _load_manifest(path: Path) -> Dict[str, Any]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(path: Path, manifest: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(path)
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _stage_key(stage: Stage, root: Path) -> str:
+    h = hashlib.sha256(f"{stage.name}:v{stage.version}".encode("utf-8"))
+    for rel in stage.inputs:
+        h.update(f"\0{rel}\0{file_digest(root / rel)}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _up_to_date(entry: Optional[Dict[str, Any]], key: str, root: Path) -> bool:
+    if not entry or entry.get("key") != key:
+        return False
+    for rel, digest in entry.get("outputs", {}).items():
+        path = root / rel
+        if not path.exists() or file_digest(path) != digest:
+            return False
+    return True
+
+
+def _run_stage(func: StageFunc, inputs: List[str], outputs: List[str], root: str, chunk_size: int) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    stats = func([Path(root) / p for p in inputs], [Path(root) / p for p in outputs], chunk_size)
+    return {"seconds": round(time.perf_counter() - t0, 3), **stats}
+
+
+def run_pipeline(
+    root: Path,
+    only: Optional[Sequence[str]] = None,
+    force: bool = False,
+    workers: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    log: Callable[[str], None] = print,
+) -> List[Dict[str, Any]]:
+    """
+    Regenerate the runtime artifacts under `root`. Stages whose outputs feed other stages run
+    first; independent stages run side by side in a process pool (`workers`, 0 = one per
+    core). A stage is skipped when the content hashes of its inputs (and of its own outputs)
+    match the manifest of its last run, unless `force`. Stages marked `explicit` run only when
+    named in `only`. Returns one report dict per stage run or skipped.
+    """
+    root = Path(root)
+    stages = {s.name: s for s in pipeline_stages(root)}
+    if only:
+        selected = list(only)
+    else:
+        selected = [name for name, s in stages.items() if not s.explicit]
+        for s in stages.values():
+            if s.explicit:
+                log(f"[etl] {s.name}: left out ({s.explicit}); run it with --stage {s.name}")
+    unknown = [name for name in selected if name not in stages]
+    if unknown:
+        raise PipelineError(f"Unknown stage(s): {', '.join(unknown)}; choose from {', '.join(stages)}")
+
+    producers = {out: s.name for s in stages.values() for out in s.outputs}
+    deps = {name: {producers[i] for i in stages[name].inputs if i in producers and producers[i] in selected}
+            for name in selected}
+    for name in selected:
+        missing = [i for i in stages[name].inputs if i not in producers and not (root / i).exists()]
+        if missing:
+            raise PipelineError(f"Stage {name}: missing input(s) {', '.join(missing)}")
+
+    manifest_path = root / MANIFEST_PATH
+    manifest = _load_manifest(manifest_path)
+    reports: Dict[str, Dict[str, Any]] = {}
+    pending = list(selected)
+    running: Dict[Future, str] = {}
+    keys: Dict[str, str] = {}
+    workers = workers or min(os.cpu_count() or 1, len(selected)) or 1
+    # spawn, not fork: the caller may be a multi-threaded web process
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) \
+        if workers > 1 else None
+
+    def finish(name: str, report: Dict[str, Any]) -> None:
+        reports[name] = {"stage": name, **report}
+        detail = ", ".join(f"{k}={v}" for k, v in report.items() if k != "status")
+        log(f"[etl] {name}: {report['status']}{f' ({detail})' if detail else ''}")
+
+    try:
+        while pending or running:
+            for name in list(pending):
+                if any(d not in reports for d in deps[name]):
+                    continue
+                pending.remove(name)
+                if any(reports[d]["status"] in ("failed", "blocked") for d in deps[name]):
+                    finish(name, {"status": "blocked"})
+                    continue
+                stage = stages[name]
+                keys[name] = _stage_key(stage, root)
+                if not force and _up_to_date(manifest.get(name), keys[name], root):
+                    finish(name, {"status": "skipped"})
+                    continue
+                args = (stage.func, stage.inputs, stage.outputs, str(root), chunk_size)
+                if pool is None:
+                    future: Future = Future()
+                    try:
+                        future.set_result(_run_stage(*args))
+                    except Exception as e:
+                        future.set_exception(e)
+                else:
+                    future = pool.submit(_run_stage, *args)
+                running[future] = name
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    finish(name, {"status": "failed", "error": f"{type(e).__name__}: {e}"})
+                    continue
+                stage = stages[name]
+                manifest[name] = {
+                    "key": keys[name],
+                    "outputs": {rel: file_digest(root / rel) for rel in stage.outputs},
+                    "finished_at": time.time(),
+                    **stats,
+                }
+                _save_manifest(manifest_path, manifest)
+                finish(name, {"status": "ran", **stats})
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+    return [reports[name] for name in selected]
@@ -0,0 +1,320 @@
+# app/utils/figure_cache.py
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+from flask import current_app
+
+from .analytics_loader import (
+    FIGURE_BUILDERS,
+    build_figure,
+    build_figures,
+    corr_heatmap_figure,
+    figure_options_key,
+    get_dataset_version,
+    get_visualization_data,
+    render_figure,
+)
+from .compression import gzip_bytes
+from .row_filters import Filters, filter_key, filter_spec, filters_match, get_filtered_data
+
+# Bump when a builder's or serializer's output changes so persisted fragments are not reused
+FIGURE_CACHE_SCHEMA = 3
+
+# (dataset version, figure name, format) -> serialized figure
+_MEMORY: Dict[Tuple[str, str, str], str] = {}
+_LOCKS: Dict[Tuple[str, str, str], threading.Lock] = {}
+_LOCKS_GUARD = threading.Lock()
+# Same key -> gzip of the serialized figure, so hot endpoints never re-compress
+_GZIP: Dict[Tuple[str, str, str], bytes] = {}
+# Filtered views: (dataset version, figure name, format, filter key) -> serialized figure.
+# Bounded LRU in memory only; filter combinations are open-ended and not worth persisting.
+_FILTERED: "OrderedDict[Tuple[str, str, str, str], str]" = OrderedDict()
+# Same key -> gzip of the filtered figure; evicted along with its _FILTERED entry
+_FILTERED_GZIP: Dict[Tuple[str, str, str, str], bytes] = {}
+_FILTERED_LOCK = threading.Lock()
+
+# Figures drawn from per-sector means or the correlation matrix only: after an ingest they are
+# re-rendered from the incrementally maintained aggregates (see carry_over_figures)
+AGGREGATE_FIGURES = ("map", "sector_bar_psf", "corr_heatmap")
+
+
+def _cache_root() -> Optional[Path]:
+    cache_dir = current_app.config.get("FIGURE_CACHE_DIR")
+    return Path(cache_dir) if cache_dir else None
+
+
+def _version_key(version: str) -> str:
+    return f"v{FIGURE_CACHE_SCHEMA}-{version}-{figure_options_key()}"
+
+
+def _disk_path(version: str, name: str, fmt: str) -> Optional[Path]:
+    root = _cache_root()
+    if root is None:
+        return None
+    return root / _version_key(version) / f"{name}.{fmt}"
+
+
+def _lock_for(key: Tuple[str, str, str]) -> threading.Lock:
+    with _LOCKS_GUARD:
+        return _LOCKS.setdefault(key, threading.Lock())
+
+
+def _read_disk(path: Optional[Path]) -> Optional[str]:
+    if path is None or not path.exists():
+        return None
+    try:
+        return path.read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def _write_disk(path: Optional[Path], payload: str) -> None:
+    if path is None:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent workers never read a half-written file
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(payload, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        current_app.logger.warning(f"[figure_cache] could not persist {path}: {e}")
+
+
+def _drop_stale(version: str) -> None:
+    for key in [k for k in _MEMORY if k[0] != version]:
+        _MEMORY.pop(key, None)
+        _GZIP.pop(key, None)
+
+
+def _get_filtered_figure(name: str, fmt: str, version: str, filters: Filters) -> str:
+    key = (version, name, fmt, filter_key(filters))
+    with _FILTERED_LOCK:
+        payload = _FILTERED.get(key)
+        if payload is not None:
+            _FILTERED.move_to_end(key)
+            return payload
+
+    df, group_df = get_filtered_data(filters, version)
+    t0 = time.perf_counter()
+    payload = build_figure(name, df, group_df, fmt)
+    current_app.logger.info(f"[figure_cache] built {name} for {len(df)} filtered rows in {time.perf_counter() - t0:.2f}s")
+
+    size = int(current_app.config.get("ANALYTICS_FILTERED_FIGURE_CACHE_SIZE", 512))
+    with _FILTERED_LOCK:
+        for stale in [k for k in _FILTERED if k[0] != version]:
+            del _FILTERED[stale]
+            _FILTERED_GZIP.pop(stale, None)
+        if size > 0:
+            _FILTERED[key] = payload
+            while len(_FILTERED) > size:
+                evicted, _ = _FILTERED.popitem(last=False)
+                _FILTERED_GZIP.pop(evicted, None)
+    return payload
+
+
+def get_figure(name: str, fmt: str = "html", version: Optional[str] = None,
+               filters: Optional[Filters] = None) -> str:
+    """
+    Serialized figure ("html" fragment or "json" spec) for the current dataset, optionally
+    restricted to the listings matching `filters` (see row_filters.parse_filters).
+    Lookup order: in-process memory -> on-disk store -> build (and persist).
+    """
+    if name not in FIGURE_BUILDERS:
+        raise KeyError(name)
+    version = version or get_dataset_version()
+    if filters:
+        return _get_filtered_figure(name, fmt, version, filters)
+    key = (version, name, fmt)
+
+    payload = _MEMORY.get(key)
+    if payload is not None:
+        return payload
+
+    with _lock_for(key):
+        payload = _MEMORY.get(key)
+        if payload is not None:
+            return payload
+
+        path = _disk_path(version, name, fmt)
+        payload = _read_disk(path)
+        if payload is None:
+            df, group_df, _ = get_visualization_data()
+            t0 = time.perf_counter()
+            payload = build_figure(name, df, group_df, fmt)
+            current_app.logger.info(f"[figure_cache] built {name} in {time.perf_counter() - t0:.2f}s")
+            _write_disk(path, payload)
+
+        _drop_stale(version)
+        _MEMORY[key] = payload
+        return payload
+
+
+def get_figure_gzip(name: str, fmt: str = "json", version: Optional[str] = None,
+                    filters: Optional[Filters] = None) -> bytes:
+    version = version or get_dataset_version()
+    if filters:
+        filtered_key = (version, name, fmt, filter_key(filters))
+        data = _FILTERED_GZIP.get(filtered_key)
+        if data is None:
+            data = gzip_bytes(get_figure(name, fmt, version, filters).encode("utf-8"))
+            with _FILTERED_LOCK:
+                if filtered_key in _FILTERED:  # only alongside a cached payload, so eviction covers it
+                    _FILTERED_GZIP[filtered_key] = data
+        return data
+    key = (version, name, fmt)
+    data = _GZIP.get(key)
+    if data is None:
+        data = gzip_bytes(get_figure(name, fmt, version).encode("utf-8"))
+        _GZIP[key] = data
+    return data
+
+
+def get_all_figures(fmt: str = "html", names: Optional[Iterable[str]] = None,
+                    mode: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, str]:
+    """
+    Several figures at once. Those not in memory or on disk are built together through
+    build_figures (concurrently, per ANALYTICS_BUILD_MODE); a figure that fails or times
+    out is returned as its alert placeholder and not cached, so the next request retries it.
+    Each build holds the figure's get_figure lock until its builder has actually stopped, so
+    while a timed-out builder is still running, retries get the placeholder instead of
+    starting another one.
+    """
+    version = get_dataset_version()
+    names = list(names or FIGURE_BUILDERS)
+    figs: Dict[str, str] = {}
+    missing = []
+    for name in names:
+        key = (version, name, fmt)
+        payload = _MEMORY.get(key)
+        if payload is None:
+            payload = _read_disk(_disk_path(version, name, fmt))
+            if payload is not None:
+                _MEMORY[key] = payload
+        if payload is not None:
+            figs[name] = payload
+        elif _lock_for(key).acquire(blocking=False):
+            missing.append(name)
+        else:
+            figs[name] = render_figure(
+                "<div class='alert alert-warning mb-0'>This chart is still being built; try again shortly.</div>", fmt
+            )
+
+    if missing:
+        pending = set(missing)
+
+        def release(name: str) -> None:
+            try:
+                pending.remove(name)  # at most once per figure, whichever path gets here first
+            except KeyError:
+                return
+            _lock_for((version, name, fmt)).release()
+
+        try:
+            df, group_df, _ = get_visualization_data()
+            t0 = time.perf_counter()
+            built, timings = build_figures(df, group_df, missing, fmt, mode=mode, timeout=timeout, on_finish=release)
+        except BaseException:
+            for name in list(pending):
+                release(name)
+            raise
+        report = ", ".join(
+            f"{name} {t['seconds']:.2f}s" if t["status"] == "ok" else f"{name} {t['status']}"
+            for name, t in timings.items()
+        )
+        current_app.logger.info(
+            f"[figure_cache] built {len(missing)} figures in {time.perf_counter() - t0:.2f}s ({report})"
+        )
+        _drop_stale(version)
+        for name, payload in built.items():
+            if timings[name]["status"] == "ok":
+                _write_disk(_disk_path(version, name, fmt), payload)
+                _MEMORY[(version, name, fmt)] = payload
+            else:
+                current_app.logger.warning(f"[figure_cache] {name}: {timings[name]['status']} {timings[name].get('error', '')}")
+            figs[name] = payload
+    return {name: figs[name] for name in names}
+
+
+def warm_up_figures(fmt: str = "json") -> Dict[str, str]:
+    """Build (or load from disk) every figure for the current dataset and prune stale versions on disk."""
+    t0 = time.perf_counter()
+    figs = get_all_figures(fmt)
+    prune_disk_cache()
+    current_app.logger.info(f"[figure_cache] warm-up done: {len(figs)} figures in {time.perf_counter() - t0:.2f}s")
+    return figs
+
+
+def prune_disk_cache() -> None:
+    root = _cache_root()
+    if root is None or not root.exists():
+        return
+    current = _version_key(get_dataset_version())
+    for child in root.iterdir():
+        if child.is_dir() and child.name != current:
+            shutil.rmtree(child, ignore_errors=True)
+
+
+def carry_over_figures(old_version: str, new_version: str, rows: pd.DataFrame,
+                       group_df: pd.DataFrame, corr: pd.DataFrame) -> Dict[str, int]:
+    """
+    After `rows` were appended to the dataset (old_version -> new_version), keep what they
+    cannot have changed instead of dropping the whole cache:
+    - filtered views whose filters match none of the new rows move to the new version;
+    - AGGREGATE_FIGURES cached for the old version are re-rendered from the updated sector
+      means (`group_df`) and correlation matrix (`corr`), at a cost independent of the
+      number of listings;
+    - the other figures plot every listing, so they are dropped and rebuilt on demand.
+    Returns counts of kept / refreshed / dropped entries.
+    """
+    report = {"kept": 0, "refreshed": 0, "dropped": 0}
+    with _FILTERED_LOCK:
+        for key in list(_FILTERED):
+            payload = _FILTERED.pop(key)
+            gzipped = _FILTERED_GZIP.pop(key, None)
+            filters = filter_spec(key[3])
+            if key[0] == old_version and filters is not None and not filters_match(filters, rows).any():
+                new_key = (new_version, key[1], key[2], key[3])
+                _FILTERED[new_key] = payload
+                if gzipped is not None:
+                    _FILTERED_GZIP[new_key] = gzipped
+                report["kept"] += 1
+            else:
+                report["dropped"] += 1
+
+    stale = [k for k in _MEMORY if k[0] == old_version]
+    for key in stale:
+        _, name, fmt = key
+        if name in AGGREGATE_FIGURES:
+            if name == "corr_heatmap":
+                payload = render_figure(corr_heatmap_figure(corr), fmt)
+            else:
+                payload = build_figure(name, rows, group_df, fmt)
+            _write_disk(_disk_path(new_version, name, fmt), payload)
+            _MEMORY[(new_version, name, fmt)] = payload
+            report["refreshed"] += 1
+        else:
+            report["dropped"] += 1
+    _drop_stale(new_version)
+    return report
+
+
+def clear_figure_cache(disk: bool = False) -> None:
+    _MEMORY.clear()
+    _GZIP.clear()
+    with _FILTERED_LOCK:
+        _FILTERED.clear()
+        _FILTERED_GZIP.clear()
+    if disk:
+        root = _cache_root()
+        if root is not None:
+            shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,335 @@
+# app/utils/ingestion.py
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, keep to a single writer
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+
+from .analytics_loader import (
+    BINARY_SUFFIX,
+    CORR_HEATMAP_COLUMNS,
+    _file_signature,
+    append_to_dataset_cache,
+    coerce_numeric_columns,
+    get_dataset_version,
+    get_visualization_data,
+    visualization_paths,
+)
+from .etl_pipeline import IMPUTED_DATASET, LATLONG_DATASET, parse_latlong
+from .figure_cache import carry_over_figures
+from .listing_aggregates import ListingAggregates
+from .map_tiles import carry_over_tiles
+from .model_loader import get_schema_examples
+from .row_filters import carry_over_filters
+from .wordcloud_cache import carry_over_wordclouds
+
+# Columns of the imputed dataset (Dataset/gurgaon_properties_missing_value_imputation.csv), in file order
+LISTING_COLUMNS = (
+    "property_type", "society", "sector", "price", "price_per_sqft", "bedRoom", "bathroom", "balcony",
+    "floorNum", "facing", "agePossession", "built_up_area", "study room", "servant room", "store room",
+    "pooja room", "others", "furnishing_type", "luxury_score",
+)
+TEXT_COLUMNS = ("property_type", "society", "sector", "balcony", "facing", "agePossession")
+REQUIRED_COLUMNS = ("property_type", "sector", "price", "bedRoom", "bathroom", "built_up_area", "agePossession")
+
+AGGREGATES_FILE = "aggregates.pkl"
+LOCK_FILE = "ingest.lock"
+
+# One ingest at a time: this lock between threads, a flock on LOCK_FILE between processes
+# (web workers and the CLI)
+_INGEST_LOCK = threading.Lock()
+_AGGREGATES_CACHE: Dict[str, Any] = {"source": None, "aggregates": None}
+_COORDINATES_CACHE: Dict[str, Any] = {"signature": None, "frame": None}
+
+
+class IngestError(ValueError):
+    """The batch cannot be ingested; `errors` maps row positions to their validation messages."""
+
+    def __init__(self, message: str, errors: Optional[Dict[int, List[str]]] = None):
+        super().__init__(message)
+        self.errors = errors or {}
+
+
+def _project_root() -> Path:
+    return Path(current_app.root_path).parent
+
+
+def parse_listing_payload(raw: bytes, content_type: str, max_rows: int) -> pd.DataFrame:
+    """JSON (a list of records or {"records": [...]}) or CSV -> DataFrame of raw listing values."""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    try:
+        if content_type in ("text/csv", "application/csv"):
+            frame = pd.read_csv(io.BytesIO(raw), dtype=str, keep_default_na=False, encoding="utf-8-sig")
+        else:
+            payload = json.loads(raw.decode("utf-8")) if raw else []
+            if isinstance(payload, dict):
+                payload = payload.get("records", [])
+            if not isinstance(payload, list):
+                raise IngestError("JSON body must be a list of records or {\"records\": [...]}")
+            frame = pd.DataFrame.from_records(payload)
+    except IngestError:
+        raise
+    except Exception as e:
+        raise IngestError(f"Could not parse listings: {e}") from e
+
+    if len(frame) > max_rows:
+        raise IngestError(f"Batch has {len(frame)} rows; the limit is {max_rows}.")
+    return frame
+
+
+def _sector_coordinates() -> pd.DataFrame:
+    path = _project_root() / LATLONG_DATASET
+    signature = _file_signature([path])
+    if _COORDINATES_CACHE["signature"] != signature:
+        _COORDINATES_CACHE["frame"] = parse_latlong(path)[["sector", "coordinates", "latitude", "longitude"]]
+        _COORDINATES_CACHE["signature"] = signature
+    return _COORDINATES_CACHE["frame"]
+
+
+def validate_listings(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Listings checked against Saved_Model/expected_columns_with_examples.json: numeric bounds
+    for its numeric columns, the listed values for its categorical text columns, plus
+    required fields and a sector with coordinates. Returns them in LISTING_COLUMNS order
+    (numbers as float64, price_per_sqft derived when blank); raises IngestError otherwise.
+    """
+    unknown = [c for c in frame.columns if c not in LISTING_COLUMNS]
+    if unknown:
+        raise IngestError(f"Unknown column(s): {', '.join(map(str, unknown))}")
+    missing = [c for c in REQUIRED_COLUMNS if c not in frame.columns]
+    if missing:
+        raise IngestError(f"Missing required column(s): {', '.join(missing)}")
+
+    schema = get_schema_examples()
+    frame = frame.reindex(columns=LISTING_COLUMNS).reset_index(drop=True)
+    out = pd.DataFrame(index=frame.index)
+    failures: List[Tuple[np.ndarray, str]] = []
+
+    for col in LISTING_COLUMNS:
+        raw = frame[col]
+        text = raw.astype("object").where(raw.notna(), "").astype(str).str.strip()
+        spec = schema.get(col, {})
+        if col in TEXT_COLUMNS:
+            value = text.where(text != "", np.nan).astype("object")
+            if spec.get("type") == "categorical" and spec.get("examples"):
+                allowed = sorted({str(v) for v in spec["examples"]})
+                message = f"{col} must be one of: {', '.join(allowed[:8])}{'...' if len(allowed) > 8 else ''}"
+                failures.append(((value.notna() & ~value.isin(allowed)).to_numpy(), message))
+        else:
+            value = pd.to_numeric(text.where(text != "", np.nan), errors="coerce").astype("float64")
+            failures.append(((text != "").to_numpy() & value.isna().to_numpy(), f"{col} must be a number"))
+            if spec.get("type") == "numeric":
+                if spec.get("min") is not None:
+                    failures.append(((value < spec["min"]).to_numpy(), f"{col} must be >= {spec['min']}"))
+                if spec.get("max") is not None:
+                    failures.append(((value > spec["max"]).to_numpy(), f"{col} must be <= {spec['max']}"))
+        if col in REQUIRED_COLUMNS:
+            failures.append(((text == "").to_numpy(), f"{col} is required"))
+        out[col] = value
+
+    failures.append(((out["price"] <= 0).to_numpy(), "price must be > 0"))
+    derived = (out["price"] * 1e7 / out["built_up_area"]).round()
+    out["price_per_sqft"] = out["price_per_sqft"].fillna(derived)
+    known = set(_sector_coordinates()["sector"])
+    failures.append(((out["sector"].notna() & ~out["sector"].isin(known)).to_numpy(),
+                     "sector has no coordinates in latlong.csv"))
+
+    invalid = np.zeros(len(out), dtype=bool)
+    for failed, _msg in failures:
+        invalid |= failed
+    if invalid.any():
+        errors = {int(pos): [msg for failed, msg in failures if failed[pos]] for pos in np.flatnonzero(invalid)}
+        raise IngestError(f"{len(errors)} of {len(out)} listings failed validation", errors)
+    return out
+
+
+def _csv_source(path: Path) -> Path:
+    # The loaders may be reading a Feather copy; new rows always go to the CSV itself
+    return path.with_suffix(".csv") if path.suffix == BINARY_SUFFIX else path
+
+
+def _csv_header(path: Path, rows: pd.DataFrame) -> List[str]:
+    """The file's header, after checking `rows` provide every column in it."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f), [])
+    missing = [c for c in header if c not in rows.columns]
+    if missing:
+        raise IngestError(f"{path.name} has column(s) the listings do not provide: {', '.join(missing)}")
+    return header
+
+
+def _append_csv(path: Path, header: List[str], rows: pd.DataFrame) -> None:
+    """Append `rows` under the file's existing `header`, touching only the end of the file."""
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size:
+            f.seek(-1, os.SEEK_END)
+        needs_newline = size > 0 and f.read(1) != b"\n"
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        if needs_newline:
+            f.write("\n")
+        rows[header].to_csv(f, header=False, index=False)
+
+
+def _state_dir() -> Path:
+    return Path(current_app.config.get("INGEST_STATE_DIR") or _project_root() / "exported_data" / ".cache" / "ingest")
+
+
+def _aggregates_path() -> Path:
+    return _state_dir() / AGGREGATES_FILE
+
+
+@contextmanager
+def _ingest_lock() -> Iterator[None]:
+    """Held around the whole append -> aggregate -> rewrite sequence, across threads and processes."""
+    with _INGEST_LOCK:
+        if fcntl is None:
+            yield
+            return
+        path = _state_dir() / LOCK_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _source_of(path: Path) -> Tuple[int, int]:
+    st = path.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def get_listing_aggregates() -> ListingAggregates:
+    """
+    Aggregates describing the current data_viz_full.csv: kept in memory, else the persisted
+    copy when it was saved for this exact file (size and mtime), else computed once from the
+    full dataset and persisted for the next ingest.
+    """
+    source = _source_of(_csv_source(visualization_paths()[0]))
+    if _AGGREGATES_CACHE["source"] == source:
+        return _AGGREGATES_CACHE["aggregates"]
+    path = _aggregates_path()
+    aggregates = ListingAggregates.load(path) if path.exists() else None
+    if aggregates is None or aggregates.source != source or aggregates.covariance.columns != list(CORR_HEATMAP_COLUMNS):
+        df, _, _ = get_visualization_data()
+        t0 = time.perf_counter()
+        aggregates = ListingAggregates.from_frame(df, CORR_HEATMAP_COLUMNS)
+        aggregates.source = source
+        aggregates.save(path)
+        current_app.logger.info(f"[ingest] aggregates built from {len(df)} listings in {time.perf_counter() - t0:.2f}s")
+    _AGGREGATES_CACHE["aggregates"] = aggregates
+    _AGGREGATES_CACHE["source"] = source
+    return aggregates
+
+
+def _replace_sector_rows(group_df: pd.DataFrame, updated: pd.DataFrame) -> pd.DataFrame:
+    """grouped_sector_data with the rows of `updated`'s sectors replaced (others untouched)."""
+    keep = group_df[~group_df["sector"].astype(str).isin(updated["sector"])]
+    keep = keep.assign(sector=keep["sector"].astype(str))
+    merged = pd.concat([keep, updated.reindex(columns=group_df.columns)], ignore_index=True)
+    return merged.sort_values("sector", kind="stable").reset_index(drop=True)
+
+
+def _rewrite_sector_lines(path: Path, updated: pd.DataFrame) -> None:
+    """
+    Replace (or add) the lines of `updated`'s sectors in grouped_sector_data.csv, keeping every
+    other line byte for byte (re-serializing them through read_csv could change last digits).
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        header, *lines = list(csv.reader(f))
+    buffer = io.StringIO()
+    updated.reindex(columns=header).to_csv(buffer, header=False, index=False)
+    by_sector = {line[0]: line for line in lines if line}
+    by_sector.update({line[0]: line for line in csv.reader(io.StringIO(buffer.getvalue())) if line})
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(header)
+        writer.writerows(by_sector[sector] for sector in sorted(by_sector))
+    os.replace(tmp, path)
+
+
+def ingest_listings(frame: pd.DataFrame, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Validate new listings and append them to the runtime dataset: the imputed source CSV (so
+    `flask analytics etl` reproduces them) and data_viz_full.csv, with sector coordinates.
+    Per-sector means, quantile sketches and the running covariance are updated from the new
+    rows alone, grouped_sector_data.csv gets new rows only for the sectors they touch, and
+    caches are carried over to the new dataset version except where the new rows change them.
+    """
+    t0 = time.perf_counter()
+    listings = validate_listings(frame)
+    rows = listings.merge(_sector_coordinates(), on="sector", how="left")
+    if dry_run:
+        return {"rows": len(rows), "dry_run": True}
+
+    with _ingest_lock():
+        paths = visualization_paths()
+        previous_signature = _file_signature(paths)
+        old_version = get_dataset_version()
+        _, group_df, _ = get_visualization_data()
+        aggregates = get_listing_aggregates()
+        df_csv, grouped_csv = _csv_source(paths[0]), _csv_source(paths[1])
+
+        # The two appends go together: check both headers first, and undo the first if the second fails
+        imputed_csv = _project_root() / IMPUTED_DATASET
+        imputed_header, df_header = _csv_header(imputed_csv, listings), _csv_header(df_csv, rows)
+        imputed_size, df_size = imputed_csv.stat().st_size, df_csv.stat().st_size
+        _append_csv(imputed_csv, imputed_header, listings)
+        try:
+            _append_csv(df_csv, df_header, rows)
+        except BaseException:
+            for path, size in ((df_csv, df_size), (imputed_csv, imputed_size)):
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+            raise
+
+        numeric_rows = coerce_numeric_columns(rows.copy())
+        sectors = aggregates.update(numeric_rows)
+        updated = aggregates.sector_means(sectors)
+        group_df = _replace_sector_rows(group_df, updated)
+        _rewrite_sector_lines(grouped_csv, updated)
+
+        new_version = append_to_dataset_cache(previous_signature, rows, group_df)
+        aggregates.source = _source_of(df_csv)
+        aggregates.save(_aggregates_path())
+        _AGGREGATES_CACHE["aggregates"] = aggregates
+        _AGGREGATES_CACHE["source"] = aggregates.source
+
+        lat, lon = numeric_rows["latitude"].to_numpy(dtype=float), numeric_rows["longitude"].to_numpy(dtype=float)
+        subsets_kept, subsets_dropped = carry_over_filters(old_version, new_version, numeric_rows)
+        tiles_kept, tiles_dropped = carry_over_tiles(old_version, new_version, lat, lon)
+        caches = {
+            "figures": carry_over_figures(old_version, new_version, numeric_rows, group_df, aggregates.correlation()),
+            "filtered_subsets": {"kept": subsets_kept, "dropped": subsets_dropped},
+            "tiles": {"kept": tiles_kept, "dropped": tiles_dropped},
+            "wordclouds": {"kept": carry_over_wordclouds(old_version, new_version)},
+        }
+
+    seconds = round(time.perf_counter() - t0, 3)
+    current_app.logger.info(f"[ingest] {len(rows)} listings in {seconds:.3f}s ({old_version} -> {new_version}): {caches}")
+    return {
+        "rows": len(rows),
+        "version": new_version,
+        "seconds": seconds,
+        "sectors": {sector: aggregates.sector_summary(sector) for sector in sectors},
+        "caches": caches,
+    }
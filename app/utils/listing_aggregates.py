@@ -0,0 +1,205 @@
+# app/utils/listing_aggregates.py
+
+from __future__ import annotations
+
+import math
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .row_filters import SECTOR_MEAN_COLUMNS
+
+# Per-sector distributions kept as quantile sketches
+SKETCH_MEASURES = ("price", "price_per_sqft")
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative error (DDSketch-style log buckets): value x > 0
+    falls in bucket ceil(log_gamma(x)), gamma = (1 + a) / (1 - a), and every quantile is
+    returned within a relative error `a`. Memory grows with the value range, not the count.
+    """
+
+    def __init__(self, relative_accuracy: float = SKETCH_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0  # values <= 0 (kept apart: they have no log bucket)
+        self.count = 0
+
+    def add(self, values: Sequence[float]) -> None:
+        v = np.asarray(values, dtype=float)
+        v = v[np.isfinite(v)]
+        positive = v[v > 0]
+        self.zeros += int(len(v) - len(positive))
+        if len(positive):
+            keys, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64), return_counts=True)
+            for k, c in zip(keys.tolist(), counts.tolist()):
+                self.buckets[k] = self.buckets.get(k, 0) + c
+        self.count += int(len(v))
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for k, c in other.buckets.items():
+            self.buckets[k] = self.buckets.get(k, 0) + c
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.buckets):
+            seen += self.buckets[k]
+            if rank < seen:
+                return 2 * self.gamma ** k / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class PairwiseCovariance:
+    """
+    Running covariance of several columns with pairwise-complete rows, like DataFrame.corr():
+    for every pair (i, j), the count, means, sums of squared deviations and co-deviation over
+    the rows where both are present. Batches are folded in with Chan et al.'s parallel form
+    of Welford's update, so adding rows costs O(batch x columns^2).
+    """
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = np.zeros((k, k))
+        self.mean = np.zeros((k, k))   # [i, j]: mean of column i over rows where i and j are present
+        self.m2 = np.zeros((k, k))     # [i, j]: sum of squared deviations of column i over those rows
+        self.c = np.zeros((k, k))      # [i, j]: sum of co-deviations of columns i and j
+
+    def update(self, frame: pd.DataFrame) -> None:
+        X = frame.reindex(columns=self.columns).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+        if not len(X):
+            return
+        M = np.isfinite(X).astype(float)
+        # Shift by the current means: exact in the algebra, keeps the batch sums small
+        shift = np.diag(self.mean).copy()
+        X0 = np.where(M > 0, X - shift, 0.0)
+        nb = M.T @ M
+        s = X0.T @ M
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_b = np.where(nb > 0, s / nb, 0.0)
+            m2_b = np.where(nb > 0, (X0 * X0).T @ M - s * s / nb, 0.0)
+            c_b = np.where(nb > 0, X0.T @ X0 - s * s.T / nb, 0.0)
+        mean_b += shift[:, None]
+
+        n = self.n + nb
+        with np.errstate(invalid="ignore", divide="ignore"):
+            w = np.where(n > 0, self.n * nb / n, 0.0)
+            delta = mean_b - self.mean
+            self.mean = np.where(n > 0, self.mean + delta * np.where(n > 0, nb / n, 0.0), 0.0)
+        self.m2 = self.m2 + m2_b + delta * delta * w
+        self.c = self.c + c_b + delta * delta.T * w
+        self.n = n
+
+    def correlation(self) -> pd.DataFrame:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.c / np.sqrt(self.m2 * self.m2.T)
+        corr[self.n < 2] = np.nan
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class ListingAggregates:
+    """
+    Aggregates of data_viz_full.csv that can be extended batch by batch: per sector the
+    listing count, the mean of each SECTOR_MEAN_COLUMNS column and a QuantileSketch per
+    SKETCH_MEASURES, plus the pairwise covariance of `corr_columns`.
+    """
+
+    def __init__(self, corr_columns: Sequence[str]):
+        self.listings: Dict[str, int] = {}
+        self.n: Dict[str, np.ndarray] = {}      # non-missing values per mean column
+        self.means: Dict[str, np.ndarray] = {}
+        self.sketches: Dict[str, Dict[str, QuantileSketch]] = {}
+        self.covariance = PairwiseCovariance(corr_columns)
+        self.source: Optional[Tuple[int, int]] = None  # (size, mtime_ns) of the CSV these describe
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, corr_columns: Sequence[str]) -> "ListingAggregates":
+        aggregates = cls(corr_columns)
+        aggregates.update(df)
+        return aggregates
+
+    def update(self, frame: pd.DataFrame) -> List[str]:
+        """Fold in new listing rows; returns the sectors they touched (sorted)."""
+        self.covariance.update(frame)
+        if "sector" not in frame.columns or not len(frame):
+            return []
+        cols = list(SECTOR_MEAN_COLUMNS)
+        values = frame.reindex(columns=cols).apply(pd.to_numeric, errors="coerce")
+        grouped = values.groupby(frame["sector"].astype(str), sort=True)
+        sums, counts, sizes = grouped.sum(), grouped.count(), grouped.size()
+        for sector in sums.index:
+            nb = counts.loc[sector].to_numpy(dtype=float)
+            n_old = self.n.get(sector, np.zeros(len(cols)))
+            mean_old = self.means.get(sector, np.zeros(len(cols)))
+            n = n_old + nb
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean_b = np.where(nb > 0, sums.loc[sector].to_numpy(dtype=float) / nb, 0.0)
+                self.means[sector] = np.where(n > 0, mean_old + (mean_b - mean_old) * np.where(n > 0, nb / n, 0.0), 0.0)
+            self.n[sector] = n
+            self.listings[sector] = self.listings.get(sector, 0) + int(sizes.loc[sector])
+
+        rows = frame.groupby(frame["sector"].astype(str), sort=False)
+        for sector, sub in rows:
+            sketches = self.sketches.setdefault(sector, {m: QuantileSketch() for m in SKETCH_MEASURES})
+            for m in SKETCH_MEASURES:
+                if m in sub.columns:
+                    sketches[m].add(pd.to_numeric(sub[m], errors="coerce").to_numpy(dtype=float))
+        return sorted(sums.index.tolist())
+
+    def sector_means(self, sectors: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """grouped_sector_data.csv's layout for `sectors` (default: all), sorted by sector."""
+        sectors = sorted(self.means if sectors is None else sectors)
+        rows = []
+        for sector in sectors:
+            n, mean = self.n[sector], self.means[sector]
+            rows.append([sector, *[float(m) if c > 0 else np.nan for m, c in zip(mean, n)]])
+        return pd.DataFrame(rows, columns=["sector", *SECTOR_MEAN_COLUMNS])
+
+    def sector_summary(self, sector: str, quantiles: Sequence[float] = (0.5, 0.9)) -> Dict[str, Any]:
+        """Listing count, means and sketched quantiles of one sector."""
+        summary: Dict[str, Any] = {"listings": self.listings.get(sector, 0)}
+        means = dict(zip(SECTOR_MEAN_COLUMNS, self.means.get(sector, [])))
+        for m in SKETCH_MEASURES:
+            sketch = self.sketches.get(sector, {}).get(m)
+            stats = {"mean": round(float(means[m]), 4) if m in means else None}
+            for q in quantiles:
+                value = sketch.quantile(q) if sketch is not None else None
+                stats[f"p{int(round(q * 100))}"] = round(value, 4) if value is not None else None
+            summary[m] = stats
+        return summary
+
+    def correlation(self) -> pd.DataFrame:
+        return self.covariance.correlation()
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["ListingAggregates"]:
+        try:
+            with open(path, "rb") as f:
+                aggregates = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        return aggregates if isinstance(aggregates, cls) else None
@@ -0,0 +1,216 @@
+# app/utils/map_tiles.py
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from flask import current_app
+
+from .analytics_loader import get_dataset_version
+from .spatial_index import get_spatial_index
+
+# Bump when the tile payload changes so persisted tiles are not reused
+MAP_TILE_SCHEMA = 1
+TILE_SIZE = 256          # px, standard slippy-map tiles
+CLUSTER_CELL_PX = 32     # points within the same 32x32 px cell of a tile are merged
+MAX_TILE_ZOOM = 20
+
+CLUSTER_FIELDS = ["lat", "lon", "count", "avg_price", "avg_price_per_sqft"]
+POINT_FIELDS = ["lat", "lon", "row", "sector", "society", "price", "price_per_sqft"]
+
+# (dataset version, layer, z, x, y) -> tile JSON
+_MEMORY: "OrderedDict[Tuple[str, str, int, int, int], str]" = OrderedDict()
+_MEMORY_LOCK = threading.Lock()
+_PRUNED_VERSION: Dict[str, Optional[str]] = {"version": None}
+
+
+class TileError(ValueError):
+    """Tile coordinates outside the z/x/y pyramid."""
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of a Web Mercator tile."""
+    n = 2 ** z
+
+    def lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), x / n * 360.0 - 180.0, lat(y), (x + 1) / n * 360.0 - 180.0
+
+
+def _pixels(lat: np.ndarray, lon: np.ndarray, z: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Global Web Mercator pixel coordinates at zoom z."""
+    world = TILE_SIZE * 2 ** z
+    siny = np.clip(np.sin(np.radians(lat)), -0.9999, 0.9999)
+    px = (lon + 180.0) / 360.0 * world
+    py = (0.5 - np.log((1 + siny) / (1 - siny)) / (4 * np.pi)) * world
+    return px, py
+
+
+def _nanmean_by(groups: np.ndarray, values: np.ndarray, n_groups: int) -> List[Optional[float]]:
+    ok = np.isfinite(values)
+    sums = np.bincount(groups[ok], weights=values[ok], minlength=n_groups)
+    counts = np.bincount(groups[ok], minlength=n_groups)
+    return [round(float(s / c), 4) if c else None for s, c in zip(sums, counts)]
+
+
+def build_tile(layer: str, z: int, x: int, y: int) -> Dict[str, Any]:
+    """
+    Points of `layer` inside tile z/x/y. Cells of CLUSTER_CELL_PX holding several points
+    become one cluster (centroid, count, mean price / price per sqft); lone points, and
+    every point at or above TILE_CLUSTER_MAX_ZOOM, are returned individually.
+    """
+    if not 0 <= z <= MAX_TILE_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise TileError(f"Tile {z}/{x}/{y} is outside the pyramid")
+
+    index = get_spatial_index(layer)
+    pos = index.bbox_positions(*tile_bounds(z, x, y))
+    clusters: List[list] = []
+    points: List[list] = []
+
+    if len(pos):
+        lat, lon = index.lat[pos], index.lon[pos]
+        px, py = _pixels(lat, lon, z)
+        cells_per_side = TILE_SIZE // CLUSTER_CELL_PX
+        cx = np.clip(((px - x * TILE_SIZE) // CLUSTER_CELL_PX).astype(int), 0, cells_per_side - 1)
+        cy = np.clip(((py - y * TILE_SIZE) // CLUSTER_CELL_PX).astype(int), 0, cells_per_side - 1)
+        cells, groups = np.unique(cy * cells_per_side + cx, return_inverse=True)
+        counts = np.bincount(groups, minlength=len(cells))
+
+        max_cluster_zoom = int(current_app.config.get("TILE_CLUSTER_MAX_ZOOM", 16))
+        clustered = (counts > 1) & (z < max_cluster_zoom)
+        if clustered.any():
+            records = [index.record(i) for i in pos]
+            price = np.array([r.get("price") if r.get("price") is not None else np.nan for r in records], dtype=float)
+            psf = np.array([r.get("price_per_sqft") if r.get("price_per_sqft") is not None else np.nan
+                            for r in records], dtype=float)
+            mean_lat = np.bincount(groups, weights=lat) / counts
+            mean_lon = np.bincount(groups, weights=lon) / counts
+            avg_price = _nanmean_by(groups, price, len(cells))
+            avg_psf = _nanmean_by(groups, psf, len(cells))
+            for g in np.flatnonzero(clustered).tolist():
+                clusters.append([round(float(mean_lat[g]), 5), round(float(mean_lon[g]), 5), int(counts[g]),
+                                 avg_price[g], avg_psf[g]])
+
+        for i in pos[~clustered[groups]].tolist():
+            rec = index.record(i)
+            points.append([round(float(index.lat[i]), 5), round(float(index.lon[i]), 5), int(index.rows[i])]
+                          + [rec.get(f) for f in POINT_FIELDS[3:]])
+
+    return {
+        "z": z, "x": x, "y": y,
+        "total": int(len(pos)),
+        "clusters": {"fields": CLUSTER_FIELDS, "rows": clusters},
+        "points": {"fields": POINT_FIELDS, "rows": points},
+    }
+
+
+# --- caches: in-process LRU -> on-disk store -> build --------------------------------------
+
+def _cache_root() -> Optional[Path]:
+    cache_dir = current_app.config.get("TILE_CACHE_DIR")
+    return Path(cache_dir) if cache_dir else None
+
+
+def _version_dir(version: str) -> str:
+    return f"v{MAP_TILE_SCHEMA}-{version}-c{CLUSTER_CELL_PX}-{current_app.config.get('TILE_CLUSTER_MAX_ZOOM', 16)}"
+
+
+def _disk_path(version: str, layer: str, z: int, x: int, y: int) -> Optional[Path]:
+    root = _cache_root()
+    if root is None:
+        return None
+    return root / _version_dir(version) / layer / str(z) / str(x) / f"{y}.json"
+
+
+def _prune_disk(version: str) -> None:
+    # Once per process and dataset version: older versions' tiles can never be served again
+    if _PRUNED_VERSION["version"] == version:
+        return
+    _PRUNED_VERSION["version"] = version
+    root = _cache_root()
+    if root is None or not root.exists():
+        return
+    current = _version_dir(version)
+    for child in root.iterdir():
+        if child.is_dir() and child.name != current:
+            shutil.rmtree(child, ignore_errors=True)
+
+
+def get_tile(layer: str, z: int, x: int, y: int, version: Optional[str] = None) -> str:
+    """Tile JSON for the current dataset. Raises KeyError (unknown layer) or TileError."""
+    version = version or get_dataset_version()
+    key = (version, layer, z, x, y)
+    with _MEMORY_LOCK:
+        payload = _MEMORY.get(key)
+        if payload is not None:
+            _MEMORY.move_to_end(key)
+            return payload
+
+    path = _disk_path(version, layer, z, x, y)
+    payload = None
+    if path is not None and path.exists():
+        try:
+            payload = path.read_text(encoding="utf-8")
+        except OSError:
+            payload = None
+    if payload is None:
+        payload = json.dumps(build_tile(layer, z, x, y), separators=(",", ":"))
+        if path is not None:
+            _prune_disk(version)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(f".{os.getpid()}.tmp")
+                tmp.write_text(payload, encoding="utf-8")
+                os.replace(tmp, path)
+            except OSError as e:
+                current_app.logger.warning(f"[tiles] could not persist {path}: {e}")
+
+    size = int(current_app.config.get("TILE_CACHE_SIZE", 4096))
+    with _MEMORY_LOCK:
+        for stale in [k for k in _MEMORY if k[0] != version]:
+            del _MEMORY[stale]
+        if size > 0:
+            _MEMORY[key] = payload
+            while len(_MEMORY) > size:
+                _MEMORY.popitem(last=False)
+    return payload
+
+
+def carry_over_tiles(old_version: str, new_version: str, lat: np.ndarray, lon: np.ndarray) -> Tuple[int, int]:
+    """
+    After listings at (lat, lon) were appended (old_version -> new_version), keep the cached
+    tiles none of them falls into; a tile only depends on the points inside it. In-process
+    tiles only. Returns (kept, dropped).
+    """
+    kept = dropped = 0
+    with _MEMORY_LOCK:
+        for key in list(_MEMORY):
+            payload = _MEMORY.pop(key)
+            version, layer, z, x, y = key
+            south, west, north, east = tile_bounds(z, x, y)
+            touched = ((lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)).any()
+            if version == old_version and not touched:
+                _MEMORY[(new_version, layer, z, x, y)] = payload
+                kept += 1
+            else:
+                dropped += 1
+    return kept, dropped
+
+
+def clear_tile_cache(disk: bool = False) -> None:
+    with _MEMORY_LOCK:
+        _MEMORY.clear()
+    _PRUNED_VERSION["version"] = None
+    if disk:
+        root = _cache_root()
+        if root is not None:
+            shutil.rmtree(root, ignore_errors=True)
@@ -1,4 +1,7 @@
 import json
+import logging
+import os
+import time
 import joblib
 import pandas as pd
 from pathlib import Path
@@ -9,21 +12,116 @@ from xgboost import XGBRegressor  # noqa: F401
 from sklearn.ensemble import RandomForestRegressor  # noqa: F401
 
 _MODEL = None
+_MODEL_VERSION = None
 _EXPECTED_COLUMNS = None
 _SCHEMA_EXAMPLES = None
+# (model mtime, mmap mtime) pairs already warned about, so a stale export is reported once
+_STALE_MMAP_WARNED = set()
+
+logger = logging.getLogger(__name__)
 
 def _project_root() -> Path:
     return Path(__file__).resolve().parents[2]
 
+MODEL_FILENAME = "gurgaon_price_model.joblib"
+# Uncompressed copy whose numpy arrays joblib can memory-map (see export_mmap_model). Only
+# numpy-backed state is shared this way (the RandomForest's tree arrays); the XGBoost booster
+# is pickled as an opaque byte buffer and still deserialized into each process.
+MMAP_MODEL_FILENAME = "gurgaon_price_model.mmap.joblib"
+
+def get_model_path() -> Path:
+    return _project_root() / "Saved_Model" / MODEL_FILENAME
+
+def get_mmap_model_path() -> Path:
+    return _project_root() / "Saved_Model" / MMAP_MODEL_FILENAME
+
+def _mmap_mode():
+    # MODEL_MMAP_MODE="" disables memory-mapping
+    return os.environ.get("MODEL_MMAP_MODE", "r") or None
+
+def _resolve_model_artifact():
+    """(path, mmap_mode): the mmap-able export when present and not older than the main artifact."""
+    model_path = get_model_path()
+    mmap_path = get_mmap_model_path()
+    mode = _mmap_mode()
+    if mode and mmap_path.exists():
+        if not model_path.exists() or mmap_path.stat().st_mtime >= model_path.stat().st_mtime:
+            return mmap_path, mode
+        stale = (model_path.stat().st_mtime_ns, mmap_path.stat().st_mtime_ns)
+        if stale not in _STALE_MMAP_WARNED:
+            _STALE_MMAP_WARNED.add(stale)
+            logger.warning(f"[model] {mmap_path.name} is older than {model_path.name}; ignoring it")
+    return model_path, None
+
+def _artifact_signature(path: Path):
+    st = path.stat()
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+def get_model_version():
+    """Signature (path, mtime, size) of the artifact get_model() serves; changes when the file does."""
+    model_path, _ = _resolve_model_artifact()
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model not found at {model_path}")
+    return _artifact_signature(model_path)
+
 def get_model():
-    global _MODEL
-    if _MODEL is None:
-        model_path = _project_root() / "Saved_Model" / "gurgaon_price_model.joblib"
-        if not model_path.exists():
-            raise FileNotFoundError(f"Model not found at {model_path}")
-        _MODEL = joblib.load(model_path)
+    global _MODEL, _MODEL_VERSION
+    version = get_model_version()
+    if _MODEL is None or _MODEL_VERSION != version:
+        model_path, mmap_mode = _resolve_model_artifact()
+        t0 = time.perf_counter()
+        # With mmap_mode, the RandomForest's arrays stay backed by the page cache and are shared
+        # by all workers; the XGBoost booster is still a per-process copy
+        _MODEL = joblib.load(model_path, mmap_mode=mmap_mode)
+        _MODEL_VERSION = version
+        logger.info(f"[model] loaded {model_path.name} (mmap_mode={mmap_mode}) in {time.perf_counter() - t0:.2f}s")
     return _MODEL
 
+def export_mmap_model() -> Path:
+    """
+    Re-save the (compressed) model artifact uncompressed next to it, so joblib can
+    load it with mmap_mode. Re-run whenever gurgaon_price_model.joblib changes.
+    """
+    model_path = get_model_path()
+    if not model_path.exists():
+        raise FileNotFoundError(f"Model not found at {model_path}")
+    model = joblib.load(model_path)
+    mmap_path = get_mmap_model_path()
+    tmp = mmap_path.with_suffix(".tmp")
+    joblib.dump(model, tmp, compress=0)
+    os.replace(tmp, mmap_path)
+    return mmap_path
+
+def get_dummy_row() -> pd.DataFrame:
+    """One plausible row in model column order, from the schema examples (mean / first example)."""
+    schema = get_schema_examples()
+    row = {}
+    for col in get_expected_columns():
+        info = schema.get(col, {})
+        if info.get("type") == "numeric":
+            row[col] = info.get("mean") or info.get("min") or 0
+        else:
+            examples = info.get("examples") or [""]
+            row[col] = examples[0]
+    return pd.DataFrame([row]).reindex(columns=get_expected_columns())
+
+def warm_up_model():
+    """Load the model and run one dummy prediction so the first real request pays neither cost."""
+    model = get_model()
+    t0 = time.perf_counter()
+    model.predict(get_dummy_row())
+    logger.info(f"[model] warm-up prediction in {time.perf_counter() - t0:.3f}s")
+    return model
+
+TRAINING_DATA = "gurgaon_properties_post_feature_selection_v2.csv"
+
+def load_training_data():
+    """(X, y) exactly as final_model.ipynb trains on them (Dataset/...post_feature_selection_v2.csv)."""
+    df = pd.read_csv(_project_root() / "Dataset" / TRAINING_DATA)
+    df["furnishing_type"] = df["furnishing_type"].replace({0.0: "unfurnished", 1.0: "semifurnished", 2.0: "furnished"})
+    X = df.drop(columns=["price"]).reindex(columns=get_expected_columns())
+    return X, df["price"]
+
 def get_expected_columns():
     global _EXPECTED_COLUMNS
     if _EXPECTED_COLUMNS is None:
@@ -0,0 +1,116 @@
+# app/utils/prediction_cache.py
+
+from __future__ import annotations
+
+import numbers
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+
+from .model_loader import get_model, get_model_version, get_expected_columns
+from .compiled_model import get_compiled_model
+
+# canonical feature key -> (price in crore, stored at)
+_CACHE: "OrderedDict[tuple, Tuple[float, float]]" = OrderedDict()
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+_MODEL_VERSION: Optional[tuple] = None
+
+
+def _bucket_area(clean: Dict[str, Any], bucket: float) -> Dict[str, Any]:
+    if not bucket or "built_up_area" not in clean:
+        return clean
+    bucketed = dict(clean)
+    bucketed["built_up_area"] = float(round(float(clean["built_up_area"]) / bucket) * bucket)
+    return bucketed
+
+
+def canonical_key(clean: Dict[str, Any]) -> tuple:
+    """Order-independent key of a validated feature dict (numbers, numpy ones included, normalized to float)."""
+    items = []
+    for k in sorted(clean):
+        v = clean[k]
+        if isinstance(v, np.generic):
+            v = v.item()
+        if isinstance(v, numbers.Real) and not isinstance(v, bool):
+            v = round(float(v), 6)
+        else:
+            v = str(v)
+        items.append((k, v))
+    return tuple(items)
+
+
+def _check_model_version() -> None:
+    """Drop every entry when the model artifact changed on disk. Call with _LOCK held."""
+    global _MODEL_VERSION
+    version = get_model_version()
+    if version != _MODEL_VERSION:
+        if _CACHE:
+            _STATS["invalidations"] += 1
+        _CACHE.clear()
+        _MODEL_VERSION = version
+
+
+def predict_price(clean: Dict[str, Any]) -> float:
+    """
+    Price in crore for the validated `clean` dict from validate_and_prepare().
+    Repeat lookups are served from an LRU/TTL cache without touching the pipeline.
+    With PREDICTION_CACHE_AREA_BUCKET > 0, built_up_area is rounded to that many sqft
+    (and the model is run on the rounded value) so nearby areas share one entry.
+    """
+    cfg = current_app.config
+    max_size = int(cfg.get("PREDICTION_CACHE_SIZE", 4096))
+    ttl = float(cfg.get("PREDICTION_CACHE_TTL", 3600))
+    features = _bucket_area(clean, float(cfg.get("PREDICTION_CACHE_AREA_BUCKET", 0)))
+    key = canonical_key(features)
+    now = time.monotonic()
+
+    if max_size > 0:
+        with _LOCK:
+            _check_model_version()
+            hit = _CACHE.get(key)
+            if hit is not None:
+                value, stored_at = hit
+                if not ttl or now - stored_at <= ttl:
+                    _CACHE.move_to_end(key)
+                    _STATS["hits"] += 1
+                    return value
+                del _CACHE[key]
+                _STATS["expirations"] += 1
+            _STATS["misses"] += 1
+
+    compiled = get_compiled_model() if cfg.get("MODEL_COMPILED_INFERENCE") else None
+    if compiled is not None:
+        value = float(compiled.predict_records([features])[0])
+    else:
+        df = pd.DataFrame([features]).reindex(columns=get_expected_columns())
+        value = float(get_model().predict(df)[0])
+
+    if max_size > 0:
+        with _LOCK:
+            _CACHE[key] = (value, now)
+            _CACHE.move_to_end(key)
+            while len(_CACHE) > max_size:
+                _CACHE.popitem(last=False)
+                _STATS["evictions"] += 1
+    return value
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    with _LOCK:
+        lookups = _STATS["hits"] + _STATS["misses"]
+        return {
+            **_STATS,
+            "size": len(_CACHE),
+            "hit_rate": round(_STATS["hits"] / lookups, 4) if lookups else None,
+        }
+
+
+def clear_prediction_cache() -> None:
+    with _LOCK:
+        _CACHE.clear()
@@ -0,0 +1,500 @@
+# app/utils/recommendation_engine.py
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from flask import current_app
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+APARTMENTS_FILE = "appartments.csv"
+
+# Bump when the feature engineering or the on-disk layout changes
+RECOMMENDER_INDEX_SCHEMA = 1
+
+# Blend of the three cosine similarities (same weights as the recommender notebook)
+DEFAULT_WEIGHTS = {"facilities": 30.0, "price": 20.0, "location": 8.0}
+BLOCKS = tuple(DEFAULT_WEIGHTS)
+
+PRICE_CONFIGS = ["1 BHK", "2 BHK", "3 BHK", "4 BHK", "5 BHK", "6 BHK", "1 RK", "Land"]
+MISSING_DISTANCE_M = 54000.0  # distance assumed for landmarks a project doesn't list
+
+_INDEX_CACHE: Dict[str, Any] = {"signature": None, "index": None}
+_INDEX_LOCK = threading.Lock()
+
+
+# --- parsing (mirrors Notebooks/Recommender_System) -----------------------------------------
+
+def _literal(s: Any) -> Any:
+    try:
+        return ast.literal_eval(s) if isinstance(s, str) else None
+    except (ValueError, SyntaxError):
+        return None
+
+
+def _facilities_text(s: Any) -> str:
+    return " ".join(re.findall(r"'(.*?)'", s)) if isinstance(s, str) else ""
+
+
+def _to_meters(distance: Any) -> Optional[float]:
+    try:
+        value, unit = str(distance).split()[:2]
+        if unit.lower() == "km":
+            return float(value) * 1000
+        if unit.lower() == "meter":
+            return float(value)
+    except ValueError:
+        pass
+    return None
+
+
+def _parse_area(area: str) -> Tuple[Optional[float], Optional[float]]:
+    parts = [p.replace(",", "").replace("sq.ft.", "").strip() for p in (area or "").split("-")]
+    try:
+        values = [float(p) for p in parts]
+    except ValueError:
+        return None, None
+    if len(values) == 1:
+        return values[0], values[0]
+    if len(values) == 2:
+        return values[0], values[1]
+    return None, None
+
+
+def _parse_price(price_range: str) -> Tuple[Optional[float], Optional[float]]:
+    """'₹ 45 L - 1.2 Cr' -> (0.45, 1.2) in crore."""
+    parts = [p.replace("₹", "").strip() for p in (price_range or "").split("-")]
+    if len(parts) != 2:
+        return None, None
+    values = []
+    for part in parts:
+        tokens = part.split()
+        try:
+            value = float(tokens[0])
+        except (IndexError, ValueError):
+            return None, None
+        values.append(value / 100 if tokens[-1] == "L" else value)
+    return values[0], values[1]
+
+
+def _price_features(s: Any) -> Dict[str, Any]:
+    details = _literal(s)
+    if not isinstance(details, dict):
+        return {}
+    out: Dict[str, Any] = {}
+    for config in PRICE_CONFIGS:
+        detail = details.get(config)
+        if not isinstance(detail, dict):
+            continue
+        building_type = detail.get("building_type") or (config if config == "Land" else None)
+        if building_type:
+            out[f"building type_{config}={building_type}"] = 1.0
+        out[f"area low {config}"], out[f"area high {config}"] = _parse_area(detail.get("area", ""))
+        out[f"price low {config}"], out[f"price high {config}"] = _parse_price(detail.get("price-range", ""))
+    return {k: v for k, v in out.items() if v is not None}
+
+
+def _location_features(s: Any) -> Dict[str, float]:
+    places = _literal(s)
+    if not isinstance(places, dict):
+        return {}
+    distances = {place: _to_meters(d) for place, d in places.items()}
+    return {place: m for place, m in distances.items() if m is not None}
+
+
+def _drop_first_dummies(columns: List[str]) -> List[str]:
+    """pd.get_dummies(drop_first=True): drop the alphabetically first level of each building type column."""
+    first: Dict[str, str] = {}
+    for col in sorted(c for c in columns if c.startswith("building type_")):
+        first.setdefault(col.split("=", 1)[0], col)
+    return list(first.values())
+
+
+def _dict_rows_to_csr(rows: List[Dict[str, float]], base: float = 0.0,
+                      drop: Tuple[str, ...] = ()) -> Tuple[sp.csr_matrix, List[str]]:
+    """Sparse matrix of (value - base); keys absent from a row mean 'value == base'."""
+    vocab = sorted({k for r in rows for k in r} - set(drop))
+    col_of = {k: j for j, k in enumerate(vocab)}
+    indptr, indices, data = [0], [], []
+    for r in rows:
+        for k, v in r.items():
+            j = col_of.get(k)
+            if j is not None:
+                indices.append(j)
+                data.append(float(v) - base)
+        indptr.append(len(indices))
+    X = sp.csr_matrix((np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32), indptr),
+                      shape=(len(rows), len(vocab)))
+    X.sum_duplicates()
+    return X, vocab
+
+
+def load_apartments(path: Path) -> pd.DataFrame:
+    df = pd.read_csv(path, encoding="utf-8-sig")
+    # The export repeats its header row once (the notebook drops it by position)
+    df = df[df["PropertyName"].notna() & (df["PropertyName"] != "PropertyName")]
+    return df.drop_duplicates("PropertyName").reset_index(drop=True)
+
+
+# --- similarity blocks -----------------------------------------------------------------------
+
+class SimilarityBlock:
+    """
+    Cosine similarity over standardized features, without ever materializing them densely.
+
+    A standardized row is s = z + c, where z is sparse (non-zero only where the raw
+    value differs from the column's fill value) and c is one shared dense vector. Then
+    s_i . s_j = z_i . z_j + z_i . c + z_j . c + c . c, so one query costs O(nnz) sparse
+    work plus O(n) vector arithmetic, and the index is O(nnz) in memory.
+    """
+
+    def __init__(self, rows: sp.csr_matrix, offset: np.ndarray, constant: float, norms: np.ndarray):
+        self.rows = rows          # z, one row per project
+        self.offset = offset      # z_i . c
+        self.constant = constant  # c . c
+        self.norms = norms        # ||s_i||
+
+    @classmethod
+    def from_unit_rows(cls, rows: sp.csr_matrix) -> "SimilarityBlock":
+        """Rows already L2-normalized (e.g. TF-IDF output): no centering term."""
+        rows = sp.csr_matrix(rows, dtype=np.float64)
+        norms = np.sqrt(np.asarray(rows.multiply(rows).sum(axis=1)).ravel())
+        return cls(rows, np.zeros(rows.shape[0]), 0.0, norms)
+
+    @classmethod
+    def standardized(cls, deviations: sp.csr_matrix) -> "SimilarityBlock":
+        """StandardScaler semantics for X = fill + deviations, computed on the sparse deviations."""
+        n = max(deviations.shape[0], 1)
+        mean = np.asarray(deviations.sum(axis=0)).ravel() / n
+        sq_mean = np.asarray(deviations.multiply(deviations).sum(axis=0)).ravel() / n
+        scale = np.sqrt(np.maximum(sq_mean - mean ** 2, 0.0))
+        scale[scale < 10 * np.finfo(np.float64).eps] = 1.0  # constant columns, as StandardScaler does
+
+        rows = sp.csr_matrix(deviations @ sp.diags(1.0 / scale))
+        c = -mean / scale
+        offset = rows @ c
+        constant = float(c @ c)
+        sq_norms = np.asarray(rows.multiply(rows).sum(axis=1)).ravel() + 2 * offset + constant
+        return cls(rows, offset, constant, np.sqrt(np.maximum(sq_norms, 0.0)))
+
+    def scores(self, i: int) -> np.ndarray:
+        """Cosine similarity of row i against every row (0 for all-zero rows, like sklearn)."""
+        dots = (self.rows @ self.rows[i].T).toarray().ravel() + self.offset + self.offset[i] + self.constant
+        denom = self.norms * self.norms[i]
+        return np.divide(dots, denom, out=np.zeros_like(dots), where=denom > 0)
+
+    # Persisted as plain .npy arrays so they load memory-mapped and are shared across workers
+    def save(self, directory: Path, name: str) -> Dict[str, Any]:
+        for part in ("data", "indices", "indptr"):
+            np.save(directory / f"{name}.{part}.npy", getattr(self.rows, part))
+        np.save(directory / f"{name}.offset.npy", self.offset)
+        np.save(directory / f"{name}.norms.npy", self.norms)
+        return {"shape": list(self.rows.shape), "constant": self.constant}
+
+    @classmethod
+    def load(cls, directory: Path, name: str, meta: Dict[str, Any], mmap_mode: Optional[str] = "r") -> "SimilarityBlock":
+        arrays = {part: np.load(directory / f"{name}.{part}.npy", mmap_mode=mmap_mode)
+                  for part in ("data", "indices", "indptr", "offset", "norms")}
+        rows = sp.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=tuple(meta["shape"]), copy=False)
+        return cls(rows, arrays["offset"], float(meta["constant"]), arrays["norms"])
+
+
+class RecommendationIndex:
+    """Per-project similarity blocks + metadata; answers top-k queries in O(nnz + n)."""
+
+    def __init__(self, names: List[str], links: List[str], blocks: Dict[str, SimilarityBlock], version: str = ""):
+        self.names = names
+        self.links = links
+        self.blocks = blocks
+        self.version = version
+        self._position = {name: i for i, name in enumerate(names)}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._position
+
+    @classmethod
+    def build(cls, apartments: pd.DataFrame, version: str = "") -> "RecommendationIndex":
+        facilities = apartments["TopFacilities"].map(_facilities_text)
+        tfidf = TfidfVectorizer(stop_words="english", ngram_range=(1, 2)).fit_transform(facilities)
+
+        price_rows = [_price_features(s) for s in apartments["PriceDetails"]]
+        dummies = [k for r in price_rows for k in r if k.startswith("building type_")]
+        price, _ = _dict_rows_to_csr(price_rows, drop=tuple(_drop_first_dummies(dummies)))
+
+        location_rows = [_location_features(s) for s in apartments["LocationAdvantages"]]
+        location, _ = _dict_rows_to_csr(location_rows, base=MISSING_DISTANCE_M)
+
+        blocks = {
+            "facilities": SimilarityBlock.from_unit_rows(tfidf),
+            "price": SimilarityBlock.standardized(price),
+            "location": SimilarityBlock.standardized(location),
+        }
+        links = apartments["Link"].fillna("").astype(str).tolist() if "Link" in apartments else [""] * len(apartments)
+        return cls(apartments["PropertyName"].astype(str).tolist(), links, blocks, version)
+
+    def scores(self, name: str, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        i = self._position[name]
+        weights = weights or DEFAULT_WEIGHTS
+        total = np.zeros(len(self))
+        for block, w in weights.items():
+            if w:
+                total += w * self.blocks[block].scores(i)
+        return total
+
+    def recommend(self, name: str, k: int = 5, weights: Optional[Dict[str, float]] = None) -> List[Dict[str, Any]]:
+        """Top-k most similar projects to `name` (excluding itself). Raises KeyError for unknown names."""
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        total = self.scores(name, weights)
+        i = self._position[name]
+        total[i] = -np.inf
+
+        k = max(0, min(k, len(self) - 1))
+        if k == 0:
+            return []
+        top = np.argpartition(-total, k - 1)[:k]
+        top = top[np.argsort(-total[top], kind="stable")]
+        per_block = {b: self.blocks[b].scores(i)[top] for b in BLOCKS}
+        return [
+            {
+                "name": self.names[j],
+                "link": self.links[j],
+                "score": round(float(total[j]), 4),
+                "similarity": {b: round(float(per_block[b][pos]), 4) for b in BLOCKS},
+            }
+            for pos, j in enumerate(top)
+        ]
+
+    def save(self, directory: Path) -> None:
+        """Write into a temp dir then rename, so concurrent workers never load a half-written index."""
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        tmp = directory.with_name(f"{directory.name}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        meta = {
+            "schema": RECOMMENDER_INDEX_SCHEMA,
+            "version": self.version,
+            "names": self.names,
+            "links": self.links,
+            "blocks": {name: block.save(tmp, name) for name, block in self.blocks.items()},
+        }
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            # Another worker published the same version first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: Path) -> "RecommendationIndex":
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("schema") != RECOMMENDER_INDEX_SCHEMA:
+            raise ValueError(f"Index schema {meta.get('schema')} != {RECOMMENDER_INDEX_SCHEMA}")
+        blocks = {name: SimilarityBlock.load(directory, name, m) for name, m in meta["blocks"].items()}
+        return cls(meta["names"], meta["links"], blocks, meta["version"])
+
+
+# --- process-wide index ------------------------------------------------------------------------
+
+def get_apartments_path() -> Path:
+    return Path(current_app.root_path).parent / "Dataset" / APARTMENTS_FILE
+
+
+def _content_version(path: Path) -> str:
+    # Content hash, not mtime: a fresh checkout/deploy reuses an index built elsewhere
+    return hashlib.sha1(path.read_bytes()).hexdigest()[:12]
+
+
+def _index_root() -> Optional[Path]:
+    index_dir = current_app.config.get("RECOMMENDER_INDEX_DIR")
+    return Path(index_dir) if index_dir else None
+
+
+def build_recommendation_index(path: Optional[Path] = None) -> RecommendationIndex:
+    """Build from appartments.csv and persist under RECOMMENDER_INDEX_DIR (pruning older versions)."""
+    path = path or get_apartments_path()
+    version = _content_version(path)
+    index = RecommendationIndex.build(load_apartments(path), version)
+    root = _index_root()
+    if root is not None:
+        target = root / f"v{RECOMMENDER_INDEX_SCHEMA}-{version}"
+        index.save(target)
+        for child in root.iterdir():
+            if child.is_dir() and child.name != target.name and not child.name.endswith(".tmp"):
+                shutil.rmtree(child, ignore_errors=True)
+    return index
+
+
+def get_recommendation_index() -> RecommendationIndex:
+    """Cached index for the current appartments.csv: memory -> on-disk (memory-mapped) -> build."""
+    path = get_apartments_path()
+    st = path.stat()
+    signature = (str(path), st.st_mtime_ns, st.st_size)
+    if _INDEX_CACHE["signature"] == signature:
+        return _INDEX_CACHE["index"]
+
+    with _INDEX_LOCK:
+        if _INDEX_CACHE["signature"] != signature:
+            version = _content_version(path)
+            root = _index_root()
+            index = None
+            if root is not None and (root / f"v{RECOMMENDER_INDEX_SCHEMA}-{version}" / "meta.json").exists():
+                try:
+                    index = RecommendationIndex.load(root / f"v{RECOMMENDER_INDEX_SCHEMA}-{version}")
+                except (OSError, ValueError, KeyError) as e:
+                    current_app.logger.warning(f"[recommender] could not load persisted index: {e}")
+            if index is None:
+                index = build_recommendation_index(path)
+                current_app.logger.info(f"[recommender] built index for {len(index)} projects (version {version})")
+            _INDEX_CACHE["index"] = index
+            _INDEX_CACHE["signature"] = signature
+        return _INDEX_CACHE["index"]
+
+
+def clear_recommendation_index() -> None:
+    with _INDEX_LOCK:
+        _INDEX_CACHE["signature"] = None
+        _INDEX_CACHE["index"] = None
+
+
+# --- listing-level similarity (data_viz_full.csv) over an ANN index ------------------------------
+
+LISTING_NUMERIC = {"price": "price", "area": "built_up_area", "bhk": "bedRoom", "luxury": "luxury_score"}
+LISTING_AMENITIES = ["study room", "servant room", "store room", "pooja room", "others", "furnishing_type"]
+LISTING_LOG_SCALED = ("price", "built_up_area")
+# Relative pull of each feature group on the cosine similarity
+LISTING_WEIGHTS = {"sector": 1.0, "price": 1.0, "area": 1.0, "bhk": 0.75, "luxury": 0.5, "amenities": 0.5}
+
+_LISTING_CACHE: Dict[str, Any] = {"version": None, "index": None}
+_LISTING_LOCK = threading.Lock()
+
+
+class ListingFeaturizer:
+    """Fixed-width vectors for listings: weighted sector one-hot + standardized numerics + amenities."""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights = {**LISTING_WEIGHTS, **(weights or {})}
+        self.sectors: List[str] = []
+        self.mean: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+
+    @property
+    def dim(self) -> int:
+        return len(self.sectors) + len(LISTING_NUMERIC) + len(LISTING_AMENITIES)
+
+    def _numeric(self, df: pd.DataFrame) -> np.ndarray:
+        cols = list(LISTING_NUMERIC.values()) + LISTING_AMENITIES
+        X = df.reindex(columns=cols).apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64, copy=True)
+        for j, col in enumerate(cols):
+            if col in LISTING_LOG_SCALED:
+                X[:, j] = np.log1p(np.clip(X[:, j], 0, None))
+        return X
+
+    def fit(self, df: pd.DataFrame) -> "ListingFeaturizer":
+        self.sectors = sorted(df["sector"].dropna().astype(str).unique())
+        X = self._numeric(df)
+        self.mean = np.nanmean(X, axis=0)
+        scale = np.nanstd(X, axis=0)
+        self.scale = np.where(scale > 0, scale, 1.0)
+        return self
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        """Unknown sectors get no sector component; missing numerics sit at the mean."""
+        position = {s: j for j, s in enumerate(self.sectors)}
+        sector_part = np.zeros((len(df), len(self.sectors)), dtype=np.float32)
+        cols = df["sector"].astype(str).map(position)
+        rows = np.flatnonzero(cols.notna().to_numpy())
+        sector_part[rows, cols.iloc[rows].astype(int).to_numpy()] = self.weights["sector"]
+
+        Z = np.nan_to_num((self._numeric(df) - self.mean) / self.scale)
+        group_weights = [self.weights[g] for g in LISTING_NUMERIC]
+        # The amenity group counts as one feature however many columns it has
+        group_weights += [self.weights["amenities"] / np.sqrt(len(LISTING_AMENITIES))] * len(LISTING_AMENITIES)
+        return np.hstack([sector_part, (Z * np.asarray(group_weights)).astype(np.float32)])
+
+
+class ListingIndex:
+    """ANN index over listings; rows added later (incremental inserts) reuse the fitted featurizer."""
+
+    def __init__(self, listings: pd.DataFrame, backend: str = "exact", version: str = "", **params: Any):
+        from .ann_index import make_index
+
+        self.version = version
+        self.featurizer = ListingFeaturizer().fit(listings)
+        self.index = make_index(backend, self.featurizer.dim, **params)
+        # Added batches, concatenated only when the rows are next read: adds stay O(batch)
+        self._batches: List[pd.DataFrame] = [listings.reset_index(drop=True).iloc[0:0]]
+        self._batches_lock = threading.Lock()
+        self.add(listings)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def listings(self) -> pd.DataFrame:
+        with self._batches_lock:
+            if len(self._batches) > 1:
+                self._batches = [pd.concat(self._batches, ignore_index=True)]
+            return self._batches[0]
+
+    def add(self, listings: pd.DataFrame) -> np.ndarray:
+        ids = self.index.add(self.featurizer.transform(listings))
+        with self._batches_lock:
+            self._batches.append(listings.reset_index(drop=True))
+        return ids
+
+    def recommend(self, row: int, k: int = 10) -> List[Dict[str, Any]]:
+        """Top-k listings most similar to listing `row`. Raises IndexError for unknown rows."""
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        ids, scores = self.index.query(self.index.vectors[row], k, exclude=[row])
+        cols = ["property_type", "society", "sector", "price", "built_up_area", "bedRoom", "luxury_score"]
+        out = self.listings.reindex(columns=cols).iloc[ids]
+        records = json.loads(out.to_json(orient="records"))
+        for rec, i, s in zip(records, ids.tolist(), scores.tolist()):
+            rec.update({"row": i, "score": round(float(s), 4)})
+        return records
+
+
+def ann_params(config, n_rows: int = 0) -> Tuple[str, Dict[str, Any]]:
+    """(backend, params) from the config; "auto" is exact search for small indexes, LSH above."""
+    backend = config.get("RECOMMENDER_ANN_BACKEND", "auto")
+    if backend == "auto":
+        backend = "lsh" if n_rows >= int(config.get("RECOMMENDER_ANN_MIN_ROWS", 20000)) else "exact"
+    if backend != "lsh":
+        return backend, {}
+    return backend, {
+        "tables": int(config.get("RECOMMENDER_LSH_TABLES", 8)),
+        "bits": int(config.get("RECOMMENDER_LSH_BITS", 12)),
+        "probes": int(config.get("RECOMMENDER_LSH_PROBES", 1)),
+    }
+
+
+def get_listing_index() -> ListingIndex:
+    """ANN index over data_viz_full.csv, rebuilt when the analytics dataset changes."""
+    from .analytics_loader import get_dataset_version, get_visualization_data
+
+    version = get_dataset_version()
+    if _LISTING_CACHE["version"] == version:
+        return _LISTING_CACHE["index"]
+    with _LISTING_LOCK:
+        if _LISTING_CACHE["version"] != version:
+            df, _, _ = get_visualization_data()
+            backend, params = ann_params(current_app.config, len(df))
+            _LISTING_CACHE["index"] = ListingIndex(df, backend, version, **params)
+            _LISTING_CACHE["version"] = version
+            current_app.logger.info(f"[recommender] {backend} listing index over {len(df)} rows (version {version})")
+        return _LISTING_CACHE["index"]
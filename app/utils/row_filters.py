@@ -0,0 +1,304 @@
+# app/utils/row_filters.py
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from flask import current_app
+
+from .analytics_loader import get_dataset_version, get_visualization_data
+from .stats_cube import dimension_codes, label_text
+
+# Categorical filters (any of the given values) and range filters (?price_min=&price_max=)
+FILTER_DIMENSIONS = ("sector", "bedRoom", "property_type", "agePossession")
+RANGE_FILTERS = ("price",)
+
+# Columns of grouped_sector_data.csv, which is data_viz_full.csv averaged per sector
+SECTOR_MEAN_COLUMNS = ("price", "price_per_sqft", "built_up_area", "latitude", "longitude")
+
+Filters = Dict[str, Tuple[Any, ...]]
+
+_ROW_INDEX_CACHE: Dict[str, Any] = {"version": None, "index": None}
+_ROW_INDEX_LOCK = threading.Lock()
+
+# (dataset version, filter key) -> (filtered listings, per-sector means)
+_FILTERED: "OrderedDict[Tuple[str, str], Tuple[pd.DataFrame, pd.DataFrame]]" = OrderedDict()
+_FILTERED_LOCK = threading.Lock()
+# filter key -> filters, for the filter sets behind cached views (see carry_over_filters)
+_FILTER_SPECS: "OrderedDict[str, Filters]" = OrderedDict()
+
+
+class FilterError(ValueError):
+    """Malformed filter parameter (e.g. a non-numeric price bound)."""
+
+
+def parse_filters(args) -> Filters:
+    """
+    Canonical filters from query args (a werkzeug MultiDict): repeated values of a dimension
+    are OR-ed, dimensions are AND-ed. Values are sorted so equal filters get equal keys.
+    """
+    filters: Filters = {}
+    for dim in FILTER_DIMENSIONS:
+        values = sorted({label_text(v) for v in args.getlist(dim) if v != ""})
+        if values:
+            filters[dim] = tuple(values)
+    for col in RANGE_FILTERS:
+        bounds = []
+        for suffix in ("min", "max"):
+            raw = args.get(f"{col}_{suffix}", "")
+            try:
+                bound = float(raw) if raw != "" else None
+            except ValueError:
+                raise FilterError(f"'{col}_{suffix}' must be a number") from None
+            if bound is not None and not np.isfinite(bound):
+                raise FilterError(f"'{col}_{suffix}' must be a finite number")
+            bounds.append(bound)
+        if bounds != [None, None]:
+            filters[col] = tuple(bounds)
+    return filters
+
+
+def filter_key(filters: Filters) -> str:
+    """Short stable id of a filter set; "" when nothing is filtered."""
+    if not filters:
+        return ""
+    canonical = json.dumps(sorted((k, list(v)) for k, v in filters.items()), separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+class RowBitmapIndex:
+    """
+    Per-value bitmaps over the listing rows (one bit per row, packed into uint64 words)
+    for each categorical filter, and a sorted copy of each range column. A filter is a few
+    word-wise ORs and ANDs plus binary searches, independent of how many predicates a
+    request would otherwise chain as pandas masks.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.n = len(df)
+        self.words = (self.n + 63) // 64
+        self.levels: Dict[str, List[Any]] = {}
+        self._label_codes: Dict[str, Dict[str, int]] = {}
+        self._bitmaps: Dict[str, np.ndarray] = {}
+        for dim in FILTER_DIMENSIONS:
+            labels, codes = dimension_codes(df, dim)
+            self.levels[dim] = labels
+            self._label_codes[dim] = {str(label): i for i, label in enumerate(labels)}
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+            self._bitmaps[dim] = np.stack([
+                self._to_bitmap(order[bounds[i]:bounds[i + 1]]) for i in range(len(labels))
+            ]) if labels else np.zeros((0, self.words), dtype=np.uint64)
+
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for col in RANGE_FILTERS:
+            values = df[col].to_numpy(dtype=float) if col in df.columns else np.full(self.n, np.nan)
+            order = np.argsort(values, kind="stable")  # NaN sorts last
+            finite = int(np.isfinite(values).sum())
+            self._sorted[col] = (values[order[:finite]], order[:finite])
+
+    def extended(self, rows: pd.DataFrame) -> "RowBitmapIndex":
+        """
+        A copy that also indexes `rows` as positions n.. (listings appended to the frame).
+        Costs one copy of the bitmaps plus work proportional to len(rows).
+        """
+        index = copy.copy(self)
+        start, index.n = self.n, self.n + len(rows)
+        index.words = (index.n + 63) // 64
+        index.levels = {dim: list(labels) for dim, labels in self.levels.items()}
+        index._label_codes = {dim: dict(codes) for dim, codes in self._label_codes.items()}
+        index._bitmaps = {
+            dim: np.pad(bitmaps, ((0, 0), (0, index.words - self.words))) for dim, bitmaps in self._bitmaps.items()
+        }
+        for dim in FILTER_DIMENSIONS:
+            labels, codes = dimension_codes(rows, dim)
+            added = False
+            for i, label in enumerate(labels):
+                known = index._label_codes[dim]
+                code = known.get(str(label), known.get(label_text(label)))
+                if code is None:
+                    code, added = len(index.levels[dim]), True
+                    index.levels[dim].append(label)
+                    known[str(label)] = code
+                    index._bitmaps[dim] = np.vstack([index._bitmaps[dim], np.zeros((1, index.words), dtype=np.uint64)])
+                positions = start + np.flatnonzero(codes == i)
+                np.bitwise_or.at(index._bitmaps[dim][code], positions // 64,
+                                 np.left_shift(np.uint64(1), (positions % 64).astype(np.uint64)))
+            if added:
+                # Keep levels sorted, as a fresh index would have them
+                order = sorted(range(len(index.levels[dim])), key=lambda i: index.levels[dim][i])
+                index.levels[dim] = [index.levels[dim][i] for i in order]
+                index._bitmaps[dim] = index._bitmaps[dim][order]
+                index._label_codes[dim] = {str(label): i for i, label in enumerate(index.levels[dim])}
+
+        index._sorted = dict(self._sorted)
+        for col in RANGE_FILTERS:
+            values = rows[col].to_numpy(dtype=float) if col in rows.columns else np.full(len(rows), np.nan)
+            ok = np.flatnonzero(np.isfinite(values))
+            order = ok[np.argsort(values[ok], kind="stable")]
+            sorted_values, positions = self._sorted[col]
+            at = np.searchsorted(sorted_values, values[order], side="right")
+            index._sorted[col] = (np.insert(sorted_values, at, values[order]), np.insert(positions, at, start + order))
+        return index
+
+    def _to_bitmap(self, positions: np.ndarray) -> np.ndarray:
+        bits = np.zeros(self.words * 64, dtype=bool)
+        bits[positions] = True
+        return np.packbits(bits, bitorder="little").view(np.uint64)
+
+    def value_range(self, col: str) -> Tuple[Optional[float], Optional[float]]:
+        values, _ = self._sorted[col]
+        return (float(values[0]), float(values[-1])) if len(values) else (None, None)
+
+    def bitmap(self, filters: Filters) -> np.ndarray:
+        """Packed bitmap of the rows matching every filter."""
+        result = np.full(self.words, np.uint64(0xFFFFFFFFFFFFFFFF), dtype=np.uint64)
+        for dim, values in filters.items():
+            if dim in self._bitmaps:
+                codes = [self._label_codes[dim][v] for v in values if v in self._label_codes[dim]]
+                result &= np.bitwise_or.reduce(self._bitmaps[dim][codes], axis=0) if codes else np.uint64(0)
+            elif dim in self._sorted:
+                sorted_values, order = self._sorted[dim]
+                lo, hi = values
+                start = np.searchsorted(sorted_values, lo, side="left") if lo is not None else 0
+                stop = np.searchsorted(sorted_values, hi, side="right") if hi is not None else len(sorted_values)
+                result &= self._to_bitmap(order[start:stop])
+            else:
+                raise KeyError(dim)
+        return result
+
+    def positions(self, filters: Filters) -> np.ndarray:
+        """Sorted row positions matching `filters`."""
+        bits = np.unpackbits(self.bitmap(filters).view(np.uint8), bitorder="little", count=self.n)
+        return np.flatnonzero(bits)
+
+    def count(self, filters: Filters) -> int:
+        return len(self.positions(filters))
+
+
+def get_row_index() -> RowBitmapIndex:
+    """Bitmap index over data_viz_full.csv for the current dataset version."""
+    version = get_dataset_version()
+    if _ROW_INDEX_CACHE["version"] == version:
+        return _ROW_INDEX_CACHE["index"]
+    with _ROW_INDEX_LOCK:
+        if _ROW_INDEX_CACHE["version"] != version:
+            df, _, _ = get_visualization_data()
+            _ROW_INDEX_CACHE["index"] = RowBitmapIndex(df)
+            _ROW_INDEX_CACHE["version"] = version
+        return _ROW_INDEX_CACHE["index"]
+
+
+def filters_match(filters: Filters, rows: pd.DataFrame) -> np.ndarray:
+    """Boolean mask of the `rows` that `filters` selects (for small frames, e.g. new listings)."""
+    mask = np.ones(len(rows), dtype=bool)
+    for dim, values in filters.items():
+        if dim in RANGE_FILTERS:
+            v = pd.to_numeric(rows[dim], errors="coerce").to_numpy(dtype=float) if dim in rows.columns \
+                else np.full(len(rows), np.nan)
+            lo, hi = values
+            ok = np.isfinite(v)
+            if lo is not None:
+                ok &= v >= lo
+            if hi is not None:
+                ok &= v <= hi
+        elif dim in rows.columns:
+            ok = rows[dim].map(lambda v: label_text(v) if pd.notna(v) else None).isin(values).to_numpy(dtype=bool)
+        else:
+            ok = np.zeros(len(rows), dtype=bool)
+        mask &= ok
+    return mask
+
+
+def filter_spec(key: str) -> Optional[Filters]:
+    """The filters behind a filter_key() of a recently served view, if still remembered."""
+    with _FILTERED_LOCK:
+        return _FILTER_SPECS.get(key)
+
+
+def _remember_filters(key: str, filters: Filters) -> None:
+    size = max(int(current_app.config.get("ANALYTICS_FILTER_CACHE_SIZE", 8)),
+               int(current_app.config.get("ANALYTICS_FILTERED_FIGURE_CACHE_SIZE", 512)))
+    with _FILTERED_LOCK:
+        _FILTER_SPECS[key] = filters
+        _FILTER_SPECS.move_to_end(key)
+        while len(_FILTER_SPECS) > size:
+            _FILTER_SPECS.popitem(last=False)
+
+
+def sector_means(df: pd.DataFrame) -> pd.DataFrame:
+    """grouped_sector_data.csv's layout (per-sector means) recomputed for a subset of listings."""
+    cols = [c for c in SECTOR_MEAN_COLUMNS if c in df.columns]
+    if "sector" not in df.columns:
+        return pd.DataFrame(columns=["sector", *cols])
+    return df.groupby("sector", observed=True, sort=True)[cols].mean().reset_index()
+
+
+def get_filtered_data(filters: Filters, version: Optional[str] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (listings, per-sector means) for the filtered subset. With no filters these are the
+    cached datasets themselves; filtered subsets are kept in a small LRU so the figures of
+    one dashboard view share a single selection.
+    """
+    df, group_df, _ = get_visualization_data()
+    if not filters:
+        return df, group_df
+    version = version or get_dataset_version()
+    key = (version, filter_key(filters))
+    _remember_filters(key[1], filters)
+    with _FILTERED_LOCK:
+        hit = _FILTERED.get(key)
+        if hit is not None:
+            _FILTERED.move_to_end(key)
+            return hit
+
+    sub = df.take(get_row_index().positions(filters))
+    result = (sub, sector_means(sub))
+    size = int(current_app.config.get("ANALYTICS_FILTER_CACHE_SIZE", 8))
+    with _FILTERED_LOCK:
+        for stale in [k for k in _FILTERED if k[0] != version]:
+            del _FILTERED[stale]
+        if size > 0:
+            _FILTERED[key] = result
+            while len(_FILTERED) > size:
+                _FILTERED.popitem(last=False)
+    return result
+
+
+def carry_over_filters(old_version: str, new_version: str, rows: pd.DataFrame) -> Tuple[int, int]:
+    """
+    After `rows` were appended to the dataset (old_version -> new_version): extend the row
+    index instead of rebuilding it, and keep the filtered subsets that none of the new rows
+    belong to. Returns (kept, dropped) subsets.
+    """
+    with _ROW_INDEX_LOCK:
+        if _ROW_INDEX_CACHE["version"] == old_version:
+            _ROW_INDEX_CACHE["index"] = _ROW_INDEX_CACHE["index"].extended(rows)
+            _ROW_INDEX_CACHE["version"] = new_version
+    kept = dropped = 0
+    with _FILTERED_LOCK:
+        for key in list(_FILTERED):
+            value = _FILTERED.pop(key)
+            filters = _FILTER_SPECS.get(key[1])
+            if key[0] == old_version and filters is not None and not filters_match(filters, rows).any():
+                _FILTERED[(new_version, key[1])] = value
+                kept += 1
+            else:
+                dropped += 1
+    return kept, dropped
+
+
+def clear_row_filters() -> None:
+    with _ROW_INDEX_LOCK:
+        _ROW_INDEX_CACHE["version"] = None
+        _ROW_INDEX_CACHE["index"] = None
+    with _FILTERED_LOCK:
+        _FILTERED.clear()
+        _FILTER_SPECS.clear()
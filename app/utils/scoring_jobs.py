@@ -0,0 +1,267 @@
+# app/utils/scoring_jobs.py
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from .batch_prediction import RESULT_FIELDS, iter_batch_predictions
+
+logger = logging.getLogger(__name__)
+
+RESULT_FORMATS = ("csv", "parquet")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,            -- queued | running | done | failed
+    result_format TEXT NOT NULL,
+    total_rows INTEGER NOT NULL,
+    done_rows INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    owner_pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+# One dispatcher thread per web process feeds jobs to one pool of scoring processes
+_STATE: Dict[str, Any] = {"dispatcher": None, "pool": None, "settings": None}
+_QUEUE: "queue.Queue[str]" = queue.Queue()
+_STATE_LOCK = threading.Lock()
+
+
+class JobError(ValueError):
+    """Bad job submission (unknown format, missing optional dependency, ...)."""
+
+
+# --- storage ---------------------------------------------------------------------------------
+
+def _jobs_dir(settings: Dict[str, Any]) -> Path:
+    path = Path(settings["dir"])
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _connect(settings: Dict[str, Any]) -> sqlite3.Connection:
+    conn = sqlite3.connect(_jobs_dir(settings) / "jobs.sqlite3", timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(_SCHEMA)
+    return conn
+
+
+def _update(settings: Dict[str, Any], job_id: str, **fields) -> None:
+    cols = ", ".join(f"{k} = ?" for k in fields)
+    with _connect(settings) as conn:
+        conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+
+
+def _claim(settings: Dict[str, Any], job_id: str, expected_status: str, expected_owner: Optional[int],
+           **fields) -> bool:
+    """
+    Update the job only if it is still in `expected_status` and owned by `expected_owner`, in
+    one statement; True if this call won. Several web processes race for the same orphaned/queued job.
+    """
+    cols = ", ".join(f"{k} = ?" for k in fields)
+    with _connect(settings) as conn:
+        cur = conn.execute(
+            f"UPDATE jobs SET {cols} WHERE id = ? AND status = ? AND owner_pid IS ?",
+            (*fields.values(), job_id, expected_status, expected_owner),
+        )
+    return cur.rowcount == 1
+
+
+def _job_paths(settings: Dict[str, Any], job_id: str, result_format: str = "csv") -> Dict[str, Path]:
+    job_dir = _jobs_dir(settings) / job_id
+    return {"dir": job_dir, "input": job_dir / "input.csv", "result": job_dir / f"result.{result_format}"}
+
+
+def get_job(settings: Dict[str, Any], job_id: str) -> Optional[Dict[str, Any]]:
+    with _connect(settings) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job["progress"] = round(job["done_rows"] / job["total_rows"], 4) if job["total_rows"] else 1.0
+    job.pop("owner_pid", None)
+    return job
+
+
+def get_result_path(settings: Dict[str, Any], job_id: str) -> Optional[Path]:
+    job = get_job(settings, job_id)
+    if job is None or job["status"] != "done":
+        return None
+    return _job_paths(settings, job_id, job["result_format"])["result"]
+
+
+# --- worker processes ------------------------------------------------------------------------
+
+def _init_worker() -> None:
+    # Each scoring process loads the model once and keeps it for every chunk it scores
+    from .model_loader import warm_up_model
+    warm_up_model()
+
+
+def _score_chunk(start: int, records: pd.DataFrame) -> pd.DataFrame:
+    results = next(iter_batch_predictions(records, chunk_size=max(len(records), 1)), [])
+    out = pd.DataFrame(results, columns=RESULT_FIELDS)
+    out["row"] += start
+    out["errors"] = out["errors"].map("; ".join)
+    return out
+
+
+def _get_pool(settings: Dict[str, Any]) -> ProcessPoolExecutor:
+    if _STATE["pool"] is None:
+        # spawn, not fork: the web process is multi-threaded
+        _STATE["pool"] = ProcessPoolExecutor(
+            max_workers=settings["workers"],
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _STATE["pool"]
+
+
+def _reset_pool() -> None:
+    # A broken pool (e.g. _init_worker failed: model missing) rejects every later submit
+    pool, _STATE["pool"] = _STATE["pool"], None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+# --- dispatcher ------------------------------------------------------------------------------
+
+def _run_job(settings: Dict[str, Any], job_id: str) -> None:
+    job = get_job(settings, job_id)
+    if job is None:
+        return
+    # Queued jobs are owned by the process that queued them; only that one may start them
+    if not _claim(settings, job_id, "queued", os.getpid(), status="running", started_at=time.time()):
+        return
+    paths = _job_paths(settings, job_id, job["result_format"])
+    try:
+        records = pd.read_csv(paths["input"], dtype=str, keep_default_na=False)
+        chunk_size = settings["chunk_size"]
+        pool = _get_pool(settings)
+        futures = [
+            pool.submit(_score_chunk, start, records.iloc[start:start + chunk_size])
+            for start in range(0, len(records), chunk_size)
+        ]
+        parts, done = [], 0
+        for fut in as_completed(futures):
+            part = fut.result()
+            parts.append(part)
+            done += len(part)
+            _update(settings, job_id, done_rows=done)
+
+        result = pd.concat(parts).sort_values("row") if parts else pd.DataFrame(columns=RESULT_FIELDS)
+        tmp = paths["result"].with_suffix(f".{os.getpid()}.tmp")
+        if job["result_format"] == "parquet":
+            result.to_parquet(tmp, index=False)
+        else:
+            result.to_csv(tmp, index=False)
+        os.replace(tmp, paths["result"])
+        _update(settings, job_id, status="done", finished_at=time.time())
+        logger.info(f"[jobs] {job_id}: scored {len(result)} rows")
+    except BrokenProcessPool as e:
+        logger.exception(f"[jobs] {job_id} failed: scoring pool broke, it will be recreated for the next job")
+        _reset_pool()
+        _update(settings, job_id, status="failed", error=f"Scoring processes died: {e}", finished_at=time.time())
+    except Exception as e:
+        logger.exception(f"[jobs] {job_id} failed")
+        _update(settings, job_id, status="failed", error=str(e), finished_at=time.time())
+
+
+def _dispatch_forever(settings: Dict[str, Any]) -> None:
+    while True:
+        job_id = _QUEUE.get()
+        try:
+            _run_job(settings, job_id)
+        finally:
+            _QUEUE.task_done()
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def _ensure_dispatcher(settings: Dict[str, Any]) -> None:
+    with _STATE_LOCK:
+        if _STATE["dispatcher"] is not None:
+            return
+        _STATE["settings"] = settings
+        # Re-queue jobs orphaned by a process that died mid-run (or before picking them up)
+        with _connect(settings) as conn:
+            rows = conn.execute(
+                "SELECT id, status, owner_pid FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        for row in rows:
+            if _pid_alive(row["owner_pid"]):
+                continue
+            # Every starting web worker sees the same dead owner; the first to claim the job queues it
+            if _claim(settings, row["id"], row["status"], row["owner_pid"],
+                      status="queued", done_rows=0, owner_pid=os.getpid()):
+                _QUEUE.put(row["id"])
+        thread = threading.Thread(target=_dispatch_forever, args=(settings,), name="scoring-jobs", daemon=True)
+        thread.start()
+        _STATE["dispatcher"] = thread
+
+
+def submit_job(settings: Dict[str, Any], records: pd.DataFrame, result_format: str = "csv") -> str:
+    """Persist `records` (form field columns) as a new job and queue it. Returns the job id."""
+    if result_format not in RESULT_FORMATS:
+        raise JobError(f"format must be one of: {', '.join(RESULT_FORMATS)}")
+    if result_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise JobError("Parquet results need pyarrow installed") from e
+
+    job_id = uuid.uuid4().hex
+    paths = _job_paths(settings, job_id, result_format)
+    paths["dir"].mkdir(parents=True, exist_ok=True)
+    records.to_csv(paths["input"], index=False)
+    with _connect(settings) as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, status, result_format, total_rows, owner_pid, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, "queued", result_format, len(records), os.getpid(), time.time()),
+        )
+    _ensure_dispatcher(settings)
+    _QUEUE.put(job_id)
+    return job_id
+
+
+def default_scoring_workers(config) -> int:
+    """
+    Every web worker runs its own dispatcher and pool, so by default the cores are split
+    between WEB_WORKERS web processes instead of each pool taking all of them.
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, int(config.get("WEB_WORKERS") or 1)))
+
+
+def job_settings(config) -> Dict[str, Any]:
+    """Plain-dict settings from the Flask config (the dispatcher thread runs outside app context)."""
+    return {
+        "dir": config.get("SCORING_JOBS_DIR"),
+        "workers": int(config.get("SCORING_JOBS_WORKERS") or default_scoring_workers(config)),
+        "chunk_size": int(config.get("SCORING_JOBS_CHUNK_SIZE", 5000)),
+    }
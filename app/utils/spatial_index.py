@@ -0,0 +1,118 @@
+# app/utils/spatial_index.py
+
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from .analytics_loader import get_dataset_version, get_visualization_data
+
+EARTH_RADIUS_M = 6_371_008.8
+
+# Columns returned with each hit (whichever exist in the source frame)
+SPATIAL_FIELDS = {
+    "listings": ["property_type", "society", "sector", "price", "price_per_sqft", "bedRoom", "built_up_area"],
+    "sectors": ["sector", "price", "price_per_sqft", "built_up_area"],
+}
+
+_SPATIAL_CACHE: Dict[str, Any] = {"version": None, "indexes": {}}
+_SPATIAL_LOCK = threading.Lock()
+
+
+class SpatialIndex:
+    """
+    Points with lat/lon: a haversine BallTree for k-nearest / radius queries and a
+    latitude-sorted copy for bounding boxes (binary search on latitude, then a
+    vectorized longitude filter). Rows without coordinates are left out.
+    """
+
+    def __init__(self, frame: pd.DataFrame, fields: List[str]):
+        lat = pd.to_numeric(frame["latitude"], errors="coerce").to_numpy(dtype=float)
+        lon = pd.to_numeric(frame["longitude"], errors="coerce").to_numpy(dtype=float)
+        keep = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        self.rows = keep  # positions in the source frame
+        self.lat, self.lon = lat[keep], lon[keep]
+        self.tree = BallTree(np.radians(np.column_stack([self.lat, self.lon])), metric="haversine")
+
+        self._by_lat = np.argsort(self.lat, kind="stable")
+        self._sorted_lat = self.lat[self._by_lat]
+
+        cols = [c for c in fields if c in frame.columns]
+        # Serialize the payload columns once; queries only pick rows
+        self._records = json.loads(frame.iloc[keep][cols].to_json(orient="records"))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _hits(self, idx: np.ndarray, dist_rad: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        out = []
+        for n, i in enumerate(idx.tolist()):
+            rec = {"row": int(self.rows[i]), "lat": float(self.lat[i]), "lon": float(self.lon[i]), **self._records[i]}
+            if dist_rad is not None:
+                rec["distance_m"] = round(float(dist_rad[n]) * EARTH_RADIUS_M, 1)
+            out.append(rec)
+        return out
+
+    def nearest(self, lat: float, lon: float, k: int = 10) -> List[Dict[str, Any]]:
+        k = min(k, len(self))
+        if k <= 0:
+            return []
+        dist, idx = self.tree.query(np.radians([[lat, lon]]), k=k)
+        return self._hits(idx[0], dist[0])
+
+    def within_radius(self, lat: float, lon: float, radius_m: float, limit: int = 1000) -> Tuple[int, List[Dict[str, Any]]]:
+        """(total matches, nearest `limit` of them)."""
+        idx, dist = self.tree.query_radius(np.radians([[lat, lon]]), r=radius_m / EARTH_RADIUS_M,
+                                           return_distance=True, sort_results=True)
+        return len(idx[0]), self._hits(idx[0][:limit], dist[0][:limit])
+
+    def bbox_positions(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """
+        Index positions inside the half-open box [south, north) x [west, east), so a point on a
+        shared edge falls in exactly one of two adjacent tiles; west > east wraps the antimeridian.
+        """
+        lo = np.searchsorted(self._sorted_lat, south, side="left")
+        hi = np.searchsorted(self._sorted_lat, north, side="left")
+        candidates = self._by_lat[lo:hi]
+        lon = self.lon[candidates]
+        inside = (lon >= west) & (lon < east) if west <= east else (lon >= west) | (lon < east)
+        return candidates[inside]
+
+    def in_bbox(self, south: float, west: float, north: float, east: float,
+                limit: int = 1000) -> Tuple[int, List[Dict[str, Any]]]:
+        """(total matches, first `limit` of them) inside the box."""
+        idx = self.bbox_positions(south, west, north, east)
+        return len(idx), self._hits(idx[:limit])
+
+    def record(self, i: int) -> Dict[str, Any]:
+        return self._records[i]
+
+
+def get_spatial_index(kind: str = "listings") -> SpatialIndex:
+    """Index over data_viz_full.csv ("listings") or grouped_sector_data.csv ("sectors"), per dataset version."""
+    if kind not in SPATIAL_FIELDS:
+        raise KeyError(kind)
+    version = get_dataset_version()
+    index = _SPATIAL_CACHE["indexes"].get(kind) if _SPATIAL_CACHE["version"] == version else None
+    if index is not None:
+        return index
+    with _SPATIAL_LOCK:
+        if _SPATIAL_CACHE["version"] != version:
+            _SPATIAL_CACHE["indexes"] = {}
+            _SPATIAL_CACHE["version"] = version
+        if kind not in _SPATIAL_CACHE["indexes"]:
+            df, group_df, _ = get_visualization_data()
+            frame = df if kind == "listings" else group_df
+            _SPATIAL_CACHE["indexes"][kind] = SpatialIndex(frame, SPATIAL_FIELDS[kind])
+        return _SPATIAL_CACHE["indexes"][kind]
+
+
+def clear_spatial_index() -> None:
+    with _SPATIAL_LOCK:
+        _SPATIAL_CACHE["version"] = None
+        _SPATIAL_CACHE["indexes"] = {}
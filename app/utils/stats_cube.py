@@ -0,0 +1,257 @@
+# app/utils/stats_cube.py
+
+from __future__ import annotations
+
+import itertools
+import threading
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Dimensions of the cube, in key order. "luxury" is bucketed from luxury_score.
+CUBE_DIMENSIONS = ("sector", "bedRoom", "property_type", "agePossession", "luxury")
+CUBE_MEASURES = ("price", "price_per_sqft")
+CUBE_QUANTILES = (0.10, 0.25, 0.50, 0.75, 0.90)
+QUANTILE_NAMES = ("p10", "p25", "median", "p75", "p90")
+
+# Same bins as categorize_luxury() in the feature-engineering notebook: [0, 50) [50, 150) [150, 175]
+LUXURY_LABELS = ("Low", "Medium", "High")
+LUXURY_BINS = (0.0, 50.0, 150.0, np.nextafter(175.0, np.inf))
+
+# Above this many possible keys, lookups binary-search the sorted keys instead of a dense slot table
+DENSE_LOOKUP_MAX = 1 << 24
+
+# id(frame) -> (weakref to frame, cube); one cube per frame object
+_CUBES: Dict[int, Tuple[Any, "StatsCube"]] = {}
+_CUBES_LOCK = threading.Lock()
+_CUBES_MAX = 8
+
+
+def luxury_bucket(scores: pd.Series) -> pd.Series:
+    return pd.cut(pd.to_numeric(scores, errors="coerce"), bins=LUXURY_BINS, labels=LUXURY_LABELS, right=False)
+
+
+def dimension_codes(df: pd.DataFrame, dim: str) -> Tuple[List[Any], np.ndarray]:
+    """(labels, int codes per row with -1 = missing) for one cube dimension."""
+    if dim == "luxury":
+        col = luxury_bucket(df["luxury_score"]) if "luxury_score" in df.columns else None
+        if col is None:
+            return list(LUXURY_LABELS), np.full(len(df), -1, dtype=np.int16)
+        return list(LUXURY_LABELS), col.cat.codes.to_numpy(dtype=np.int16)
+    if dim not in df.columns:
+        return [], np.full(len(df), -1, dtype=np.int16)
+
+    col = df[dim]
+    if pd.api.types.is_numeric_dtype(col):
+        values = col.to_numpy(dtype=float)
+        labels = np.unique(values[np.isfinite(values)])
+        codes = np.searchsorted(labels, values)
+        codes[~np.isfinite(values)] = -1
+        integral = np.array_equal(labels, np.round(labels))
+        return [int(v) if integral else float(v) for v in labels], codes.astype(np.int16)
+
+    col = col.astype("object").where(col.notna(), None)
+    labels = sorted({str(v) for v in col if v is not None})
+    codes = pd.Categorical(col.map(lambda v: None if v is None else str(v)), categories=labels).codes
+    return labels, np.asarray(codes, dtype=np.int16)
+
+
+def _key_strides(levels: Dict[str, List[Any]]) -> Tuple[Dict[str, int], int]:
+    """Per-dimension key multipliers and the size of the key space."""
+    strides, space = {}, 1
+    for dim in reversed(CUBE_DIMENSIONS):
+        strides[dim] = space
+        space *= len(levels[dim]) + 1
+    return strides, space
+
+
+def _group_stats(keys: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (unique keys, n, mean, quantiles) of `values` grouped by `keys`. One sort for all groups;
+    quantiles interpolate linearly between order statistics, like np.percentile's default.
+    """
+    if not len(keys):
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.zeros(0), np.zeros((0, len(CUBE_QUANTILES))))
+    order = np.lexsort((values, keys))
+    k, v = keys[order], values[order]
+    uniq, starts, n = np.unique(k, return_index=True, return_counts=True)
+    mean = np.add.reduceat(v, starts) / n
+    pos = starts[:, None] + np.asarray(CUBE_QUANTILES)[None, :] * (n[:, None] - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, (starts + n - 1)[:, None])
+    quantiles = v[lo] + (v[hi] - v[lo]) * (pos - lo)
+    return uniq, n, mean, quantiles
+
+
+class StatsCube:
+    """
+    Pre-aggregated listing statistics over every combination of CUBE_DIMENSIONS, each one
+    either fixed to a value or rolled up ("all"): row count plus n / mean / p10..p90 of each
+    measure. A cell is addressed by a mixed-radix key (digit 0 = all, i + 1 = i-th label),
+    so lookups are a single array index and cost nothing in the number of listings.
+    """
+
+    def __init__(self, levels: Dict[str, List[Any]], keys: np.ndarray, counts: np.ndarray,
+                 n: np.ndarray, stats: np.ndarray, dimensions: Tuple[str, ...] = CUBE_DIMENSIONS):
+        self.dimensions = dimensions
+        self.levels = levels
+        self.keys = keys          # (cells,) int64, sorted
+        self.counts = counts      # (cells,) int32 rows per cell
+        self.n = n                # (cells, measures) int32 non-missing values per measure
+        self.stats = stats        # (cells, measures, 1 + quantiles) float64: mean, p10..p90 (exact to the API's 4 decimals)
+        self._label_codes = {d: {str(label): i for i, label in enumerate(levels[d])} for d in CUBE_DIMENSIONS}
+        self._strides, space = _key_strides(levels)
+        self._slot = None
+        if space <= DENSE_LOOKUP_MAX:
+            self._slot = np.full(space, -1, dtype=np.int32)
+            self._slot[keys] = np.arange(len(keys), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dimensions: Tuple[str, ...] = CUBE_DIMENSIONS) -> "StatsCube":
+        """Cube over `dimensions` (a subset of CUBE_DIMENSIONS; the others are always rolled up)."""
+        dimensions = tuple(d for d in CUBE_DIMENSIONS if d in dimensions)
+        levels, codes = {}, {}
+        for dim in CUBE_DIMENSIONS:
+            if dim in dimensions:
+                levels[dim], codes[dim] = dimension_codes(df, dim)
+            else:
+                levels[dim] = []
+        strides, _ = _key_strides(levels)
+        measures = [
+            df[m].to_numpy(dtype=float) if m in df.columns else np.full(len(df), np.nan)
+            for m in CUBE_MEASURES
+        ]
+
+        parts = []
+        for r in range(len(dimensions) + 1):
+            for dims in itertools.combinations(dimensions, r):
+                keep = np.ones(len(df), dtype=bool)
+                key = np.zeros(len(df), dtype=np.int64)
+                for dim in dims:
+                    keep &= codes[dim] >= 0
+                    key += (codes[dim].astype(np.int64) + 1) * strides[dim]
+                key = key[keep]
+                cell_keys, cell_counts = np.unique(key, return_counts=True)
+                n = np.zeros((len(cell_keys), len(CUBE_MEASURES)), dtype=np.int32)
+                stats = np.full((len(cell_keys), len(CUBE_MEASURES), 1 + len(CUBE_QUANTILES)), np.nan)
+                for m, values in enumerate(measures):
+                    values = values[keep]
+                    ok = np.isfinite(values)
+                    uniq, count, mean, quantiles = _group_stats(key[ok], values[ok])
+                    at = np.searchsorted(cell_keys, uniq)
+                    n[at, m] = count
+                    stats[at, m, 0] = mean
+                    stats[at, m, 1:] = quantiles
+                parts.append((cell_keys, cell_counts, n, stats))
+
+        keys = np.concatenate([p[0] for p in parts])
+        order = np.argsort(keys, kind="stable")  # keys of different dimension subsets never collide
+        return cls(
+            levels,
+            keys[order],
+            np.concatenate([p[1] for p in parts])[order].astype(np.int32),
+            np.concatenate([p[2] for p in parts])[order],
+            np.concatenate([p[3] for p in parts])[order],
+            dimensions,
+        )
+
+    def _key(self, filters: Dict[str, Any]) -> Optional[int]:
+        key = 0
+        for dim, value in filters.items():
+            if dim not in self.dimensions:
+                raise KeyError(dim)
+            if value is None:
+                continue
+            code = self._label_codes[dim].get(label_text(value))
+            if code is None:
+                return None
+            key += (code + 1) * self._strides[dim]
+        return key
+
+    def _position(self, filters: Dict[str, Any]) -> int:
+        key = self._key(filters)
+        if key is None:
+            return -1
+        if self._slot is not None:
+            return int(self._slot[key])
+        i = int(np.searchsorted(self.keys, key))
+        return i if i < len(self.keys) and self.keys[i] == key else -1
+
+    def _cell(self, i: int) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"count": int(self.counts[i]) if i >= 0 else 0}
+        for m, measure in enumerate(CUBE_MEASURES):
+            n = int(self.n[i, m]) if i >= 0 else 0
+            values = [round(v, 4) for v in self.stats[i, m].tolist()] if n else [None] * (1 + len(CUBE_QUANTILES))
+            out[measure] = {"n": n, **dict(zip(("mean",) + QUANTILE_NAMES, values))}
+        return out
+
+    def cell(self, **filters: Any) -> Dict[str, Any]:
+        """Statistics of the listings matching `filters` ({dimension: value}; omitted = all). Raises KeyError for unknown dimensions."""
+        return self._cell(self._position(filters))
+
+    def breakdown(self, dim: str, **filters: Any) -> List[Tuple[Any, Dict[str, Any]]]:
+        """[(label, cell statistics)] for each value of `dim` with matching listings, in label order."""
+        if dim not in self.dimensions:
+            raise KeyError(dim)
+        out = []
+        for label in self.levels[dim]:
+            i = self._position({**filters, dim: label})
+            if i >= 0:
+                out.append((label, self._cell(i)))
+        return out
+
+
+def label_text(value: Any) -> str:
+    # Query strings carry "3" or "3.0" for a BHK of 3; labels are matched by their text
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    text = str(value)
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return str(int(number)) if number.is_integer() and "." in text else text
+
+
+def stats_cube_for(df: pd.DataFrame, dimensions: Tuple[str, ...] = CUBE_DIMENSIONS) -> StatsCube:
+    """
+    Cube for this frame object covering at least `dimensions`, built on first use and kept
+    while the frame is alive. Builders ask only for the dimensions they group by, so a
+    filtered subset pays for a one- or two-dimensional cube, not the full one.
+    """
+    entry = _CUBES.get(id(df))
+    if entry is not None and entry[0]() is df and set(dimensions) <= set(entry[1].dimensions):
+        return entry[1]
+    with _CUBES_LOCK:
+        entry = _CUBES.get(id(df))
+        if entry is not None and entry[0]() is df:
+            if set(dimensions) <= set(entry[1].dimensions):
+                return entry[1]
+            dimensions = tuple(set(dimensions) | set(entry[1].dimensions))
+        cube = StatsCube.from_frame(df, dimensions)
+        _CUBES.pop(id(df), None)
+        for stale in [k for k, (ref, _) in _CUBES.items() if ref() is None]:
+            del _CUBES[stale]
+        while len(_CUBES) >= _CUBES_MAX:
+            del _CUBES[next(iter(_CUBES))]
+        _CUBES[id(df)] = (weakref.ref(df), cube)
+        return cube
+
+
+def get_stats_cube() -> StatsCube:
+    """Cube over data_viz_full.csv for the current dataset version."""
+    from .analytics_loader import get_visualization_data
+
+    df, _, _ = get_visualization_data()
+    return stats_cube_for(df)
+
+
+def clear_stats_cube() -> None:
+    with _CUBES_LOCK:
+        _CUBES.clear()
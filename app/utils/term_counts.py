@@ -0,0 +1,139 @@
+# app/utils/term_counts.py
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+from wordcloud import WordCloud
+
+SECTOR_TERMS_FILE = "sector_term_counts.npz"
+
+_TERMS_CACHE: Dict[str, object] = {"key": None, "counts": None}
+_TERMS_LOCK = threading.Lock()
+
+
+def count_terms(text: str) -> Dict[str, int]:
+    """Term/phrase frequencies exactly as WordCloud.generate() would compute them for `text`."""
+    return WordCloud().process_text(text or "")
+
+
+class SectorTermCounts:
+    """
+    Per-sector term frequencies in CSR form: one interned vocabulary, and for sector i the
+    term ids term_ids[indptr[i]:indptr[i+1]] with their counts. Stored as a pickle-free .npz.
+    """
+
+    def __init__(self, sectors: List[str], vocab: List[str], indptr: np.ndarray,
+                 term_ids: np.ndarray, counts: np.ndarray):
+        self.sectors = sectors
+        self.vocab = vocab
+        self.indptr = indptr
+        self.term_ids = term_ids
+        self.counts = counts
+        self._position = {s: i for i, s in enumerate(sectors)}
+
+    def __contains__(self, sector: str) -> bool:
+        return sector in self._position
+
+    def __len__(self) -> int:
+        return len(self.sectors)
+
+    @classmethod
+    def from_texts(cls, texts: Mapping[str, str]) -> "SectorTermCounts":
+        sectors = list(texts.keys())
+        per_sector = [count_terms(texts[s]) for s in sectors]
+        vocab = sorted({term for freqs in per_sector for term in freqs})
+        term_id = {term: i for i, term in enumerate(vocab)}
+        indptr = np.zeros(len(sectors) + 1, dtype=np.int64)
+        ids: List[int] = []
+        counts: List[int] = []
+        for i, freqs in enumerate(per_sector):
+            for term, n in sorted(freqs.items(), key=lambda kv: term_id[kv[0]]):
+                ids.append(term_id[term])
+                counts.append(n)
+            indptr[i + 1] = len(ids)
+        id_dtype = np.uint16 if len(vocab) <= np.iinfo(np.uint16).max else np.uint32
+        return cls(sectors, vocab, indptr, np.asarray(ids, dtype=id_dtype), np.asarray(counts, dtype=np.uint32))
+
+    def frequencies(self, sector: str) -> Dict[str, int]:
+        """{term: count} for one sector; raises KeyError for unknown sectors."""
+        i = self._position[sector]
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return {self.vocab[t]: int(n) for t, n in zip(self.term_ids[lo:hi].tolist(), self.counts[lo:hi].tolist())}
+
+    def top_terms(self, sector: Optional[str] = None, n: int = 20) -> List[Tuple[str, int]]:
+        """Most frequent terms of one sector, or summed over all sectors."""
+        if sector is None:
+            totals = np.bincount(self.term_ids, weights=self.counts, minlength=len(self.vocab))
+        else:
+            i = self._position[sector]
+            lo, hi = self.indptr[i], self.indptr[i + 1]
+            totals = np.bincount(self.term_ids[lo:hi], weights=self.counts[lo:hi], minlength=len(self.vocab))
+        order = np.argsort(-totals, kind="stable")[:n]
+        return [(self.vocab[t], int(totals[t])) for t in order.tolist() if totals[t] > 0]
+
+    def save(self, path: Path) -> None:
+        encoded = [s.encode("utf-8") for s in self.vocab]
+        offsets = np.cumsum([0] + [len(b) for b in encoded], dtype=np.int64)
+        sector_bytes = [s.encode("utf-8") for s in self.sectors]
+        sector_offsets = np.cumsum([0] + [len(b) for b in sector_bytes], dtype=np.int64)
+        tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npz")
+        np.savez_compressed(
+            tmp,
+            vocab=np.frombuffer(b"".join(encoded), dtype=np.uint8), vocab_offsets=offsets,
+            sectors=np.frombuffer(b"".join(sector_bytes), dtype=np.uint8), sector_offsets=sector_offsets,
+            indptr=self.indptr, term_ids=self.term_ids, counts=self.counts,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> "SectorTermCounts":
+        with np.load(path, allow_pickle=False) as z:
+            def strings(blob_key: str, offsets_key: str) -> List[str]:
+                blob, offsets = z[blob_key].tobytes(), z[offsets_key]
+                return [blob[a:b].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])]
+            return cls(strings("sectors", "sector_offsets"), strings("vocab", "vocab_offsets"),
+                       z["indptr"], z["term_ids"], z["counts"])
+
+
+def export_sector_term_counts(texts: Mapping[str, str], path: Path) -> SectorTermCounts:
+    counts = SectorTermCounts.from_texts(texts)
+    counts.save(path)
+    return counts
+
+
+def term_counts_path() -> Path:
+    """Where the exported term counts live: next to the sector feature map."""
+    from .analytics_loader import visualization_paths
+
+    return visualization_paths()[2].with_name(SECTOR_TERMS_FILE)
+
+
+def get_sector_term_counts() -> SectorTermCounts:
+    """
+    Term counts for the current sector map: the exported .npz when it is at least as new
+    as the sector map, else counted once from the texts and kept for this dataset version.
+    """
+    from .analytics_loader import get_dataset_version, get_visualization_data, visualization_paths
+
+    sector_map_path = visualization_paths()[2]
+    npz_path = term_counts_path()
+    fresh = npz_path.exists() and npz_path.stat().st_mtime >= sector_map_path.stat().st_mtime
+    key = (get_dataset_version(), fresh and npz_path.stat().st_mtime_ns)
+    if _TERMS_CACHE["key"] == key:
+        return _TERMS_CACHE["counts"]
+    with _TERMS_LOCK:
+        if _TERMS_CACHE["key"] != key:
+            if fresh:
+                counts = SectorTermCounts.load(npz_path)
+            else:
+                _, _, sector_feature_map = get_visualization_data()
+                counts = SectorTermCounts.from_texts(sector_feature_map)
+            _TERMS_CACHE["counts"] = counts
+            _TERMS_CACHE["key"] = key
+        return _TERMS_CACHE["counts"]
+
@@ -0,0 +1,168 @@
+# app/utils/what_if.py
+
+from __future__ import annotations
+
+import math
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.ensemble import RandomForestRegressor, VotingRegressor
+from sklearn.pipeline import Pipeline
+
+from .compiled_model import forest_tree_predictions
+from .data_helper import ALLOWED_FIELDS, CATEGORICAL_FIELDS, validate_frame
+from .model_loader import get_model, get_allowed_values
+
+
+class WhatIfError(ValueError):
+    """The what-if request itself is invalid (unknown axis, grid too large, ...)."""
+
+
+def _axis_values(name: str, spec: Any, max_cells: int) -> Tuple[int, Callable[[], List[Any]]]:
+    """
+    An axis is a list of scalar values, "all" (every allowed value of a categorical field),
+    or {"start", "stop", "num"} for an evenly spaced numeric range. Returns (length, values):
+    ranges are only materialized by calling `values`, once the grid size has been checked.
+    """
+    if name not in ALLOWED_FIELDS:
+        raise WhatIfError(f"Unknown axis: {name}")
+    if spec == "all":
+        if name not in CATEGORICAL_FIELDS:
+            raise WhatIfError(f"'all' only applies to categorical axes, not {name}")
+        values = list(get_allowed_values().get(name, []))
+        return len(values), lambda: values
+    if isinstance(spec, dict):
+        try:
+            start, stop = float(spec["start"]), float(spec["stop"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise WhatIfError(f"Axis {name} range needs numeric start/stop[/num]: {e}") from e
+        num = spec.get("num", 10)
+        if isinstance(num, bool) or not isinstance(num, int) or not 1 <= num <= max_cells:
+            raise WhatIfError(f"Axis {name} 'num' must be an integer from 1 to {max_cells}")
+        if not (np.isfinite(start) and np.isfinite(stop)):
+            raise WhatIfError(f"Axis {name} range needs finite start/stop")
+        return num, lambda: [round(float(v), 4) for v in np.linspace(start, stop, num)]
+    if isinstance(spec, list) and spec:
+        for v in spec:
+            if isinstance(v, bool) or not isinstance(v, (str, int, float)) \
+                    or (isinstance(v, float) and not np.isfinite(v)):
+                raise WhatIfError(f"Axis {name} values must be strings or finite numbers")
+        values = list(dict.fromkeys(spec))  # drop duplicates, keep order
+        return len(values), lambda: values
+    raise WhatIfError(f"Axis {name} must be a non-empty list, 'all' or {{start, stop, num}}")
+
+
+def build_grid(base: Dict[str, Any], axes: Dict[str, List[Any]]) -> pd.DataFrame:
+    """Cartesian product of the axes over `base`, one row per cell (last axis varies fastest)."""
+    index = pd.MultiIndex.from_product(list(axes.values()), names=list(axes.keys()))
+    grid = index.to_frame(index=False)
+    for field in ALLOWED_FIELDS:
+        if field not in grid.columns:
+            grid[field] = base.get(field, "")
+    return grid[ALLOWED_FIELDS]
+
+
+def _find_forest(model) -> Optional[Tuple[Callable[[pd.DataFrame], np.ndarray], RandomForestRegressor,
+                                          Optional[TransformedTargetRegressor]]]:
+    """(preprocess, forest, target transformer) for the RandomForest inside `model`, if there is one."""
+    ttr = None
+    if isinstance(model, TransformedTargetRegressor):
+        ttr, model = model, model.regressor_
+    candidates = model.estimators_ if isinstance(model, VotingRegressor) else [model]
+    for est in candidates:
+        if isinstance(est, RandomForestRegressor):
+            return (lambda X: X.to_numpy(dtype=float)), est, ttr
+        if isinstance(est, Pipeline) and isinstance(est.steps[-1][1], RandomForestRegressor):
+            return est[:-1].transform, est.steps[-1][1], ttr
+    return None
+
+
+def _to_target_space(ttr, y: np.ndarray) -> np.ndarray:
+    if ttr is None:
+        return y
+    if ttr.func is not None:
+        return np.asarray(ttr.func(y), dtype=float)
+    return ttr.transformer_.transform(y.reshape(-1, 1)).ravel()
+
+
+def _from_target_space(ttr, y: np.ndarray) -> np.ndarray:
+    if ttr is None:
+        return y
+    if ttr.inverse_func is not None:
+        return np.asarray(ttr.inverse_func(y), dtype=float)
+    return ttr.transformer_.inverse_transform(y.reshape(-1, 1)).ravel()
+
+
+def forest_interval(model, X: pd.DataFrame, preds: np.ndarray, level: float) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Per-tree quantile interval around `preds`. For a blended model the spread of the
+    RandomForest member's trees (in the model's target space, e.g. log price) is
+    applied around the blended prediction. None if the model has no RandomForest.
+    """
+    found = _find_forest(model)
+    if found is None:
+        return None
+    preprocess, forest, ttr = found
+    trees = forest_tree_predictions(forest, preprocess(X))  # (n_trees, n_rows), target space
+    alpha = (1.0 - level) / 2.0
+    lo_q, hi_q = np.quantile(trees, [alpha, 1.0 - alpha], axis=0)
+    centre = _to_target_space(ttr, preds)
+    spread_mean = trees.mean(axis=0)
+    return (_from_target_space(ttr, centre + lo_q - spread_mean),
+            _from_target_space(ttr, centre + hi_q - spread_mean))
+
+
+def run_what_if(base: Dict[str, Any], axes_spec: Dict[str, Any], level: Optional[float] = 0.8,
+                max_cells: int = 10000) -> Dict[str, Any]:
+    """
+    Score `base` across every combination of `axes_spec` in a single predict() call.
+    Returns axis values, the grid shape and price matrices (crore, null for invalid cells).
+    """
+    if not isinstance(base, dict):
+        raise WhatIfError("'base' must be an object of form fields")
+    if not isinstance(axes_spec, dict):
+        raise WhatIfError("'axes' must be an object mapping fields to values")
+    if level is not None and (isinstance(level, bool) or not isinstance(level, (int, float))
+                              or not 0 < level < 1):
+        raise WhatIfError("'interval' must be null or a number strictly between 0 and 1")
+    if not axes_spec:
+        raise WhatIfError("At least one axis is required")
+    parsed = {name: _axis_values(name, spec, max_cells) for name, spec in axes_spec.items()}
+    shape = [length for length, _ in parsed.values()]
+    n_cells = math.prod(shape)  # Python ints: no overflow, and nothing built yet
+    if n_cells > max_cells:
+        raise WhatIfError(f"Grid has {n_cells} cells; the limit is {max_cells}")
+    axes = {name: values() for name, (_, values) in parsed.items()}
+
+    grid = build_grid(base, axes)
+    X, invalid, errors = validate_frame(grid)
+    prices = np.full(n_cells, np.nan)
+    low = high = None
+
+    valid_pos = np.flatnonzero(~invalid)
+    model = get_model()
+    if len(valid_pos):
+        X_valid = X.iloc[valid_pos]
+        prices[valid_pos] = model.predict(X_valid)
+        if level:
+            interval = forest_interval(model, X_valid, prices[valid_pos], level)
+            if interval is not None:
+                low, high = np.full(n_cells, np.nan), np.full(n_cells, np.nan)
+                low[valid_pos], high[valid_pos] = interval
+
+    def matrix(values: np.ndarray) -> list:
+        rounded = np.round(values, 4).astype(object)
+        rounded[np.isnan(values)] = None
+        return rounded.reshape(shape).tolist()
+
+    result: Dict[str, Any] = {
+        "axes": [{"name": k, "values": v} for k, v in axes.items()],
+        "shape": shape,
+        "price_crore": matrix(prices),
+        "errors": {str(pos): msgs for pos, msgs in errors.items()},
+    }
+    if low is not None:
+        result["interval"] = {"level": level, "low": matrix(low), "high": matrix(high)}
+    return result
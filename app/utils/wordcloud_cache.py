@@ -0,0 +1,124 @@
+# app/utils/wordcloud_cache.py
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from flask import current_app
+
+from .analytics_loader import generate_wordcloud_png_from_frequencies, get_dataset_version
+from .term_counts import get_sector_term_counts
+
+# Bump when the rendering changes so persisted PNGs are not reused
+WORDCLOUD_CACHE_SCHEMA = 1
+
+# (dataset version, sector) -> PNG bytes, least recently used first
+_LRU: "OrderedDict[tuple, bytes]" = OrderedDict()
+_LRU_LOCK = threading.Lock()
+
+
+def _cache_root() -> Optional[Path]:
+    cache_dir = current_app.config.get("WORDCLOUD_CACHE_DIR")
+    return Path(cache_dir) if cache_dir else None
+
+
+def _disk_path(version: str, sector: str) -> Optional[Path]:
+    root = _cache_root()
+    if root is None:
+        return None
+    # Sector names contain spaces and could contain anything else; hash them for the filename
+    digest = hashlib.sha1(sector.encode("utf-8")).hexdigest()[:16]
+    return root / f"v{WORDCLOUD_CACHE_SCHEMA}-{version}" / f"{digest}.png"
+
+
+def _remember(key: tuple, png: bytes) -> None:
+    max_items = int(current_app.config.get("WORDCLOUD_CACHE_SIZE", 32))
+    with _LRU_LOCK:
+        _LRU[key] = png
+        _LRU.move_to_end(key)
+        while len(_LRU) > max_items:
+            _LRU.popitem(last=False)
+
+
+def get_wordcloud_png(sector: str, version: Optional[str] = None) -> bytes:
+    """
+    PNG wordcloud for one sector, drawn from its precomputed term counts.
+    Lookup order: in-process LRU -> on-disk PNG store -> render (and persist).
+    Raises KeyError for unknown sectors.
+    """
+    version = version or get_dataset_version()
+    key = (version, sector)
+    with _LRU_LOCK:
+        png = _LRU.get(key)
+        if png is not None:
+            _LRU.move_to_end(key)
+            return png
+
+    path = _disk_path(version, sector)
+    if path is not None and path.exists():
+        png = path.read_bytes()
+    else:
+        term_counts = get_sector_term_counts()
+        t0 = time.perf_counter()
+        png = generate_wordcloud_png_from_frequencies(term_counts.frequencies(sector))
+        current_app.logger.info(f"[wordcloud] rendered {sector!r} in {time.perf_counter() - t0:.2f}s")
+        if path is not None:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_suffix(f".{os.getpid()}.tmp")
+                tmp.write_bytes(png)
+                os.replace(tmp, path)
+            except OSError as e:
+                current_app.logger.warning(f"[wordcloud] could not persist {path}: {e}")
+
+    _remember(key, png)
+    return png
+
+
+def prebuild_wordclouds() -> int:
+    """Render every sector's PNG into the on-disk store (build step). Returns the number of sectors."""
+    sectors = get_sector_term_counts().sectors
+    version = get_dataset_version()
+    for sector in sectors:
+        get_wordcloud_png(sector, version)
+    return len(sectors)
+
+
+def carry_over_wordclouds(old_version: str, new_version: str) -> int:
+    """
+    Ingested listings carry no amenity text, so every wordcloud stays valid: move the cached
+    PNGs to the new dataset version (on disk as hard links). Returns the number kept in memory.
+    """
+    with _LRU_LOCK:
+        for key in [k for k in _LRU if k[0] == old_version]:
+            _LRU[(new_version, key[1])] = _LRU.pop(key)
+        kept = sum(1 for k in _LRU if k[0] == new_version)
+
+    root = _cache_root()
+    old_dir = root / f"v{WORDCLOUD_CACHE_SCHEMA}-{old_version}" if root is not None else None
+    if old_dir is not None and old_dir.is_dir():
+        new_dir = root / f"v{WORDCLOUD_CACHE_SCHEMA}-{new_version}"
+        try:
+            new_dir.mkdir(parents=True, exist_ok=True)
+            for png in old_dir.glob("*.png"):
+                target = new_dir / png.name
+                if not target.exists():
+                    try:
+                        os.link(png, target)
+                    except OSError:
+                        shutil.copy2(png, target)
+        except OSError as e:
+            current_app.logger.warning(f"[wordcloud] could not carry over {old_dir}: {e}")
+    return kept
+
+
+def clear_wordcloud_cache() -> None:
+    with _LRU_LOCK:
+        _LRU.clear()